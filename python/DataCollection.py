@@ -1,37 +1,59 @@
 import requests
-from bs4 import BeautifulSoup
 import re
-import oracledb as cx_Oracle
 import os
 import glob
+import argparse
 from pathlib import Path
 
-from rich.console import Console
+# ✅ 정책별 구조화 레코드(policies.jsonl)와 분류/지역/신청기간 메타데이터 (벡터 저장소 색인/검색 필터에 사용)
+from policy_metadata import (
+    extract_policy_metadata, load_policy_metadata, save_policy_metadata, build_policy_record, append_policy_record,
+    load_policy_records, policy_record_hash, CANONICAL_QUESTIONS, POLICY_RECORDS_FILENAME
+)
+# ✅ 목록/상세 페이지 URL 생성과 HTML 파싱 (비동기 크롤러와 공용)
+from policy_parser import build_list_url, build_detail_url, parse_policy_list, parse_policy_detail, PARSER_BACKENDS, DEFAULT_PARSER
+# ✅ 비동기 크롤러 (연결 풀 + 호스트별 동시 요청/초당 요청 제한 + 재시도)
+from async_crawler import (
+    run_crawl, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND, DEFAULT_TIMEOUT_SECONDS, DEFAULT_MAX_RETRIES
+)
+# ✅ 저장된 정책 ID 색인 + 증분 크롤링 조기 종료
+from crawl_index import PolicyIdIndex, KnownRunTracker, DEFAULT_STOP_AFTER_KNOWN
+# ✅ 상세 페이지 ETag/Last-Modified 재검증 캐시
+from http_cache import HttpCache, HTTP_CACHE_DIRNAME, DEFAULT_MAX_AGE_DAYS
+# ✅ 중단된 크롤링 이어서 실행 (목록 페이지/상세 결과/저장 위치 체크포인트)
+from crawl_state import CrawlCheckpoint
+# ✅ 정책 DB 묶음 저장 (연결 풀 + executemany MERGE, SQLite 대체 구현)
+from policy_db import OraclePolicyWriter, SqlitePolicyWriter, DEFAULT_DB_BATCH_SIZE
+
+# ✅ 동기 모드 요청 타임아웃 (초)
+REQUEST_TIMEOUT_SECONDS = DEFAULT_TIMEOUT_SECONDS
+
+# ✅ 정책 상세 페이지를 한 번 요청/파싱해서 제목, 분류, 섹션을 함께 반환
+# cache : HttpCache가 주어지면 ETag/Last-Modified로 재검증 (304면 저장된 페이지 사용)
+# revalidate : 이미 저장한 정책의 재검증 (304면 파싱하지 않고 {"not_modified": True}만 반환)
+def crawl_policy_detail(url, parser=None, cache=None, revalidate=False):
+    headers = cache.conditional_headers(url) if cache else {}
+    response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)    # 상세 페이지 요청
+    html = cache.load(url) if response.status_code == 304 and cache else None
+    if response.status_code == 304 and html is None and headers:
+        # 304인데 저장된 본문이 없으면 조건부 헤더 없이 다시 요청 (빈 페이지를 파싱하지 않도록)
+        response = requests.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+    if html is not None:
+        if revalidate:
+            return {"not_modified": True}
+    else:
+        response.raise_for_status()
+        if response.status_code == 304:
+            raise requests.HTTPError(f"본문 없는 304 응답: {url}", response=response)
+        response.encoding = 'utf-8'     # 인코딩 설정
+        html = response.text
+        if cache:
+            cache.store(url, html, response.headers)
+    return parse_policy_detail(html, parser)   # {title, category, data_store}
 
 # ✅ 정책 상세 정보 섹션 크롤링
-def crawl_all_sections(url):
-    response = requests.get(url)    # 상세 페이지 요청
-    response.encoding = 'utf-8'     # 인코딩 설정
-    soup = BeautifulSoup(response.text, "html.parser")  # HTML 파싱
-
-    data_store = {}
-    titles = soup.find_all("strong", class_="tit")
-
-    for title in titles:
-        section_name = title.get_text(strip=True)   # 섹션 제목 텍스트 추축
-        table = title.find_next("table", class_="form-table form-resp-table")
-        if table:
-            section_data = {}
-            rows = table.find_all("tr") # 표의 모든 행추출
-            for row in rows:
-                ths = row.find_all("th")
-                tds = row.find_all("td")
-                for th, td in zip(ths, tds):
-                    key = th.get_text(strip=True)   # 항목 명
-                    val = td.get_text(" ", strip=True).replace("\xa0", " ") # 값 (공백 포함 처리)
-                    section_data[key] = val # 섹션 데이터에 저장
-            data_store[section_name] = section_data # 전체 저장소에 섹션 저장
-    return data_store   # 결과 반환
+def crawl_all_sections(url, parser=None):
+    return crawl_policy_detail(url, parser)["data_store"]   # 섹션별 항목/값 파싱 결과 반환
 
 # ✅ 질문 관련 섹션 찾기
 def find_best_section(question, data_store):
@@ -60,55 +82,11 @@ def generate_answer(question, data_store):
     return answer   # 완성된 답변 반환
 
 # ✅ 정책 리스트 크롤링
-def crawl_policy_list(list_url):
-    response = requests.get(list_url)   # 정책 목록 페이지 요청
+def crawl_policy_list(list_url, parser=None):
+    response = requests.get(list_url, timeout=REQUEST_TIMEOUT_SECONDS)   # 정책 목록 페이지 요청
+    response.raise_for_status()     # 오류 응답을 빈 목록(마지막 페이지)으로 처리하지 않도록 예외 발생
     response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, "html.parser")  #HTML 파싱
-
-    policy_items = soup.select("ul.policy-list li") # 정책 항목들 선택
-    policy_data = []
-
-    for item in policy_items:
-        try:
-            category = item.select_one("span.bg-blue").get_text(strip=True) # 카테고리 추출
-            a_tag = item.select_one("a.tit.txt-over1")  # 제목링크
-            title = a_tag.get_text(strip=True)  # 제목내용
-            onclick = a_tag.get("onclick", "")  # 클릭 시 이동
-            class_attr = a_tag.get("class", []) # 클래스 속성 추출
-
-            policy_id = ""
-            if "goView" in onclick:
-                policy_id = onclick.replace("goView('", "").replace("');", "").strip()  # 정책 ID 추출
-
-            description = item.select_one("em.txt-over1").get_text(separator=" ", strip=True) # 설명 텍스트
-
-            policy_data.append({
-                "category": category,
-                "title": title,
-                "policy_id": policy_id,
-                "a_class": class_attr,
-                "description": description
-            })
-        except Exception as e:
-            print("파싱 오류:", e)
-            continue    # 에러 발생 시 해당 항목 건너뜀
-    return policy_data # 수집된 정책 목록 반환
-
-# ✅ 정책 ID 기준 중복 체크
-def load_saved_policy_ids_from_files(*file_paths):
-    saved_ids = set()   # 중복 체크를 위한 집합
-    id_pattern = re.compile(r"plcyBizId=([^&\s]+)") # 정책 ID 추출 정규식
-    for file_path in file_paths:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    match = id_pattern.search(line) # 한 줄에서 ID 검색
-                    if match:
-                        saved_ids.add(match.group(1).strip())   # ID저장
-        except FileNotFoundError:
-            pass # 파일이 없으면 무시하고 계속 진행
-
-    return saved_ids #저장된 ID 목록 반환
+    return parse_policy_list(response.text, parser) # 수집된 정책 목록 반환
 
 # ✅ 특수문자 제거
 def remove_special_chars_with_space(text):
@@ -140,23 +118,94 @@ def save_policy_result_to_file(file_path, title, questions, data_store, detail_u
         f.write('"""' + "\n") # 블록 끝 표시
 
 # ✅ 전체 정책 페이지 순회
-def crawl_all_policy_pages():
+# tracker : KnownRunTracker가 주어지면 이미 저장한 정책이 연속으로 나올 때 중단 (증분 크롤링)
+# checkpoint : CrawlCheckpoint가 주어지면 처리한 페이지를 기록하고, 이전 실행에서 처리한 페이지 다음부터 순회
+def crawl_all_policy_pages(parser=None, tracker=None, checkpoint=None):
     all_policies = [] # 누적 정책 저장 리스트
     page = 1 # 시작 페이지 번호
-    while True:
-        list_url = f"https://youth.seoul.go.kr/infoData/plcyInfo/ctList.do?sprtInfoId=&plcyBizId=&key=2309150002&sc_detailAt=&pageIndex={page}&orderBy=regYmd+desc&blueWorksYn=N&tabKind=002&sw=&sc_rcritCurentSitu=001&sc_rcritCurentSitu=002"
-        page_policies = crawl_policy_list(list_url) # 해당 페이지 정책 수집
+    done = False
+    if checkpoint is not None:
+        all_policies = list(checkpoint.policies) # 이전 실행에서 수집한 목록
+        stopped = tracker is not None and tracker.feed(all_policies)
+        done = checkpoint.list_complete or stopped
+        page = checkpoint.list_pages_done + 1
+        if done:
+            print(f"♻️ 이전 실행에서 수집한 목록 사용: {len(all_policies)}개")
+    while not done:
+        list_url = build_list_url(page)
+        page_policies = crawl_policy_list(list_url, parser) # 해당 페이지 정책 수집
         if not page_policies: # 더이상 정책 없으면 종료
             print("❌ 더 이상 데이터가 없습니다. 종료.")
             break
         all_policies.extend(page_policies) # 정책 누적 저장
+        if checkpoint is not None:
+            checkpoint.record_list_page(page, page_policies)
+        if tracker is not None and tracker.feed(page_policies):
+            print(f"⏩ 이미 저장된 정책이 {tracker.stop_after}개 연속으로 나와 목록 순회를 중단합니다.")
+            break
         page += 1 # 다음 페이지로 이동
+    if checkpoint is not None and not checkpoint.list_complete:
+        checkpoint.mark_list_complete()
     print(f"\n✅ 총 수집된 정책 수: {len(all_policies)}개")
 
     return all_policies # 전체 수집 결과 반환
 
+# ✅ 동기 모드 상세 페이지 순회 (비동기 크롤러의 결과와 같은 형식으로 반환)
+# checkpoint : 받아온 상세 결과를 기록하고, 이전 실행에서 받은 결과는 다시 요청하지 않음
+# revalidate_ids : 이미 저장한 정책 중 상세 페이지를 다시 요청해서 변경을 확인할 정책 ID (결과에 revalidated 표시)
+def iter_policy_details(all_policies, saved_policy_ids, parser=None, cache=None, checkpoint=None, revalidate_ids=()):
+    revalidate_ids = set(revalidate_ids)
+    for policy in all_policies:
+        policy_id = policy["policy_id"]
+        if not policy_id:
+            continue
+        revalidate = policy_id in revalidate_ids
+        if policy_id in saved_policy_ids and not revalidate:
+            print(f"[중복 - ID 기준] '{policy_id}' 이미 저장되어 건너뜀")
+            continue
+        # 목록에 같은 정책이 두 번 나와도 재검증은 한 번만
+        revalidate_ids.discard(policy_id)
+        restored = checkpoint.fetched_result(policy) if checkpoint is not None else None
+        if restored is not None:
+            yield restored
+            continue
+
+        detail_url = build_detail_url(policy_id)
+        result = {"policy": policy, "detail_url": detail_url}
+        if revalidate:
+            result["revalidated"] = True
+        try:
+            # 상세 페이지는 한 번만 요청/파싱
+            result.update(crawl_policy_detail(detail_url, parser, cache, revalidate))
+        except Exception as e:
+            result["error"] = e
+        if checkpoint is not None:
+            checkpoint.record_fetched(result)
+        yield result
+
 # ✅ 실행
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="청년 정책 크롤링")
+    parser.add_argument("--sync", action="store_true", help="기존 방식(requests로 한 페이지씩 순서대로)으로 크롤링")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="비동기 모드 호스트당 동시 요청 수")
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="비동기 모드 호스트당 초당 요청 수 (0 이하: 제한 없음)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_RETRIES, help="비동기 모드 요청 재시도 횟수")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help="HTML 파서 백엔드")
+    parser.add_argument("--full", action="store_true", help="증분 크롤링 대신 목록 페이지 전체를 순회")
+    parser.add_argument("--stop-after-known", type=int, default=DEFAULT_STOP_AFTER_KNOWN,
+                        help="증분 크롤링 시 이미 저장한 정책이 이 개수만큼 연속으로 나오면 목록 순회 중단")
+    parser.add_argument("--no-http-cache", action="store_true", help="상세 페이지 HTTP 캐시(ETag/Last-Modified) 사용 안 함")
+    parser.add_argument("--no-revalidate", action="store_true",
+                        help="목록에 나온 이미 저장한 정책의 상세 페이지를 재검증하지 않음 (변경 감지 안 함)")
+    parser.add_argument("--http-cache-max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="이 기간 동안 재검증되지 않은 HTTP 캐시 항목 삭제")
+    parser.add_argument("--resume", action="store_true", help="중단된 이전 크롤링을 체크포인트부터 이어서 실행")
+    parser.add_argument("--db-batch-size", type=int, default=DEFAULT_DB_BATCH_SIZE, help="정책 DB 저장 커밋 단위 (행 수)")
+    parser.add_argument("--sqlite", default="", help="Oracle 대신 이 경로의 SQLite 파일에 정책 저장 (로컬 실행)")
+    parser.add_argument("--text-export", action="store_true",
+                        help="policies.jsonl과 함께 이전 형식의 데이터 파일(your_data_file*.txt)도 저장")
+    args = parser.parse_args()
+
     base_dir = Path(__file__).resolve().parent / "policy_directory/"
     base_file3_name = os.path.join(base_dir, "your_data_file")
 
@@ -174,79 +223,158 @@ if __name__ == "__main__":
         if match:
             existing_indexes.append(int(match.group(1)))
 
-    file3_index = max(existing_indexes, default=0) + 1
+    # 체크포인트 (--resume이 아니면 이전 체크포인트를 지우고 새로 시작)
+    checkpoint = CrawlCheckpoint(base_dir, resume=args.resume)
+
+    if checkpoint.file3_index is not None:
+        # 이전 실행이 저장하던 파일과 저장 수에서 이어서 저장
+        file3_index, save_count = checkpoint.file3_index, checkpoint.save_count
+    else:
+        file3_index, save_count = max(existing_indexes, default=0) + 1, 0
     file3_path = f"{base_file3_name}{file3_index}.txt"
     print(f"📁 최초 저장 파일: {file3_path}")
-    save_count = 0
-
-    # 중복 정책 ID 로딩
-    saved_policy_ids = load_saved_policy_ids_from_files(*file3_paths)
-
-    all_policies = crawl_all_policy_pages()
-
-    # 질문 리스트
-    test_questions = [
-        "사업개요에 대해 알려줘",
-        "신청자격은 어떻게 되나요?",
-        "신청방법이 궁금해요",
-        "기타 정보가 있나요?",
-        "지원 내용이 뭔가요?"
-    ]
-
-    dsn = cx_Oracle.makedsn("192.168.0.231", 1521, service_name="helperpdb")
-    conn = cx_Oracle.connect(user="helper", password="1111", dsn=dsn)
-    cursor = conn.cursor()
-
-    inserted_count = 0
 
-    for i, policy in enumerate(all_policies):
+    # 중복 정책 ID 로딩 (색인 파일이 없으면 기존 데이터 파일을 한 번 스캔해서 생성)
+    records_path = os.path.join(base_dir, POLICY_RECORDS_FILENAME)
+    policy_id_index = PolicyIdIndex(base_dir, file3_paths + [records_path])
+    saved_policy_ids = policy_id_index.ids()
+    # 이전 실행에서 파일까지 저장한 정책은 다시 받거나 파일에 다시 쓰지 않음 (DB 저장만 아래에서 다시 실행)
+    saved_policy_ids |= checkpoint.written
+    stop_after_known = 0 if args.full else args.stop_after_known
+    http_cache = None if args.no_http_cache else HttpCache(base_dir / HTTP_CACHE_DIRNAME)
+    # 정책 메타데이터 로딩 (정책 ID -> 분류/지역/신청기간)
+    policy_metadata = load_policy_metadata(base_dir)
+    # 이미 저장한 정책 레코드 (목록에 다시 나오면 상세 페이지를 재검증해서 바뀐 정책만 다시 저장)
+    # 레코드 없이 텍스트 데이터 파일에만 있는 정책은 비교할 수 없으므로 재검증하지 않음
+    known_records = {} if args.no_revalidate else load_policy_records(base_dir)
+    revalidate_ids = (saved_policy_ids - checkpoint.written) & set(known_records)
+
+    if args.sync:
+        tracker = KnownRunTracker(saved_policy_ids, stop_after_known) if stop_after_known > 0 else None
+        all_policies = crawl_all_policy_pages(args.parser, tracker, checkpoint)
+        crawled_policies = iter_policy_details(all_policies, saved_policy_ids, args.parser, http_cache, checkpoint,
+                                               revalidate_ids)
+    else:
+        # 목록/상세 페이지를 모두 받아온 뒤 아래에서 순서대로 DB/파일에 저장
+        all_policies, crawled_policies = run_crawl(
+            saved_policy_ids,
+            parser=args.parser,
+            stop_after_known=stop_after_known,
+            checkpoint=checkpoint,
+            revalidate_ids=revalidate_ids,
+            cache=http_cache,
+            concurrency=args.concurrency,
+            requests_per_second=args.rps,
+            max_retries=args.retries
+        )
+
+    # 질문 리스트 (answer_precompute.py의 미리 생성하는 답변과 같은 대표 질문)
+    test_questions = list(CANONICAL_QUESTIONS)
+
+    if args.sqlite:
+        policy_db = SqlitePolicyWriter(args.sqlite, batch_size=args.db_batch_size)
+    else:
+        policy_db = OraclePolicyWriter(user="helper", password="1111", host="192.168.0.231", port=1521,
+                                       service_name="helperpdb", batch_size=args.db_batch_size)
+    # DB 커밋이 끝나면 정책 ID 색인과 체크포인트에 커밋 완료로 기록
+    # (묶음 저장이 실패하면 행은 policy_db에 남아 다음 flush에서 다시 저장되고, 그 전에 중단되면 --resume에서 다시 MERGE)
+    def on_committed(policy_id, policy_title, saved_path):
+        def mark_committed():
+            policy_id_index.add(policy_id, policy_title, saved_path)
+            policy_id_index.save()
+            checkpoint.mark_committed(policy_id)
+        return mark_committed
+
+    # 이전 실행에서 파일까지 저장했지만 DB 커밋 전에 중단된 정책은 DB에만 다시 MERGE (이미 있으면 건너뜀)
+    for row in checkpoint.uncommitted_rows():
+        policy_db.add(row["title"], row["url"],
+                      on_saved=on_committed(row["policy_id"], row["title"], row["file"] or records_path))
+
+    # 재검증 결과 (변경 없음, 변경되어 다시 저장)
+    unchanged_count, changed_count = 0, 0
+
+    for i, crawled in enumerate(crawled_policies):
+        policy = crawled["policy"]
         policy_id = policy["policy_id"]
-        if not policy_id:
-            continue
-        if policy_id in saved_policy_ids:
-            print(f"[중복 - ID 기준] '{policy_id}' 이미 저장되어 건너뜀")
-            continue
-
-        detail_url = f"https://youth.seoul.go.kr/infoData/plcyInfo/view.do?plcyBizId={policy_id}&tab=001&key=2309150002"
+        detail_url = crawled["detail_url"]
 
         try:
-            res = requests.get(detail_url)
-            res.encoding = 'utf-8'
-            soup = BeautifulSoup(res.text, "html.parser")
-            policy_title = soup.find("strong", class_="title").get_text(strip=True)
-            data_store = crawl_all_sections(detail_url)
-
-            # DB INSERT
-            try:
-                cursor.execute("INSERT INTO policies (title, url) VALUES (:1, :2)", (policy_title, detail_url))
-               # cursor.execute("INSERT INTO policies (title, url) VALUES (:1, :2)", (policy_title, detail_url))
-                inserted_count += 1
-                print(f"[INSERT 완료] {policy_title}")
-            except cx_Oracle.IntegrityError:
-                print(f"[중복 - DB 기준] {policy_title} 이미 존재하여 건너뜀")
-            except Exception as e:
-                print(f"[DB ERROR] 제목 : {policy_title} | 오류 : {e}")
-
-            # file3 분할 저장
-            if save_count >= 20:
-                file3_index += 1
-                file3_path = f"{base_file3_name}{file3_index}.txt"
-                save_count = 0
-
-            save_policy_result_to_file(file3_path, policy_title, test_questions, data_store, detail_url)
-            print(f"📌 save_count: {save_count} | 현재 파일: {file3_path}")
-
-            save_count += 1
+            if "error" in crawled:
+                raise crawled["error"]
+            if crawled.get("not_modified"):
+                # 304 Not Modified : 저장한 뒤로 상세 페이지가 바뀌지 않음
+                unchanged_count += 1
+                continue
+            policy_title = crawled["title"]
+            data_store = crawled["data_store"]
+
+            category = policy["category"] or crawled.get("category", "")
+            record = build_policy_record(policy_id, policy_title, detail_url, category, policy["description"], data_store)
+
+            if crawled.get("revalidated"):
+                # 이미 저장한 정책 : 내용이 바뀌었을 때만 레코드를 다시 추가 (load_policy_records는 마지막 줄 사용)
+                # DB/정책 ID 색인/텍스트 데이터 파일은 그대로 두고, RAGPipeline이 정책 단위 해시로 다시 색인
+                stored = known_records.get(policy_id)
+                if stored is not None and policy_record_hash(stored) == policy_record_hash(record):
+                    unchanged_count += 1
+                    continue
+                append_policy_record(base_dir, record)
+                known_records[policy_id] = record
+                policy_metadata[policy_id] = extract_policy_metadata(
+                    policy_title, detail_url, category, policy["description"], data_store
+                )
+                save_policy_metadata(base_dir, policy_metadata)
+                changed_count += 1
+                print(f"🔄 [변경 감지] {policy_title} | {records_path}")
+                continue
+
+            # 구조화 정책 레코드 저장 (RAGPipeline이 바로 색인하고 정책 단위로 변경 감지, 항목별 질문 바로 답변)
+            append_policy_record(base_dir, record)
+            saved_path = records_path
+
+            if args.text_export:
+                # file3 분할 저장
+                if save_count >= 20:
+                    file3_index += 1
+                    file3_path = f"{base_file3_name}{file3_index}.txt"
+                    save_count = 0
+
+                save_policy_result_to_file(file3_path, policy_title, test_questions, data_store, detail_url)
+                print(f"📌 save_count: {save_count} | 현재 파일: {file3_path}")
+                save_count += 1
+                saved_path = file3_path
+            else:
+                print(f"📌 [저장 완료] {policy_title} | {records_path}")
+
+            policy_metadata[policy_id] = extract_policy_metadata(
+                policy_title, detail_url, category, policy["description"], data_store
+            )
+            save_policy_metadata(base_dir, policy_metadata)
+
+            # 이번 실행에서 같은 정책을 다시 처리하지 않도록 메모리에서만 바로 표시
             saved_policy_ids.add(policy_id)
+            # 파일 저장은 바로 체크포인트에 기록 (--resume 시 파일에 다시 쓰지 않고 분할 위치도 이어서 사용)
+            checkpoint.mark_written(policy_id, file3_index, save_count, policy_title, detail_url, saved_path)
+
+            # DB 저장 (batch_size개씩 MERGE + 커밋, 중복은 DB에서 건너뜀)
+            policy_db.add(policy_title, detail_url, on_saved=on_committed(policy_id, policy_title, saved_path))
 
         except Exception as e:
             print(f"[{i+1}] 정책 처리 중 오류 - ID: {policy_id} / 오류: {e}")
             continue
 
-    # conn.commit()
-    cursor.close()
-    conn.close()
+    # 남은 묶음 저장 후 연결 풀 종료 (실패하면 체크포인트를 남겨서 --resume으로 다시 저장)
+    policy_db.close()
+    # 끝까지 처리했으므로 체크포인트 삭제 (다음 실행은 새 크롤링)
+    checkpoint.clear()
+    if http_cache is not None:
+        # 오래 재검증되지 않은 캐시 항목 정리 (목록에서 내려간 정책 등)
+        http_cache.prune(max_age_days=args.http_cache_max_age_days)
 
+    db_stats = policy_db.stats()
     print(f"\n✅ 수집된 전체 정책 수: {len(all_policies)}개")
-    print(f"🟢 DB에 실제 INSERT 된 정책 수: {inserted_count}개")
+    print(f"🟢 DB에 실제 INSERT 된 정책 수: {db_stats['inserted']}개 "
+          f"(중복 {db_stats['skipped']}개, 오류 {db_stats['failed']}개, 커밋 {db_stats['batches']}회)")
+    print(f"🔁 재검증한 기존 정책: 변경 {changed_count}개, 변경 없음 {unchanged_count}개"
+          + (f" (HTTP 캐시 {http_cache.stats()})" if http_cache is not None else ""))
     print("\n----------------------- 데이터 저장 완료 -----------------------------")
@@ -0,0 +1,208 @@
+# answer_precompute.py
+"""
+자주 묻는 (정책 x 대표 질문) 답변을 미리 생성해두고 /ask에서 의미 검색으로 바로 반환합니다.
+
+- 대표 질문 : 크롤러가 정책마다 사용하는 CANONICAL_QUESTIONS (사업개요, 신청자격, 신청방법, 기타, 지원내용)
+- 오프라인 작업 : 데이터 파일의 정책마다 "<정책 제목> <대표 질문>"을 RAGPipeline.query로 답변 생성
+  (ANSWER_PRECOMPUTE_CONCURRENCY개 스레드로 동시 처리, Gemini 호출 수 제한)
+- 저장 : ANSWER_STORE_PATH/<코퍼스 manifest 해시>/ 아래에 answers.json + questions.npy(질문 임베딩)
+  데이터 파일이 바뀌면 manifest 해시가 달라지므로 이전 코퍼스로 만든 답변은 사용되지 않음
+- 조회 : 질문 임베딩과 저장된 질문 임베딩의 코사인 유사도가 ANSWER_STORE_MIN_SIMILARITY 이상이고,
+  그 답변의 정책 제목이 질문에 들어 있으면 저장된 답변 반환
+  (제목만 다른 정책끼리는 질문 임베딩이 매우 비슷해서 유사도만으로는 다른 정책의 답변이 반환될 수 있음)
+  RAGPipeline은 검색에도 쓰는 질문 임베딩을 한 번만 계산해서 전달
+
+python answer_precompute.py --concurrency 4
+"""
+import json
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+# 로거
+import logging
+
+import numpy as np
+
+from config import settings
+from policy_metadata import CANONICAL_QUESTIONS, split_policy_blocks, extract_policy_id, load_policy_records, normalize_title
+
+logger = logging.getLogger(__name__)
+
+ANSWERS_FILE = "answers.json"
+QUESTION_VECTORS_FILE = "questions.npy"
+# RAGPipeline.query가 오류 시 반환하는 문구 (이런 답변은 저장하지 않음)
+_FAILED_ANSWER_PREFIXES = ("오류:", "답변 생성 중 오류")
+
+
+# 정책 레코드(policies.jsonl)와 데이터 파일의 정책 블록마다 (정책 ID, 제목, URL, 질문) 목록 생성
+def build_question_list(data_path: Path) -> List[Dict[str, str]]:
+    policies = [(policy_id, record["title"], record["url"])
+                for policy_id, record in load_policy_records(data_path).items()]
+    for path in sorted(Path(data_path).rglob("*.txt")):
+        for block in split_policy_blocks(path.read_text(encoding="utf-8")):
+            policies.append((extract_policy_id(block["url"]) or block["title"], block["title"], block["url"]))
+
+    items: List[Dict[str, str]] = []
+    seen = set()
+    for policy_id, title, url in policies:
+        if policy_id in seen:
+            continue
+        seen.add(policy_id)
+        for canonical in CANONICAL_QUESTIONS:
+            items.append({
+                "policy_id": policy_id,
+                "title": title,
+                "url": url,
+                "question": f"{title} {canonical}",
+            })
+    return items
+
+
+class AnswerStore:
+    """
+    코퍼스 manifest 해시별로 저장된 미리 생성한 답변 색인.
+    현재 manifest 해시의 디렉토리가 없으면 비어있는 상태로 동작합니다.
+    """
+    def __init__(self, embeddings, manifest_hash: str,
+                 store_path: Path = settings.ANSWER_STORE_PATH,
+                 min_similarity: float = settings.ANSWER_STORE_MIN_SIMILARITY):
+        self.embeddings = embeddings
+        self.manifest_hash = manifest_hash
+        self.directory = Path(store_path) / manifest_hash
+        self.min_similarity = min_similarity
+        self.answers: List[Dict[str, str]] = []
+        self.vectors: Optional[np.ndarray] = None
+        # 답변별 정규화된 정책 제목 (질문에 들어 있는지 확인)
+        self.titles: List[str] = []
+        # 지표
+        self._stats_lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+        self._title_mismatches = 0
+
+        if (self.directory / ANSWERS_FILE).is_file() and (self.directory / QUESTION_VECTORS_FILE).is_file():
+            with open(self.directory / ANSWERS_FILE, "r", encoding="utf-8") as f:
+                self.answers = json.load(f)
+            self.vectors = np.load(self.directory / QUESTION_VECTORS_FILE)
+            self.titles = [normalize_title(answer.get("title", "")) for answer in self.answers]
+            logger.info(f"미리 생성한 답변 {len(self.answers)}개 로드 완료 (manifest: {manifest_hash[:12]})")
+        else:
+            logger.info(f"현재 코퍼스(manifest: {manifest_hash[:12]})로 미리 생성한 답변이 없습니다.")
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    # 질문과 의미가 같고 같은 정책 제목이 들어 있는 대표 질문의 저장된 답변 (없으면 None)
+    # query_vector : 호출하는 쪽에서 이미 계산한 질문 임베딩 (없으면 여기서 embed_query)
+    def lookup(self, question: str, query_vector: Optional[List[float]] = None) -> Optional[Dict[str, str]]:
+        if not self.answers:
+            return None
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(question)
+        query = np.array(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.vectors @ query
+        candidates = np.flatnonzero(scores >= self.min_similarity)
+        normalized_question = normalize_title(question)
+        best = None
+        # 유사도 순으로 보면서 정책 제목이 질문에 들어 있는 첫 답변 사용
+        for row in candidates[np.argsort(-scores[candidates])]:
+            if self.titles[row] and self.titles[row] in normalized_question:
+                best = int(row)
+                break
+        with self._stats_lock:
+            self._lookups += 1
+            self._hits += int(best is not None)
+            self._title_mismatches += int(best is None and len(candidates) > 0)
+        if best is None:
+            if len(candidates):
+                logger.info(f"유사한 대표 질문이 있지만 정책 제목이 질문과 달라 사용하지 않습니다: "
+                            f"'{self.answers[int(candidates[np.argmax(scores[candidates])])]['question']}'")
+            return None
+        logger.info(f"미리 생성한 답변 사용: '{self.answers[best]['question']}' (유사도 {scores[best]:.4f})")
+        return self.answers[best]
+
+    # 누적 지표 반환
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "manifest": self.manifest_hash[:12],
+                "answers": len(self.answers),
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "title_mismatches": self._title_mismatches,
+                "hit_ratio": round(self._hits / self._lookups, 4) if self._lookups else 0,
+            }
+
+
+# 현재 코퍼스로 (정책 x 대표 질문) 답변을 생성해서 ANSWER_STORE_PATH/<manifest 해시>/에 저장
+# 다른 manifest 해시의 이전 답변 디렉토리는 삭제
+def precompute_answers(pipeline, concurrency: int = settings.ANSWER_PRECOMPUTE_CONCURRENCY,
+                       limit: int = 0) -> Path:
+    items = build_question_list(pipeline.data_path)
+    if limit > 0:
+        items = items[:limit]
+    logger.info(f"답변 미리 생성 시작: 질문 {len(items)}개, 동시 처리 {concurrency}개")
+
+    # 미리 생성하는 동안에는 이전 답변이나 항목 라우터가 아닌 실제 RAG 경로로 답변
+    pipeline.answer_store = None
+    pipeline.intent_router = None
+
+    # 진행 상황 로그용
+    done_lock = threading.Lock()
+    done = [0]
+
+    def answer(item: Dict[str, str]) -> Optional[Dict[str, str]]:
+        text = pipeline.query(item["question"])
+        with done_lock:
+            done[0] += 1
+            if done[0] % 50 == 0:
+                logger.info(f"답변 미리 생성 진행: {done[0]}/{len(items)}")
+        if not text or text.startswith(_FAILED_ANSWER_PREFIXES):
+            logger.warning(f"답변 생성 실패로 저장하지 않습니다: {item['question']}")
+            return None
+        return {**item, "answer": text}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        answers = [result for result in executor.map(answer, items) if result is not None]
+
+    vectors = np.asarray(pipeline.query_embeddings.embed_documents([a["question"] for a in answers]), dtype=np.float32)
+    if len(vectors):
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    # 임시 디렉토리에 모두 쓴 뒤 이름을 바꿔서, 조회 중인 서버가 절반만 쓰인 파일을 읽지 않도록 함
+    store_path = Path(settings.ANSWER_STORE_PATH)
+    store_path.mkdir(parents=True, exist_ok=True)
+    directory = store_path / pipeline.corpus_manifest_hash
+    tmp_directory = store_path / f".{pipeline.corpus_manifest_hash}.tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    tmp_directory.mkdir()
+    with open(tmp_directory / ANSWERS_FILE, "w", encoding="utf-8") as f:
+        json.dump(answers, f, ensure_ascii=False)
+    np.save(tmp_directory / QUESTION_VECTORS_FILE, vectors)
+    shutil.rmtree(directory, ignore_errors=True)
+    tmp_directory.rename(directory)
+
+    for old in store_path.iterdir():
+        if old.is_dir() and old != directory and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+            logger.info(f"이전 코퍼스의 답변 삭제: {old.name[:12]}")
+
+    logger.info(f"답변 미리 생성 완료: {len(answers)}/{len(items)}개 저장 ('{directory}')")
+    return directory
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="(정책 x 대표 질문) 답변 미리 생성")
+    parser.add_argument("--concurrency", type=int, default=settings.ANSWER_PRECOMPUTE_CONCURRENCY,
+                        help="동시에 처리할 질문 수 (Gemini 동시 호출 수)")
+    parser.add_argument("--limit", type=int, default=0, help="0보다 크면 앞에서부터 이 개수의 질문만 처리")
+    args = parser.parse_args()
+
+    from rag_main_runner import RAGPipeline
+
+    precompute_answers(RAGPipeline(), concurrency=args.concurrency, limit=args.limit)
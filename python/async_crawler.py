@@ -0,0 +1,304 @@
+# async_crawler.py
+"""
+asyncio + aiohttp 기반 정책 크롤러.
+
+기존 DataCollection.py는 목록 페이지와 상세 페이지를 requests.get으로 하나씩 순서대로 받아서
+(세션/keep-alive/타임아웃 없음) 전체 크롤링에 오래 걸립니다.
+
+- 연결 풀 : aiohttp.ClientSession 하나를 재사용 (keep-alive, 호스트당 최대 연결 수 = concurrency)
+- 예의 있는 요청 : 호스트별 동시 요청 수(concurrency)와 초당 요청 수(requests_per_second) 제한
+- 타임아웃 + 재시도 : 연결 오류/타임아웃/429/5xx는 지수 백오프(+지터)로 재시도, 429의 Retry-After 준수
+- 목록 페이지는 concurrency개씩 묶어서 요청하고, 빈 페이지가 나오면 중단
+- 상세 페이지는 한 번만 받아서 한 번만 파싱 (parser : policy_parser의 파서 백엔드)
+- 증분 크롤링 : 이미 저장한 정책이 stop_after_known개 연속으로 나오면 목록 순회 중단 (crawl_index.py)
+- 상세 페이지는 로컬 HTTP 캐시(http_cache.py)의 ETag/Last-Modified로 재검증
+  (revalidate_ids의 이미 저장한 정책도 요청해서, 304면 파싱 없이 not_modified로 반환)
+- 체크포인트(crawl_state.py)가 주어지면 목록 페이지/상세 결과를 기록하고, 이어서 실행할 때 이미 받은 페이지는 다시 요청하지 않음
+
+이 모듈은 크롤러에서 사용하므로 config(Settings) 대신 인자로 설정을 받습니다.
+"""
+import time
+import random
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from urllib.parse import urlsplit
+# 로거
+import logging
+
+import aiohttp
+
+from policy_parser import BASE_URL, build_list_url, build_detail_url, parse_policy_list, parse_policy_detail
+from crawl_index import KnownRunTracker
+from http_cache import HttpCache
+from crawl_state import CrawlCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# 재시도할 HTTP 상태 코드
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 크롤링 기본값 (DataCollection.py 실행 인자 기본값으로도 사용)
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_TIMEOUT_SECONDS = 15.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+
+
+class RateLimiter:
+    """
+    초당 요청 수 제한 (요청 시작 시각을 1/rps 간격으로 배정).
+    rps가 0 이하이면 제한하지 않습니다.
+    """
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class _HostLimits:
+    semaphore: asyncio.Semaphore
+    rate_limiter: RateLimiter
+
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    status_counts: Dict[int, int] = field(default_factory=dict)
+
+
+class AsyncFetcher:
+    """
+    호스트별 동시 요청 수/초당 요청 수를 지키면서 페이지를 받아오는 HTTP 클라이언트.
+    async with AsyncFetcher(...) as fetcher: html = await fetcher.fetch_text(url)
+    """
+    def __init__(self,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+                 cache: Optional[HttpCache] = None,
+                 stats: Optional[FetchStats] = None):
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.requests_per_second = requests_per_second
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        # stats : 호출하는 쪽에서 지표를 받아볼 때 전달 (crawler_bench.py의 재시도 수 측정)
+        self.stats = stats if stats is not None else FetchStats()
+        self._hosts: Dict[str, _HostLimits] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        connector = aiohttp.TCPConnector(limit_per_host=self.concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    def _limits(self, url: str) -> _HostLimits:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _HostLimits(asyncio.Semaphore(self.concurrency), RateLimiter(self.requests_per_second))
+        return self._hosts[host]
+
+    # 재시도 대기 시간 (지수 백오프 + 지터, 429는 Retry-After가 있으면 그 값을 사용)
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_seconds * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    # URL의 응답 본문을 UTF-8 문자열로 반환 (재시도 후에도 실패하면 예외 발생)
+    # use_cache : HTTP 캐시로 재검증 (304 Not Modified면 저장된 본문 반환)
+    async def fetch_text(self, url: str, use_cache: bool = False) -> str:
+        return (await self.fetch_revalidated(url, use_cache))[0]
+
+    # fetch_text와 같지만 (본문, 304 Not Modified로 저장된 본문을 사용했는지) 반환
+    # 304인데 저장된 본문이 없으면(검증자만 남은 경우) 조건부 헤더 없이 바로 다시 요청 (빈 본문을 저장/파싱하지 않도록)
+    async def fetch_revalidated(self, url: str, use_cache: bool = True) -> Tuple[str, bool]:
+        limits = self._limits(url)
+        cache = self.cache if use_cache else None
+        conditional = cache is not None
+        attempt = 0
+        while True:
+            retry_after = None
+            headers = cache.conditional_headers(url) if conditional else {}
+            async with limits.semaphore:
+                await limits.rate_limiter.acquire()
+                self.stats.requests += 1
+                try:
+                    async with self._session.get(url, headers=headers) as response:
+                        self.stats.status_counts[response.status] = self.stats.status_counts.get(response.status, 0) + 1
+                        if response.status == 304:
+                            cached = cache.load(url) if conditional else None
+                            if cached is not None:
+                                return cached, True
+                            if conditional:
+                                logger.debug(f"304 응답이지만 저장된 본문이 없어 조건부 헤더 없이 다시 요청: {url}")
+                                conditional = False
+                                continue
+                            # 조건부 헤더 없이 보낸 요청의 304는 본문이 없으므로 실패로 처리
+                            raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                              status=response.status, message="본문 없는 304 응답")
+                        if response.status not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            text = await response.text(encoding="utf-8")
+                            if cache:
+                                cache.store(url, text, response.headers)
+                            return text, False
+                        retry_after = response.headers.get("Retry-After")
+                        error: Exception = aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                except aiohttp.ClientResponseError:
+                    self.stats.failures += 1
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = e
+
+            if attempt == self.max_retries:
+                self.stats.failures += 1
+                raise error
+            self.stats.retries += 1
+            delay = self._retry_delay(attempt, retry_after)
+            logger.debug(f"요청 실패 ({error!r}), {delay:.2f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {url}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# ✅ 전체 정책 목록 페이지 순회 (concurrency개 페이지씩 요청, 빈 페이지가 나오면 중단)
+# tracker : 이미 저장한 정책이 연속으로 나오면 중단 (증분 크롤링)
+# checkpoint : 처리한 목록 페이지를 기록하고, 이전 실행에서 처리한 페이지 다음부터 순회
+async def crawl_policy_list_pages(fetcher: AsyncFetcher, base_url: str = BASE_URL,
+                                  parser: Optional[str] = None,
+                                  tracker: Optional[KnownRunTracker] = None,
+                                  checkpoint: Optional[CrawlCheckpoint] = None) -> List[Dict[str, Any]]:
+    all_policies: List[Dict[str, Any]] = []
+    page = 1
+    if checkpoint is not None:
+        all_policies = list(checkpoint.policies)
+        # 이전 실행의 목록으로 증분 크롤링 판단 상태를 복원
+        stopped = tracker is not None and tracker.feed(all_policies)
+        if checkpoint.list_complete or stopped:
+            print(f"\n♻️ 이전 실행에서 수집한 목록 사용: {len(all_policies)}개")
+            return all_policies
+        page = checkpoint.list_pages_done + 1
+
+    while True:
+        pages = range(page, page + fetcher.concurrency)
+        htmls = await asyncio.gather(*(fetcher.fetch_text(build_list_url(p, base_url)) for p in pages))
+        for p, html in zip(pages, htmls):
+            page_policies = parse_policy_list(html, parser)
+            if not page_policies:
+                if checkpoint is not None:
+                    checkpoint.mark_list_complete()
+                print(f"\n✅ 총 수집된 정책 수: {len(all_policies)}개")
+                return all_policies
+            all_policies.extend(page_policies)
+            if checkpoint is not None:
+                checkpoint.record_list_page(p, page_policies)
+            if tracker is not None and tracker.feed(page_policies):
+                if checkpoint is not None:
+                    checkpoint.mark_list_complete()
+                print(f"\n⏩ 이미 저장된 정책이 {tracker.stop_after}개 연속으로 나와 목록 순회를 중단합니다. (수집: {len(all_policies)}개)")
+                return all_policies
+        page += fetcher.concurrency
+
+
+# ✅ 정책 상세 페이지 크롤링 -> {policy, detail_url, title, category, data_store} (실패 시 error 포함)
+# revalidate : 이미 저장한 정책의 재검증 (revalidated 표시, 304면 파싱하지 않고 not_modified만 표시)
+async def crawl_policy_detail(fetcher: AsyncFetcher, policy: Dict[str, Any], base_url: str = BASE_URL,
+                              parser: Optional[str] = None, revalidate: bool = False) -> Dict[str, Any]:
+    detail_url = build_detail_url(policy["policy_id"], base_url)
+    result: Dict[str, Any] = {"policy": policy, "detail_url": detail_url}
+    if revalidate:
+        result["revalidated"] = True
+    try:
+        html, not_modified = await fetcher.fetch_revalidated(detail_url)
+        if revalidate and not_modified:
+            result["not_modified"] = True
+            return result
+        result.update(parse_policy_detail(html, parser))
+    except Exception as e:
+        result["error"] = e
+    return result
+
+
+# ✅ 목록 전체 + 상세 페이지 크롤링 (skip_ids에 있는 정책 ID는 상세 페이지를 요청하지 않음)
+# revalidate_ids : skip_ids 중 상세 페이지를 HTTP 캐시로 재검증할 정책 ID (변경 감지, 결과에 revalidated 표시)
+# stop_after_known : 0보다 크면 skip_ids의 정책이 이 개수만큼 연속으로 나올 때 목록 순회 중단
+# checkpoint : 목록 페이지/상세 결과를 기록 (이전 실행에서 받은 상세 결과는 다시 요청하지 않음)
+# 반환: (목록의 전체 정책 리스트, 목록 순서대로 정렬된 상세 크롤링 결과 리스트)
+async def crawl_all_policies(skip_ids: Iterable[str] = (),
+                             base_url: str = BASE_URL,
+                             parser: Optional[str] = None,
+                             stop_after_known: int = 0,
+                             checkpoint: Optional[CrawlCheckpoint] = None,
+                             revalidate_ids: Iterable[str] = (),
+                             **fetcher_options) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    skip_ids = set(skip_ids)
+    revalidate_ids = set(revalidate_ids)
+    tracker = KnownRunTracker(skip_ids, stop_after_known) if stop_after_known > 0 else None
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        start = time.perf_counter()
+        all_policies = await crawl_policy_list_pages(fetcher, base_url, parser, tracker, checkpoint)
+        targets = []
+        revalidating = set()
+        for policy in all_policies:
+            if not policy["policy_id"]:
+                continue
+            if policy["policy_id"] in skip_ids:
+                if policy["policy_id"] in revalidate_ids:
+                    targets.append(policy)
+                    # 목록에 같은 정책이 두 번 나와도 재검증은 한 번만
+                    revalidate_ids.discard(policy["policy_id"])
+                    revalidating.add(policy["policy_id"])
+                else:
+                    print(f"[중복 - ID 기준] '{policy['policy_id']}' 이미 저장되어 건너뜀")
+                continue
+            targets.append(policy)
+            # 목록에 같은 정책이 두 번 나와도 상세 페이지는 한 번만 요청
+            skip_ids.add(policy["policy_id"])
+
+        async def fetch_detail(policy: Dict[str, Any]) -> Dict[str, Any]:
+            if checkpoint is not None:
+                restored = checkpoint.fetched_result(policy)
+                if restored is not None:
+                    return restored
+            result = await crawl_policy_detail(fetcher, policy, base_url, parser,
+                                               revalidate=policy["policy_id"] in revalidating)
+            if checkpoint is not None:
+                checkpoint.record_fetched(result)
+            return result
+
+        results = await asyncio.gather(*(fetch_detail(policy) for policy in targets))
+        elapsed = time.perf_counter() - start
+        logger.info(f"비동기 크롤링 완료: 목록 {len(all_policies)}개, 상세 {len(results)}개 (재검증 {len(revalidating)}), {elapsed:.1f}초 "
+                    f"(요청 {fetcher.stats.requests}, 재시도 {fetcher.stats.retries}, 실패 {fetcher.stats.failures}, "
+                    f"캐시 재사용 {fetcher.stats.status_counts.get(304, 0)})")
+    return all_policies, results
+
+
+# ✅ 동기 코드에서 호출하는 진입점
+def run_crawl(skip_ids: Iterable[str] = (), base_url: str = BASE_URL, parser: Optional[str] = None,
+              stop_after_known: int = 0, checkpoint: Optional[CrawlCheckpoint] = None,
+              revalidate_ids: Iterable[str] = (),
+              **fetcher_options) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    return asyncio.run(crawl_all_policies(skip_ids, base_url, parser, stop_after_known, checkpoint,
+                                          revalidate_ids, **fetcher_options))
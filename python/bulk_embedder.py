@@ -0,0 +1,216 @@
+# bulk_embedder.py
+"""
+전체 재색인(full rebuild)처럼 대량의 청크를 임베딩할 때,
+청크 배치를 여러 워커 프로세스에 나누어 처리하는 임베딩 래퍼를 제공합니다.
+
+GPU가 없는 서버에서는 get_embedding_model이 'cpu'로 동작하며,
+하나의 프로세스가 모든 청크를 순서대로 임베딩하기 때문에 코어를 충분히 활용하지 못합니다.
+
+- 워커 프로세스는 시작 시 한 번만 모델을 로드 (torch intra-op 스레드 수 조정)
+- 청크 길이에 따라 배치 크기를 조절 (짧은 청크는 크게, 긴 청크는 작게 묶어 패딩 낭비를 줄임)
+- 처리량(chunks/sec)을 로그로 보고
+
+질의(embed_query)와 소량의 문서 임베딩은 기존처럼 현재 프로세스의 모델을 그대로 사용합니다.
+"""
+import os
+import time
+# 워커 프로세스 풀
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+# 로거
+import logging
+
+# LangChain 임베딩 인터페이스
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 워커 프로세스마다 한 번 로드되는 임베딩 모델 (_init_worker에서 할당)
+_worker_embeddings = None
+
+
+# 물리 코어 수 반환 (psutil이 없으면 논리 코어 수로 대체)
+def get_physical_core_count() -> int:
+    try:
+        import psutil
+        count = psutil.cpu_count(logical=False)
+    except ImportError:
+        count = None
+    return count or os.cpu_count() or 1
+
+
+# 워커 프로세스 초기화: 연산 스레드 수 설정 후 임베딩 모델을 1회 로드
+def _init_worker(model_name: str, torch_threads: int):
+    global _worker_embeddings
+    if settings.EMBEDDING_BACKEND == "onnx":
+        # ONNX 백엔드는 torch 없이 onnxruntime 세션의 스레드 수로 조정
+        from onnx_embeddings import OnnxEmbeddings
+        _worker_embeddings = OnnxEmbeddings(intra_op_threads=torch_threads)
+        return
+
+    import torch
+    torch.set_num_threads(torch_threads)
+    try:
+        # 프로세스 단위로 병렬화하므로 inter-op 병렬은 끔
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 이미 병렬 작업이 시작된 뒤에는 변경할 수 없음
+        pass
+    # 워커 안에서는 rag_utils의 기존 로더를 그대로 사용 (공유 임베딩 서버가 아닌 실제 모델)
+    from rag_utils import get_embedding_model
+    _worker_embeddings = get_embedding_model(model_name=model_name, use_server=False)
+
+
+# 워커에서 실행: 배치 1개 임베딩
+def _embed_batch(batch_indexes: List[int], texts: List[str]) -> tuple[List[int], List[List[float]]]:
+    return batch_indexes, _worker_embeddings.embed_documents(texts)
+
+
+# 청크 길이에 따라 배치를 구성해서 원본 인덱스 리스트의 리스트로 반환
+# 길이 순으로 정렬한 뒤, (배치 내 청크 수 x 배치 내 최장 길이)가 char_budget을 넘지 않도록 묶음
+def make_adaptive_batches(texts: List[str],
+                          max_batch_size: int = settings.EMBEDDING_BULK_MAX_BATCH,
+                          char_budget: int = settings.EMBEDDING_BULK_CHAR_BUDGET) -> List[List[int]]:
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    longest = 1
+
+    for idx in order:
+        if current and (len(current) >= max_batch_size or (len(current) + 1) * longest > char_budget):
+            batches.append(current)
+            current = []
+        if not current:
+            # 길이 내림차순이므로 배치의 최장 길이는 첫 청크의 길이
+            longest = max(len(texts[idx]), 1)
+        current.append(idx)
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class BulkEmbeddings(Embeddings):
+    """
+    기존 임베딩 모델을 감싸서, 대량 embed_documents 호출만 워커 프로세스 풀로 분산합니다.
+    프로세스 풀은 처음 필요할 때 생성되며, close()로 종료합니다.
+    """
+    def __init__(self,
+                 base_embeddings: Embeddings,
+                 model_name: str = settings.EMBEDDING_MODEL_NAME,
+                 num_workers: int = settings.EMBEDDING_BULK_WORKERS,
+                 torch_threads: int = settings.EMBEDDING_BULK_TORCH_THREADS,
+                 min_chunks: int = settings.EMBEDDING_BULK_MIN_CHUNKS,
+                 max_batch_size: int = settings.EMBEDDING_BULK_MAX_BATCH,
+                 char_budget: int = settings.EMBEDDING_BULK_CHAR_BUDGET):
+        self.base_embeddings = base_embeddings
+        self.model_name = model_name
+        self.torch_threads = max(1, torch_threads)
+        # 워커 수를 지정하지 않았으면 물리 코어를 워커별 스레드 수로 나눠서 사용
+        self.num_workers = num_workers or max(1, get_physical_core_count() // self.torch_threads)
+        self.min_chunks = min_chunks
+        self.max_batch_size = max_batch_size
+        self.char_budget = char_budget
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 마지막 대량 임베딩의 처리량 정보
+        self.last_stats: Dict[str, Any] = {}
+
+    # 질의 임베딩은 항상 현재 프로세스의 모델 사용
+    def embed_query(self, text: str) -> List[float]:
+        return self.base_embeddings.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) < self.min_chunks or self.num_workers <= 1:
+            return self.base_embeddings.embed_documents(texts)
+        return self._embed_documents_parallel(texts)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            logger.info(f"대량 임베딩 워커 풀 시작 (워커: {self.num_workers}개, 워커당 torch 스레드: {self.torch_threads})")
+            # torch는 fork 이후 스레드 풀 상태가 꼬일 수 있으므로 spawn 방식 사용
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.torch_threads)
+            )
+        return self._executor
+
+    def _embed_documents_parallel(self, texts: List[str]) -> List[List[float]]:
+        batches = make_adaptive_batches(texts, self.max_batch_size, self.char_budget)
+        logger.info(f"대량 임베딩 시작: 청크 {len(texts)}개 -> 배치 {len(batches)}개 (워커 {self.num_workers}개)")
+
+        executor = self._get_executor()
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        start_time = time.perf_counter()
+        last_report_time = start_time
+        done_chunks = 0
+
+        futures = [
+            executor.submit(_embed_batch, batch, [texts[i] for i in batch])
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            batch_indexes, vectors = future.result()
+            for idx, vector in zip(batch_indexes, vectors):
+                results[idx] = vector
+            done_chunks += len(batch_indexes)
+
+            now = time.perf_counter()
+            # 진행 상황은 최대 5초에 한 번만 출력
+            if now - last_report_time >= 5:
+                rate = done_chunks / (now - start_time)
+                logger.info(f"대량 임베딩 진행: {done_chunks}/{len(texts)} 청크 ({rate:.1f} chunks/sec)")
+                last_report_time = now
+
+        elapsed = time.perf_counter() - start_time
+        self.last_stats = {
+            "chunks": len(texts),
+            "batches": len(batches),
+            "workers": self.num_workers,
+            "torch_threads": self.torch_threads,
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(len(texts) / elapsed, 2) if elapsed > 0 else None,
+        }
+        logger.info(f"대량 임베딩 완료: {len(texts)}개 청크, {elapsed:.1f}초 ({self.last_stats['chunks_per_sec']} chunks/sec)")
+        return results
+
+    # 워커 풀 종료 (모델 메모리 반환)
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            logger.info("대량 임베딩 워커 풀 종료.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# 임베딩 모델이 실행되는 디바이스 반환
+# 다른 래퍼(base_embeddings 속성)로 감싸져 있으면 실제 모델까지 따라가서 확인
+def get_embedding_device(embeddings: Embeddings) -> str:
+    while hasattr(embeddings, "base_embeddings"):
+        embeddings = embeddings.base_embeddings
+    return getattr(embeddings, "model_kwargs", {}).get("device", "cpu")
+
+
+# 설정과 디바이스에 따라 BulkEmbeddings로 감싸거나 원래 모델을 그대로 반환
+def wrap_for_bulk_embedding(embeddings: Embeddings,
+                            model_name: str = settings.EMBEDDING_MODEL_NAME) -> Embeddings:
+    if not settings.EMBEDDING_BULK_ENABLED:
+        return embeddings
+    # 공유 임베딩 서버를 쓰는 워커는 모델이 없으므로 분산하지 않음
+    if getattr(embeddings, "is_remote", False):
+        return embeddings
+    # GPU에서는 하나의 프로세스가 배치를 처리하는 편이 더 빠름
+    device = get_embedding_device(embeddings)
+    if device != "cpu":
+        logger.info(f"임베딩 디바이스가 '{device}'이므로 멀티 프로세스 대량 임베딩을 사용하지 않습니다.")
+        return embeddings
+    return BulkEmbeddings(embeddings, model_name=model_name)
@@ -69,6 +69,115 @@ class Settings(BaseSettings):
     MAX_CHAT_HISTORY_FILE_AGE_DAYS: int = 7 # 7일
     # MAX_CHAT_HISTORY_FILE_AGE_MINUTES: int = 3 # 테스트 코드, 3분
 
+    # 대량 임베딩(전체 재색인) 설정 - bulk_embedder.py
+    EMBEDDING_BULK_ENABLED: bool = True # 대량 청크 임베딩 시 멀티 프로세스 사용 여부
+    EMBEDDING_BULK_WORKERS: int = 0 # 워커 프로세스 수, 0이면 물리 코어 수 기준 자동 계산
+    EMBEDDING_BULK_TORCH_THREADS: int = 2 # 워커 1개당 torch intra-op 스레드 수
+    EMBEDDING_BULK_MIN_CHUNKS: int = 256 # 이 개수 미만이면 현재 프로세스에서 그대로 임베딩
+    EMBEDDING_BULK_MAX_BATCH: int = 64 # 배치 1개의 최대 청크 수
+    EMBEDDING_BULK_CHAR_BUDGET: int = 32768 # 배치 1개의 (청크 수 x 최장 청크 길이) 상한
+
+    # 임베딩 백엔드 설정 - onnx_embeddings.py
+    EMBEDDING_BACKEND: str = "torch" # "torch" : HuggingFaceEmbeddings | "onnx" : ONNX Runtime (CPU)
+    ONNX_MODEL_DIR: Path = BASE_DIR / "onnx_kure_model" # export_onnx_model 결과물 경로
+    ONNX_USE_INT8: bool = True # 동적 int8 양자화 모델 사용 여부
+    ONNX_INTRA_OP_THREADS: int = 0 # ONNX Runtime 스레드 수, 0이면 런타임 기본값
+    ONNX_MAX_SEQ_LENGTH: int = 0 # 토큰 최대 길이 (초과분은 잘라냄), 0이면 원본 모델의 max_seq_length 사용 (KURE-v1: 8192)
+    ONNX_MIN_COSINE: float = 0.99 # torch 백엔드 벡터와의 허용 오차 (코사인 유사도 하한)
+
+    # 질문 임베딩 마이크로 배칭 설정 - embedding_batcher.py
+    EMBEDDING_MICRO_BATCHING: bool = True # 동시 질문 임베딩을 모아서 배치로 처리할지 여부
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0 # 첫 요청 이후 배치를 모으는 최대 대기 시간 (ms)
+    EMBEDDING_BATCH_MAX_SIZE: int = 16 # 배치 1개의 최대 질문 수
+
+    # 공유 임베딩 서버 설정 - embedding_server.py
+    EMBEDDING_SERVER_SOCKET: str = "" # Unix 소켓 경로, 비어있으면 워커마다 모델을 직접 로드
+    EMBEDDING_SERVER_TIMEOUT: float = 30.0 # 임베딩 서버 요청 타임아웃 (초)
+
+    # 빠른 시작 설정 - main.py
+    # "eager" : 시작 시 파이프라인 초기화 완료 후 요청 수신 (기존 동작)
+    # "background" : 요청을 바로 받으면서 백그라운드에서 초기화
+    # "lazy" : 첫 /ask 요청 시 초기화
+    PIPELINE_INIT_MODE: str = "eager"
+    IMPORT_TIME_BUDGET_MS: int = 1500 # import_budget.py에서 'import main'에 허용하는 시간 (ms)
+
+    # 벡터 저장소 백엔드 설정 - vector_store.py
+    # "chroma" : Chroma (기존 동작) | "mmap" : memory-map 기반 프로세스 내부 저장소
+    # 백엔드를 바꾸면 기존 저장소와 호환되지 않으므로 force_create_db로 다시 생성해야 함
+    VECTORSTORE_BACKEND: str = "chroma"
+    VECTOR_ANN_MODE: str = "none" # "none" : 전체 벡터 정확 검색 | "ivf" : IVF 근사 검색 (mmap 전용)
+    VECTOR_ANN_MIN_COUNT: int = 50000 # 청크 수가 이 값 이상일 때만 IVF 인덱스 생성
+    VECTOR_IVF_NLIST: int = 0 # IVF 군집 수, 0이면 4 x sqrt(청크 수)로 자동 계산
+    VECTOR_IVF_NPROBE: int = 16 # 검색 시 확인할 군집 수 (클수록 정확하고 느림)
+    # 벡터 저장 형식 (mmap 전용) "float32" | "float16" : 1/2 크기, 검색은 float32보다 느림 | "int8" : 1/4 크기, 검색도 빠름
+    VECTOR_STORAGE_DTYPE: str = "float32"
+    # float16/int8 저장 시 상위 후보를 float32 원본으로 재채점할지 여부
+    # 켜면 float32 원본(vectors_f32.npy)을 함께 저장하므로 디스크 사용량이 float32 저장보다 커짐 (검색 정확도가 더 필요할 때만 사용)
+    VECTOR_RESCORE_FLOAT32: bool = False
+    VECTOR_RESCORE_FACTOR: int = 4 # 재채점할 후보 수 = k x 이 값
+
+    # 하이브리드(BM25 + 벡터) 검색 설정 - lexical_index.py
+    HYBRID_SEARCH_ENABLED: bool = True # BM25 결과를 벡터 검색 결과와 RRF로 결합할지 여부
+    HYBRID_FETCH_K: int = 20 # 결합 전에 벡터/BM25 검색에서 각각 가져올 후보 수
+    HYBRID_RRF_K: int = 60 # RRF 상수 (클수록 하위 순위 결과의 영향이 커짐)
+    HYBRID_TITLE_FAST_PATH: bool = True # 질문이 정책 제목과 일치하면 벡터 검색 없이 바로 반환
+    LEXICAL_INDEX_PATH: Path = BASE_DIR / "lexical_index.pkl"
+    LEXICAL_BM25_K1: float = 1.5
+    LEXICAL_BM25_B: float = 0.75
+    LEXICAL_MAX_DF_RATIO: float = 0.5 # 전체 청크 중 이 비율 이상에 등장하는 단어는 검색에서 제외
+
+    # 프롬프트 문맥 구성 설정 - context_builder.py
+    CONTEXT_MMR_ENABLED: bool = True # 후보 청크 중 MMR로 SEARCH_K개를 선택할지 여부
+    CONTEXT_CANDIDATE_K: int = 8 # MMR 사용 시 검색기에서 가져올 후보 청크 수
+    CONTEXT_MMR_LAMBDA: float = 0.7 # 1에 가까울수록 관련도, 0에 가까울수록 다양성 우선
+
+    # 프롬프트 토큰 예산 설정 - prompt_packer.py
+    PROMPT_TOKEN_BUDGET: int = 3000 # 질문 + 문맥 + 대화 기록에 허용하는 최대 토큰 수 (템플릿 고정 문구 제외)
+    PROMPT_TOKENIZER_PATH: str = "" # 토큰 계산용 tokenizer.json 경로, 비어있으면 ONNX 변환 결과물 또는 임베딩 모델 토크나이저 사용
+    PROMPT_CHARS_PER_TOKEN: float = 1.5 # 토크나이저를 사용할 수 없을 때 토큰 수 추정에 쓰는 문자 수
+
+    # Cross-encoder rerank 설정 - reranker.py
+    RERANK_ENABLED: bool = False # 검색 후보를 cross-encoder로 다시 채점할지 여부
+    RERANKER_MODEL_NAME: str = "bongsoo/albert-small-kor-cross-encoder-v1" # 작은 한국어 cross-encoder
+    RERANK_CANDIDATE_K: int = 20 # rerank 사용 시 검색기에서 가져올 후보 청크 수
+    RERANK_MAX_LENGTH: int = 512 # (질문, 청크) 쌍의 최대 토큰 길이
+    RERANK_CACHE_SIZE: int = 4096 # (질문, 청크 ID) 점수 캐시 크기
+    RERANK_LATENCY_BUDGET_MS: float = 300.0 # 예상 rerank 시간이 이 값을 넘으면 건너뜀
+    RERANK_MAX_CONCURRENT: int = 2 # 동시에 처리 중인 rerank가 이 값 이상이면 건너뜀
+    RERANK_PROBE_AFTER_SKIPS: int = 20 # 예산 초과로 연속 이 횟수만큼 건너뛰면 한 번 실제로 rerank해서 예상 시간을 다시 측정
+    RERANK_PROBE_INTERVAL_SECONDS: float = 30.0 # 마지막 측정 후 이 시간(초)이 지났으면 예산 초과여도 한 번 다시 측정
+
+    # 메타데이터 사전 필터 설정 - policy_metadata.py
+    FILTER_INFERENCE_ENABLED: bool = True # /ask에 필터가 없을 때 질문에서 분류/지역/신청 가능 여부를 추론할지 여부
+
+    # 구조화 정책 저장소 빠른 답변 설정 - policy_store.py
+    INTENT_ROUTER_ENABLED: bool = True # (정책, 항목)이 명확한 질문을 LLM 없이 저장된 항목 내용으로 답변할지 여부
+    INTENT_ROUTER_MIN_TITLE_CHARS: int = 4 # 질문에서 정책 제목으로 인정할 최소 길이 (정규화 후, 짧은 제목의 오인식 방지)
+
+    # 검색 생략 라우팅 설정 - query_router.py
+    QUERY_ROUTER_ENABLED: bool = True # 인사/잡담은 검색 없이, 직전 답변에 대한 후속 질문은 직전 문맥을 재사용해서 답변할지 여부
+    QUERY_CONTEXT_CACHE_SIZE: int = 1024 # 직전 검색 문맥을 보관할 최대 사용자 수
+    QUERY_CONTEXT_CACHE_TTL_SECONDS: float = 1800.0 # 직전 검색 문맥 유지 시간 (초)
+
+    # 미리 생성한 답변 설정 - answer_precompute.py
+    ANSWER_STORE_ENABLED: bool = True # /ask에서 미리 생성한 (정책 x 대표 질문) 답변을 먼저 찾을지 여부
+    ANSWER_STORE_PATH: Path = BASE_DIR / "answer_store" # 코퍼스 manifest 해시별 답변 저장 디렉토리
+    ANSWER_STORE_MIN_SIMILARITY: float = 0.93 # 저장된 질문과의 코사인 유사도가 이 값 이상일 때만 저장된 답변 사용
+    ANSWER_PRECOMPUTE_CONCURRENCY: int = 4 # 답변 미리 생성 시 동시에 처리할 질문 수 (Gemini 동시 호출 수)
+
+    # 코퍼스 핫 리로드 / 벡터 저장소 버전 전환 설정 - corpus_watcher.py, vectorstore_versions.py
+    CORPUS_WATCH_ENABLED: bool = True # DATA_PATH 변경을 감지하면 서버 재시작 없이 재색인 후 검색 구성 요소를 교체할지 여부
+    CORPUS_WATCH_INTERVAL_SECONDS: float = 60.0 # DATA_PATH 변경 확인 주기 (초)
+    VECTORSTORE_VERSIONS_KEEP: int = 3 # 보관할 벡터 저장소 버전 디렉토리 수 (현재 버전 포함, 교체 직전 요청과 rollback에 이전 버전 사용)
+    VECTORSTORE_MIN_COUNT_RATIO: float = 0.5 # 새 버전 청크 수가 현재 버전의 이 비율 미만이면 전환하지 않음 (데이터 대량 유실 방지)
+    VECTORSTORE_SMOKE_QUERIES: int = 20 # 새 버전 검증 시 저장된 청크 본문으로 검색해볼 샘플 수 (0이면 생략)
+    VECTORSTORE_SMOKE_MIN_RECALL: float = 0.8 # 샘플 청크가 자기 본문 검색 결과 상위 SEARCH_K 안에 나와야 하는 비율
+    ADMIN_TOKEN: str = "" # /admin/* 엔드포인트 인증 토큰 (X-Admin-Token 헤더), 비어있으면 /admin/* 비활성화 (404)
+
+    # 오프라인 색인 설정 - indexer.py
+    VECTORSTORE_READ_ONLY: bool = False # True면 API 서버는 색인하지 않고 indexer.py가 만든 현재 버전만 로드 (CURRENT 변경 시 다시 로드)
+    INDEXER_BATCH_CHUNKS: int = 1024 # 한 번에 임베딩해서 저장할 청크 수 (진행 상황 출력 단위)
+
     # GOOGLE_API_KEY와 HF_TOKEN 필드에 대한 유효성 검사 및 전처리
     # .env 파일 내부에 저장된 GOOGLE_API_KEY가 모종의 이유로 문자열 앞 뒤에 ''가 포함된 상태로 할당됨
     # 이를 해결하기 위해 해당 코드로 전처리를 진행
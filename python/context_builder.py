@@ -0,0 +1,157 @@
+# context_builder.py
+"""
+검색된 청크로 LLM 프롬프트의 문맥(context) 문자열을 구성합니다.
+
+검색 상위 청크는 대부분 같은 정책(파일)에서 나오고, 인접 청크끼리는 CHUNK_OVERLAP만큼 내용이 겹칩니다.
+이를 그대로 이어 붙이면 같은 문장이 프롬프트에 여러 번 들어가 토큰 수와 LLM 응답 시간이 늘어납니다.
+
+1. MMR(Maximal Marginal Relevance) : 후보 청크 중에서 관련도는 높고 서로 덜 비슷한 청크를 SEARCH_K개 선택
+   - 청크 간 유사도는 벡터 저장소에 저장된 임베딩을 그대로 사용 (추가 임베딩 계산 없음)
+   - 관련도는 검색기가 돌려준 순위를 사용 (하이브리드 검색의 RRF 순위도 그대로 반영)
+2. 같은 정책의 청크는 chunk_index 순서로 정렬하고, 인접 청크의 겹치는 부분(overlap)은 한 번만 남기고 병합
+3. 다른 청크에 완전히 포함된 청크는 제거
+"""
+import threading
+from typing import List, Dict, Any, Optional
+# 로거
+import logging
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import settings
+from lexical_index import get_chunk_id
+
+logger = logging.getLogger(__name__)
+
+# 겹침 탐색 시 다음 청크의 앞부분에서 찾아볼 길이 (문자)
+_OVERLAP_PROBE_CHARS = 30
+
+
+# MMR로 k개 청크 선택 (반환: docs의 인덱스 리스트, 선택 순서 = 우선순위)
+# relevance : 검색 순위 기반 관련도 (1위 1.0 -> 마지막 순위로 갈수록 감소)
+def select_mmr(embeddings: np.ndarray, k: int, lambda_mult: float = settings.CONTEXT_MMR_LAMBDA) -> List[int]:
+    count = len(embeddings)
+    if count <= k:
+        return list(range(count))
+    vectors = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+    similarity = vectors @ vectors.T
+    relevance = 1.0 - np.arange(count) / count
+
+    selected = [0]
+    max_similarity = similarity[0].copy()
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return selected
+
+
+# first 끝부분과 second 앞부분이 겹치면 겹치는 부분을 한 번만 남긴 문자열, 겹치지 않으면 None
+def merge_overlap(first: str, second: str, max_overlap: int = settings.CHUNK_OVERLAP * 2) -> Optional[str]:
+    probe = second[:_OVERLAP_PROBE_CHARS]
+    if not probe:
+        return first
+    search_from = max(0, len(first) - max_overlap - len(probe))
+    position = first.find(probe, search_from)
+    while position != -1:
+        tail = first[position:]
+        if second.startswith(tail):
+            return first + second[len(tail):]
+        position = first.find(probe, position + 1)
+    return None
+
+
+# 같은 정책(policy_id, 없으면 relative_path)의 청크를 chunk_index 순서로 모아서 겹침을 제거한 문맥 블록 리스트로 변환
+# 블록 순서는 각 정책에서 가장 먼저 선택된 청크의 순서를 따름
+def merge_policy_chunks(docs: List[Document]) -> List[str]:
+    groups: Dict[str, List[Document]] = {}
+    for doc in docs:
+        key = doc.metadata.get("policy_id") or doc.metadata.get("relative_path") or doc.metadata.get("source") or id(doc)
+        groups.setdefault(key, []).append(doc)
+
+    blocks: List[str] = []
+    for group in groups.values():
+        group.sort(key=lambda d: d.metadata.get("chunk_index", 0))
+        texts: List[str] = []
+        previous_index: Optional[int] = None
+        for doc in group:
+            text = doc.page_content.strip()
+            if not text or any(text in existing for existing in texts):
+                continue
+            index = doc.metadata.get("chunk_index")
+            merged = None
+            if texts and previous_index is not None and index is not None and index - previous_index == 1:
+                merged = merge_overlap(texts[-1], text)
+            if merged is not None:
+                texts[-1] = merged
+            else:
+                texts.append(text)
+            previous_index = index
+        if texts:
+            blocks.append("\n".join(texts))
+    return blocks
+
+
+class ContextBuilder:
+    """
+    검색 결과 청크 -> 프롬프트 문맥 문자열.
+    vectorstore.get(ids, include=["embeddings"])로 저장된 임베딩을 읽어 MMR에 사용합니다.
+    """
+    def __init__(self, vectorstore, k: int = settings.SEARCH_K, mmr_enabled: bool = settings.CONTEXT_MMR_ENABLED):
+        self.vectorstore = vectorstore
+        self.k = k
+        self.mmr_enabled = mmr_enabled
+        # 지표
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._chars_before = 0
+        self._chars_after = 0
+
+    # 후보 청크들의 저장된 임베딩 조회 (ID가 없거나 조회 실패 시 None)
+    def _stored_embeddings(self, docs: List[Document]) -> Optional[np.ndarray]:
+        ids = [get_chunk_id(doc) for doc in docs]
+        try:
+            stored = self.vectorstore.get(ids=ids, include=["embeddings"])
+        except Exception as e:
+            logger.warning(f"MMR용 임베딩 조회 실패, 검색 순서대로 사용합니다: {e}")
+            return None
+        by_id = dict(zip(stored["ids"], stored["embeddings"]))
+        if len(by_id) != len(set(ids)):
+            return None
+        return np.asarray([by_id[doc_id] for doc_id in ids], dtype=np.float32)
+
+    # 후보 청크 중 k개를 고르고 병합해서 문맥 블록 리스트 반환 (관련도가 높은 블록부터)
+    def build_blocks(self, docs: List[Document]) -> List[str]:
+        selected = docs[:self.k]
+        if self.mmr_enabled and len(docs) > self.k:
+            embeddings = self._stored_embeddings(docs)
+            if embeddings is not None:
+                selected = [docs[i] for i in select_mmr(embeddings, self.k)]
+
+        blocks = merge_policy_chunks(selected)
+
+        chars_before = sum(len(doc.page_content) for doc in docs[:self.k])
+        chars_after = sum(len(block) for block in blocks)
+        with self._stats_lock:
+            self._requests += 1
+            self._chars_before += chars_before
+            self._chars_after += chars_after
+        logger.debug(f"문맥 구성: 후보 {len(docs)}개 -> 선택 {len(selected)}개, {chars_before}자 -> {chars_after}자")
+        return blocks
+
+    # 문맥 블록을 하나의 문자열로 반환
+    def build(self, docs: List[Document]) -> str:
+        return "\n\n".join(self.build_blocks(docs))
+
+    # 누적 지표 반환 (chars_before : 상위 k개 청크를 그대로 이어 붙였을 때의 길이)
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "requests": self._requests,
+                "avg_chars_before": round(self._chars_before / self._requests, 1) if self._requests else 0,
+                "avg_chars_after": round(self._chars_after / self._requests, 1) if self._requests else 0,
+                "reduction_ratio": round(1 - self._chars_after / self._chars_before, 4) if self._chars_before else 0,
+            }
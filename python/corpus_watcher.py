@@ -0,0 +1,104 @@
+# corpus_watcher.py
+"""
+서버 실행 중 DATA_PATH의 데이터 파일 변경을 감지해서 RAGPipeline.reindex()를 실행하는 백그라운드 스레드입니다.
+새로 크롤링한 정책을 반영하려고 워커를 재시작(임베딩 모델 재로드, 처리 중인 요청 중단)하지 않아도 됩니다.
+
+- CORPUS_WATCH_INTERVAL_SECONDS마다 데이터 파일의 (경로, 수정 시각, 크기)를 먼저 비교하고,
+  달라졌을 때만 파일 해시로 manifest 해시를 계산 (변경이 없으면 파일 내용을 읽지 않음)
+- 크롤러가 아직 파일을 쓰는 중일 수 있으므로 같은 manifest 해시가 두 번 연속 확인될 때 재색인
+- inotify 등 OS별 파일 이벤트 대신 폴링을 사용 (Windows 개발 환경과 네트워크 파일 시스템에서도 동일하게 동작)
+
+- 다른 워커나 indexer.py, vectorstore_versions.py rollback이 CURRENT 버전을 바꾸면 그 버전을 로드
+  (VECTORSTORE_READ_ONLY이면 데이터 파일은 확인하지 않고 CURRENT 변경만 확인)
+
+재색인은 /admin/reindex 엔드포인트(main.py)로도 바로 실행할 수 있습니다.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+# 로거
+import logging
+
+from config import settings
+from data_manager import scan_data_directory, calculate_manifest_hash
+from vectorstore_versions import active_vectorstore_path
+
+logger = logging.getLogger(__name__)
+
+
+# 데이터 디렉토리 파일들의 (상대 경로, 수정 시각, 크기) 목록 (.crawl_state, .http_cache 등 숨김 디렉토리 제외)
+def stat_signature(data_path: Path) -> Tuple[Tuple[str, int, int], ...]:
+    entries = []
+    for root, dirs, files in os.walk(data_path):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for filename in files:
+            try:
+                stat = os.stat(os.path.join(root, filename))
+            except OSError:
+                continue
+            entries.append((os.path.relpath(os.path.join(root, filename), data_path), stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(entries))
+
+
+class CorpusWatcher:
+    def __init__(self, pipeline, interval_seconds: float = settings.CORPUS_WATCH_INTERVAL_SECONDS):
+        self.pipeline = pipeline
+        self.interval_seconds = max(1.0, interval_seconds)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_signature: Optional[Tuple[Tuple[str, int, int], ...]] = None
+        # 한 번 관찰된 새 manifest 해시 (다음 확인에서도 같으면 재색인)
+        self._pending_hash: Optional[str] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._last_signature = stat_signature(self.pipeline.data_path)
+        self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"코퍼스 변경 감시 시작: '{self.pipeline.data_path}' ({self.interval_seconds:.0f}초 간격)")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"코퍼스 변경 확인 중 오류 발생: {e}", exc_info=True)
+
+    # 변경을 확인하고 필요하면 재색인 (재색인하지 않았으면 None 반환)
+    def check(self) -> Optional[Dict[str, Any]]:
+        # 다른 프로세스가 CURRENT를 바꿨으면 데이터 변경과 관계없이 바로 그 버전을 로드
+        if active_vectorstore_path(Path(self.pipeline.vectorstore_path)) != Path(self.pipeline.corpus_store_path):
+            result = self.pipeline.reindex()
+            logger.info(f"현재 벡터 저장소 버전 변경 반영 결과: {result}")
+            return result
+        if settings.VECTORSTORE_READ_ONLY:
+            return None
+
+        signature = stat_signature(self.pipeline.data_path)
+        if signature == self._last_signature and self._pending_hash is None:
+            return None
+        self._last_signature = signature
+
+        manifest_hash = calculate_manifest_hash(scan_data_directory(self.pipeline.data_path))
+        if manifest_hash == self.pipeline.corpus_manifest_hash:
+            self._pending_hash = None
+            return None
+        if manifest_hash != self._pending_hash:
+            logger.info(f"데이터 파일 변경 감지 (manifest {manifest_hash[:12]}), 다음 확인에서 변경이 없으면 재색인합니다.")
+            self._pending_hash = manifest_hash
+            return None
+
+        result = self.pipeline.reindex()
+        logger.info(f"코퍼스 재색인 결과: {result}")
+        # 실패했거나 다른 재색인이 실행 중이었으면 다음 확인에서 다시 시도 (검증 실패(rejected)는 데이터가 다시 바뀔 때까지 대기)
+        if result["status"] not in ("busy", "failed"):
+            self._pending_hash = None
+        return result
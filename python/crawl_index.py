@@ -0,0 +1,93 @@
+# crawl_index.py
+"""
+증분 크롤링을 위한 저장된 정책 ID 색인과 목록 페이지 조기 종료 판단.
+
+- PolicyIdIndex : 이미 저장한 정책 ID -> {제목, 저장 파일} (policy_id_index.json)
+  매번 your_data_file*.txt 전체를 정규식으로 다시 읽는 대신 색인 파일만 읽음
+  (색인 파일이 없으면 기존 데이터 파일을 한 번 스캔해서 생성)
+- KnownRunTracker : 목록은 등록일 역순(regYmd desc)이므로, 이미 저장한 정책이
+  연속으로 N개 나오면 그 뒤는 모두 저장된 정책으로 보고 목록 순회를 중단
+
+이 모듈은 크롤러에서 사용하므로 표준 라이브러리만 사용합니다.
+"""
+import re
+import json
+import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Iterable
+
+POLICY_ID_INDEX_FILENAME = "policy_id_index.json"
+# 증분 크롤링 시 목록 순회를 중단할 연속된 기존 정책 수 기본값
+DEFAULT_STOP_AFTER_KNOWN = 20
+
+_POLICY_ID_PATTERN = re.compile(r"plcyBizId=([^&\s]+)")
+
+
+class PolicyIdIndex:
+    def __init__(self, base_dir: Path, data_files: Iterable[str] = ()):
+        self.path = Path(base_dir) / POLICY_ID_INDEX_FILENAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.is_file():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        else:
+            # 색인 파일이 없으면 기존 데이터 파일에서 한 번만 생성
+            for file_path in data_files:
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            match = _POLICY_ID_PATTERN.search(line)
+                            if match:
+                                self.entries.setdefault(match.group(1).strip(), {"file": Path(file_path).name})
+                except FileNotFoundError:
+                    pass
+            self.save()
+            print(f"📇 정책 ID 색인 생성: {len(self.entries)}개 ({self.path})")
+
+    def __contains__(self, policy_id: str) -> bool:
+        return policy_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def ids(self) -> set:
+        return set(self.entries)
+
+    def add(self, policy_id: str, title: str, file_path: str):
+        self.entries[policy_id] = {
+            "title": title,
+            "file": Path(file_path).name,
+            "saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    # 임시 파일에 쓴 뒤 교체 (저장 중 중단되어도 이전 색인 유지)
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        tmp_path.replace(self.path)
+
+
+class KnownRunTracker:
+    """
+    목록 페이지의 정책을 순서대로 받아서, 이미 저장한 정책이 stop_after개 연속으로 나오면 중단 신호를 반환합니다.
+    stop_after가 0 이하이면 중단하지 않습니다 (전체 순회).
+    """
+    def __init__(self, known_ids: Iterable[str], stop_after: int = DEFAULT_STOP_AFTER_KNOWN):
+        self.known_ids = set(known_ids)
+        self.stop_after = stop_after
+        self.run = 0
+
+    # 목록 페이지 하나의 정책 리스트 -> 목록 순회를 중단해야 하면 True
+    def feed(self, page_policies: List[Dict[str, Any]]) -> bool:
+        if self.stop_after <= 0:
+            return False
+        for policy in page_policies:
+            if policy["policy_id"] in self.known_ids:
+                self.run += 1
+                if self.run >= self.stop_after:
+                    return True
+            else:
+                self.run = 0
+        return False
@@ -0,0 +1,143 @@
+# crawl_state.py
+"""
+중단된 크롤링을 이어서 실행하기 위한 체크포인트 (DataCollection.py --resume).
+
+크롤링 진행 상황을 데이터 디렉토리의 .crawl_state/ 아래 추가 전용(append-only) JSONL 파일에 기록합니다.
+- list.jsonl    : 처리한 목록 페이지 번호와 그 페이지의 정책 리스트, 목록 순회 완료 여부
+- fetched.jsonl : 받아온 상세 페이지 파싱 결과 (아직 저장하지 않았어도 다시 요청하지 않음)
+- written.jsonl : 레코드/데이터 파일 저장을 마친 정책 ID/제목/URL/저장 파일과 그 시점의 데이터 파일 번호(file3_index)/파일 내 저장 수(save_count)
+  (파일에 쓰자마자 기록하므로 이어서 실행할 때 같은 정책을 파일에 다시 쓰지 않음)
+- committed.jsonl : DB 커밋까지 마친 정책 ID
+  (이어서 실행할 때 written 중 커밋되지 않은 정책만 DB에 다시 MERGE, 이미 있으면 DB에서 건너뜀)
+
+매 기록마다 전체 상태를 다시 쓰지 않고 한 줄씩 추가하므로 정책 수가 많아도 체크포인트 비용이 일정하고,
+기록 도중 중단되어 마지막 줄이 잘려도 그 줄만 무시합니다.
+크롤링이 정상 종료되면 체크포인트 디렉토리를 삭제합니다.
+
+이 모듈은 크롤러에서 사용하므로 표준 라이브러리만 사용합니다.
+"""
+import json
+import shutil
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+CRAWL_STATE_DIRNAME = ".crawl_state"
+_LIST_FILE = "list.jsonl"
+_FETCHED_FILE = "fetched.jsonl"
+_WRITTEN_FILE = "written.jsonl"
+_COMMITTED_FILE = "committed.jsonl"
+
+
+# JSONL 파일의 각 줄을 읽음 (중단으로 잘린 마지막 줄은 무시)
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    if not path.is_file():
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+class CrawlCheckpoint:
+    def __init__(self, base_dir: Path, resume: bool = False):
+        self.directory = Path(base_dir) / CRAWL_STATE_DIRNAME
+        # 목록 페이지 진행 상황
+        self.list_pages_done = 0
+        self.list_complete = False
+        self.policies: List[Dict[str, Any]] = []
+        # 정책 ID -> 상세 페이지 파싱 결과 {detail_url, title, category, data_store}
+        self.fetched: Dict[str, Dict[str, Any]] = {}
+        # 파일 저장 완료된 정책 ID와 마지막 데이터 파일 분할 위치
+        self.written: set = set()
+        self.written_rows: List[Dict[str, Any]] = []  # [{policy_id, title, url, file}]
+        # DB 커밋 완료된 정책 ID
+        self.committed: set = set()
+        self.file3_index: Optional[int] = None
+        self.save_count = 0
+        self.resumed = False
+
+        if resume and self.directory.is_dir():
+            self._load()
+            self.resumed = True
+            print(f"♻️ 이전 크롤링 이어서 실행: 목록 {self.list_pages_done}페이지"
+                  f"{'(완료)' if self.list_complete else ''}, 정책 {len(self.policies)}개, "
+                  f"상세 {len(self.fetched)}개, 저장 {len(self.written)}개(DB 커밋 {len(self.committed)}개)")
+        else:
+            if self.directory.is_dir():
+                print("🧹 --resume 없이 실행되어 이전 크롤링 체크포인트를 삭제합니다.")
+                shutil.rmtree(self.directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _load(self):
+        for record in _read_jsonl(self.directory / _LIST_FILE):
+            if record.get("complete"):
+                self.list_complete = True
+            else:
+                # 목록 페이지는 순서대로 기록되므로 마지막 페이지 번호가 진행 위치
+                self.list_pages_done = record["page"]
+                self.policies.extend(record["policies"])
+        for record in _read_jsonl(self.directory / _FETCHED_FILE):
+            self.fetched[record["policy_id"]] = record["result"]
+        for record in _read_jsonl(self.directory / _WRITTEN_FILE):
+            self.written.add(record["policy_id"])
+            self.written_rows.append({key: record.get(key, "") for key in ("policy_id", "title", "url", "file")})
+            self.file3_index = record["file3_index"]
+            self.save_count = record["save_count"]
+        for record in _read_jsonl(self.directory / _COMMITTED_FILE):
+            self.committed.add(record["policy_id"])
+
+    def _append(self, filename: str, record: Dict[str, Any]):
+        with open(self.directory / filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # 목록 페이지 처리 완료 기록 (페이지 번호 순서대로 호출)
+    def record_list_page(self, page: int, page_policies: List[Dict[str, Any]]):
+        self.list_pages_done = page
+        self.policies.extend(page_policies)
+        self._append(_LIST_FILE, {"page": page, "policies": page_policies})
+
+    def mark_list_complete(self):
+        self.list_complete = True
+        self._append(_LIST_FILE, {"complete": True})
+
+    # 상세 페이지 크롤링 결과 기록 (오류 결과는 기록하지 않아서 이어서 실행할 때 다시 요청)
+    def record_fetched(self, result: Dict[str, Any]):
+        if "error" in result:
+            return
+        policy_id = result["policy"]["policy_id"]
+        stored = {key: result[key] for key in ("detail_url", "title", "category", "data_store", "revalidated", "not_modified")
+                  if key in result}
+        self.fetched[policy_id] = stored
+        self._append(_FETCHED_FILE, {"policy_id": policy_id, "result": stored})
+
+    # 이전 실행에서 받아온 상세 페이지 결과 (없으면 None)
+    def fetched_result(self, policy: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        stored = self.fetched.get(policy["policy_id"])
+        return {"policy": policy, **stored} if stored is not None else None
+
+    # 레코드/데이터 파일 저장 완료 기록 (file3_index, save_count : 저장 직후의 데이터 파일 분할 위치)
+    def mark_written(self, policy_id: str, file3_index: int, save_count: int, title: str = "", url: str = "",
+                     file: str = ""):
+        self.written.add(policy_id)
+        self.written_rows.append({"policy_id": policy_id, "title": title, "url": url, "file": file})
+        self.file3_index = file3_index
+        self.save_count = save_count
+        self._append(_WRITTEN_FILE, {"policy_id": policy_id, "title": title, "url": url, "file": file,
+                                     "file3_index": file3_index, "save_count": save_count})
+
+    # DB 커밋 완료 기록
+    def mark_committed(self, policy_id: str):
+        self.committed.add(policy_id)
+        self._append(_COMMITTED_FILE, {"policy_id": policy_id})
+
+    # 파일에는 저장했지만 DB 커밋 전에 중단된 정책 행 (이어서 실행할 때 DB에 다시 저장)
+    def uncommitted_rows(self) -> List[Dict[str, Any]]:
+        return [row for row in self.written_rows if row["policy_id"] not in self.committed]
+
+    # 크롤링 정상 종료 시 체크포인트 삭제
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,522 @@
+# crawler_bench.py
+"""
+로컬 replay 서버로 크롤러 처리량과 파싱 결과를 측정하는 벤치마크 스크립트입니다.
+
+실제 사이트에 부하를 주지 않도록(네트워크 없이 실행 가능), 정책 목록/상세 페이지를
+요청마다 지정한 지연 시간(--latency-ms) 후에 응답하는 로컬 HTTP 서버를 띄워서 측정합니다.
+- 페이지 : 생성한 fixture 페이지, 또는 --replay-dir에 녹화해둔 실제 페이지 (list/<페이지>.html, detail/<정책 ID>.html)
+- 오류 주입 : --error-rate 비율의 요청에 503 응답 (--seed로 재현 가능)
+
+측정 항목 (행마다 요청 수, pages/s, 재시도/실패 수, 최대 메모리(tracemalloc))
+- list        : DataCollection.crawl_policy_list로 목록 페이지 순회
+- sections    : DataCollection.crawl_all_sections로 상세 페이지 섹션 크롤링
+- sync-2x     : 이전 DataCollection.py 방식 (상세 페이지를 제목용/섹션용으로 두 번 요청/파싱)
+- sync        : --sync 모드 (목록 -> 상세 페이지를 순서대로, 상세 페이지는 한 번만 요청/파싱)
+- async       : async_crawler.py 전체 크롤링 (연결 풀 + 호스트별 동시 요청/초당 요청 제한 + 재시도)
+- incremental : async 크롤링 직후, 그 결과를 저장된 정책으로 보고 새 정책 --new-policies개가 추가된 상태에서
+                다시 크롤링 (이미 저장한 정책이 연속으로 나오면 목록 순회 중단, fixture 페이지에서만 측정)
+- revalidate  : 같은 정책 상세 페이지를 HTTP 캐시로 다시 요청 (replay 서버는 ETag로 304 응답)
+- resume      : 체크포인트를 기록하면서 async 크롤링을 도중에 중단시킨 뒤 이어서 실행
+                (replay 서버가 전체 크롤링 요청 수의 절반을 응답한 뒤 크롤링을 취소하므로 실행마다 같은 지점에서 중단,
+                 이어서 실행할 때 보낸 요청 수가 전체 크롤링보다 적은지 확인)
+마지막에 파서 백엔드별 상세 페이지 파싱 시간(ms/page)을 출력합니다.
+
+--parse 를 주면 네트워크 없이 상세 페이지 파싱 속도만 파서 백엔드별로 비교합니다.
+--check 를 주면 파서 백엔드 간 결과가 다르거나, 오류 주입 없이 실패한 요청/빈 상세 페이지가 있거나,
+정책 레코드 색인 본문에서 제목이 추출되지 않거나(제목 완전 일치 검색 누락), 이어서 실행한 크롤링의 요청 수가
+전체 크롤링보다 적지 않으면 종료 코드 1로 끝납니다.
+--record 는 실제 사이트의 목록/상세 페이지를 --replay-dir 형식으로 저장합니다 (이 옵션만 외부 네트워크 사용).
+
+python crawler_bench.py --policies 200 --latency-ms 50 --concurrency 8
+python crawler_bench.py --replay-dir ./recorded --error-rate 0.05 --check
+python crawler_bench.py --record ./recorded --record-pages 5
+python crawler_bench.py --parse --parse-dir ./recorded
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from typing import List, Dict, Any, Optional, Callable
+
+import requests
+
+from policy_parser import (
+    build_list_url, build_detail_url, parse_policy_list, parse_policy_detail, resolve_parser, PARSER_BACKENDS
+)
+from async_crawler import run_crawl, AsyncFetcher, FetchStats, crawl_policy_detail, crawl_all_policies
+from crawl_index import DEFAULT_STOP_AFTER_KNOWN
+from http_cache import HttpCache
+from crawl_state import CrawlCheckpoint
+from policy_metadata import build_policy_record, render_policy_record, extract_policy_titles
+# 동기 모드 크롤링 함수 (DataCollection.py --sync와 같은 코드)
+from DataCollection import crawl_policy_list, crawl_all_sections, crawl_policy_detail as crawl_policy_detail_sync
+
+# fixture 목록 페이지당 정책 수 (실제 사이트와 같은 10개)
+ITEMS_PER_PAGE = 10
+# 파싱 시간 측정에 사용할 최대 상세 페이지 수
+PARSE_SAMPLE_PAGES = 200
+# 녹화/replay 디렉토리 구조
+LIST_DIRNAME = "list"
+DETAIL_DIRNAME = "detail"
+# fixture 상세 페이지의 섹션 -> 항목
+_FIXTURE_SECTIONS = {
+    "사업개요": ("사업목적", "사업내용", "신청기간"),
+    "신청자격": ("연령", "거주지", "소득", "기타 요건"),
+    "신청방법": ("신청절차", "제출서류", "신청사이트"),
+    "지원내용": ("지원금액", "지원기간"),
+    "기타": ("문의처", "참고사항"),
+}
+_EMPTY_LIST_HTML = '<html><body><ul class="policy-list"></ul></body></html>'
+
+
+# ✅ fixture 정책 목록 페이지 HTML (등록일 역순: 번호가 큰 정책이 앞, 마지막 페이지 다음은 빈 목록)
+def fixture_list_html(page: int, total_policies: int) -> str:
+    start = (page - 1) * ITEMS_PER_PAGE
+    items = []
+    for n in range(total_policies - 1 - start, max(total_policies - 1 - start - ITEMS_PER_PAGE, -1), -1):
+        items.append(
+            f'<li><span class="bg-blue">일자리</span>'
+            f'<a href="#" class="tit txt-over1" onclick="goView(\'R{n:06d}\');">청년 지원 정책 {n}</a>'
+            f'<em class="txt-over1">서울시 청년을 위한 지원 정책 {n} 설명</em></li>'
+        )
+    return f'<html><body><ul class="policy-list">{"".join(items)}</ul></body></html>'
+
+
+# ✅ fixture 정책 상세 페이지 HTML (실제 페이지처럼 섹션마다 strong.tit + 표)
+def fixture_detail_html(policy_id: str) -> str:
+    sections = []
+    for section, keys in _FIXTURE_SECTIONS.items():
+        rows = "".join(
+            f"<tr><th>{key}</th><td>{policy_id} {key} 내용입니다. 2025.01.01 ~ 2025.12.31&nbsp;자세한 사항은 공고문 참고</td></tr>"
+            for key in keys
+        )
+        sections.append(f'<div class="section"><strong class="tit">{section}</strong>'
+                        f'<table class="form-table form-resp-table"><tbody>{rows}</tbody></table></div>')
+    # 실제 페이지처럼 본문과 관계없는 메뉴/스크립트 영역 포함
+    menu = "".join(f'<li><a href="/menu/{i}">메뉴 {i}</a></li>' for i in range(200))
+    return (f'<html><head><script>var x = 1;</script></head><body><ul class="gnb">{menu}</ul>'
+            f'<div class="view"><strong class="title">청년 지원 정책 {policy_id}</strong>{"".join(sections)}</div>'
+            f'</body></html>')
+
+
+class PageSource:
+    """
+    replay 서버가 응답할 목록/상세 페이지.
+    replay_dir이 없으면 fixture 페이지를 생성하고 (total_policies를 늘리면 새 정책이 목록 앞에 추가됨),
+    있으면 녹화된 파일을 응답합니다 (없는 목록 페이지는 빈 목록, 없는 상세 페이지는 404).
+    """
+    def __init__(self, total_policies: int, replay_dir: Optional[Path] = None):
+        self.total_policies = total_policies
+        self.replay_dir = Path(replay_dir) if replay_dir else None
+
+    @property
+    def is_replay(self) -> bool:
+        return self.replay_dir is not None
+
+    def list_html(self, page: int) -> str:
+        if self.replay_dir is None:
+            return fixture_list_html(page, self.total_policies)
+        path = self.replay_dir / LIST_DIRNAME / f"{page}.html"
+        return path.read_text(encoding="utf-8") if path.is_file() else _EMPTY_LIST_HTML
+
+    def detail_html(self, policy_id: str) -> Optional[str]:
+        if self.replay_dir is None:
+            return fixture_detail_html(policy_id)
+        path = self.replay_dir / DETAIL_DIRNAME / f"{policy_id}.html"
+        return path.read_text(encoding="utf-8") if path.is_file() else None
+
+    # 파싱 측정용 상세 페이지 (최대 limit개)
+    def detail_pages(self, limit: int) -> List[str]:
+        if self.replay_dir is None:
+            return [fixture_detail_html(f"R{n:06d}") for n in range(min(limit, self.total_policies))]
+        return [p.read_text(encoding="utf-8") for p in sorted((self.replay_dir / DETAIL_DIRNAME).glob("*.html"))[:limit]]
+
+
+# ✅ 요청마다 latency 후 응답하는 replay 서버를 백그라운드 스레드로 실행 (반환: 서버, 기본 URL)
+# 상세 페이지는 ETag를 주고, If-None-Match가 같으면 304로 응답
+# error_rate : 이 비율의 요청에 503 응답 (seed로 고정한 난수 사용)
+# server.cutoff를 지정하면 그 수만큼 응답한 뒤의 요청은 503으로 응답하고, 첫 요청에서 server.on_cutoff()를 한 번 호출
+# (resume 측정에서 크롤링을 항상 같은 요청 수에서 중단시킬 때 사용)
+def start_fixture_server(source: PageSource, latency_seconds: float, error_rate: float = 0.0, seed: int = 0):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    count_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1로 응답해야 keep-alive 연결 재사용 효과가 측정됨
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: str = "", headers: Optional[Dict[str, str]] = None):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # resume 측정에서 중단시킨 요청
+
+        def do_GET(self):
+            with count_lock:
+                self.server.request_count += 1
+                cut = self.server.cutoff and self.server.request_count > self.server.cutoff
+                on_cutoff = None
+                if cut:
+                    on_cutoff, self.server.on_cutoff = self.server.on_cutoff, None
+            if cut:
+                if on_cutoff is not None:
+                    on_cutoff()
+                self._send(503)
+                return
+            time.sleep(latency_seconds)
+            if error_rate > 0:
+                with rng_lock:
+                    inject = rng.random() < error_rate
+                if inject:
+                    self.server.error_count += 1
+                    self._send(503)
+                    return
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            if parts.path.endswith("ctList.do"):
+                self._send(200, source.list_html(int(query["pageIndex"][0])))
+            elif parts.path.endswith("view.do"):
+                policy_id = query["plcyBizId"][0]
+                etag = f'"{policy_id}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, headers={"ETag": etag})
+                    return
+                body = source.detail_html(policy_id)
+                if body is None:
+                    self._send(404)
+                    return
+                self._send(200, body, {"ETag": etag})
+            else:
+                self._send(404)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.request_count = 0
+    server.error_count = 0
+    server.cutoff = 0
+    server.on_cutoff = None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@dataclass
+class BenchResult:
+    pages: int = 0          # 정상 처리한 페이지 수
+    retries: int = 0
+    failures: int = 0
+    note: str = ""
+    value: Any = None       # 다음 측정에서 사용할 결과 (예: 목록)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+# ✅ 측정 실행 + 한 줄 출력 (경과 시간, 서버가 받은 요청 수, tracemalloc 최대 메모리)
+def measure(name: str, server, run: Callable[[], BenchResult], trace_memory: bool = True) -> BenchResult:
+    server.request_count = 0
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = run()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    result.extra["elapsed"] = elapsed
+    result.extra["requests"] = server.request_count
+    memory = f"{peak:>7.1f}MB" if peak is not None else "      -"
+    print(f"{name:<12} 요청 {server.request_count:>6}  {elapsed:>7.2f}s  {result.pages / elapsed:>8.1f} pages/s  "
+          f"재시도 {result.retries:>4}  실패 {result.failures:>4}  최대 메모리 {memory}"
+          + (f"  ({result.note})" if result.note else ""))
+    return result
+
+
+# ✅ DataCollection.crawl_policy_list로 목록 페이지 순회 (실패한 페이지는 건너뛰고 계속)
+def bench_list_pages(base_url: str, parser: Optional[str]) -> BenchResult:
+    result = BenchResult(value=[])
+    page = 1
+    while True:
+        try:
+            page_policies = crawl_policy_list(build_list_url(page, base_url), parser)
+        except requests.RequestException:
+            result.failures += 1
+            page += 1
+            continue
+        if not page_policies:
+            break
+        result.pages += 1
+        result.value.extend(page_policies)
+        page += 1
+    result.note = f"정책 {len(result.value)}개"
+    return result
+
+
+# ✅ 상세 페이지 동기 크롤링 (mode: "sections" = crawl_all_sections, "sync" = 한 번 요청, "sync-2x" = 두 번 요청)
+def bench_details_sync(base_url: str, parser: Optional[str], policies: List[Dict[str, Any]], mode: str) -> BenchResult:
+    result = BenchResult()
+    empty = 0
+    for policy in policies:
+        detail_url = build_detail_url(policy["policy_id"], base_url)
+        try:
+            if mode == "sections":
+                sections = crawl_all_sections(detail_url, parser)
+            else:
+                sections = crawl_policy_detail_sync(detail_url, parser)["data_store"]
+                if mode == "sync-2x":
+                    sections = crawl_all_sections(detail_url, parser)
+                    result.pages += 1
+        except (requests.RequestException, ValueError):
+            result.failures += 1
+            continue
+        result.pages += 1
+        empty += 0 if sections else 1
+    result.extra["empty"] = empty
+    if empty:
+        result.note = f"섹션이 없는 상세 페이지 {empty}개"
+    return result
+
+
+# ✅ async_crawler.crawl_all_policies 전체 크롤링
+def bench_async(base_url: str, parser: Optional[str], fetcher_options: Dict[str, Any],
+                skip_ids=(), stop_after_known: int = 0) -> BenchResult:
+    stats = FetchStats()
+    all_policies, results = run_crawl(skip_ids, base_url=base_url, parser=parser,
+                                      stop_after_known=stop_after_known, stats=stats, **fetcher_options)
+    failed = sum(1 for r in results if "error" in r)
+    empty = sum(1 for r in results if "error" not in r and not r["data_store"])
+    return BenchResult(
+        pages=stats.requests - stats.retries - stats.failures, retries=stats.retries, failures=failed,
+        note=f"목록 {len(all_policies)}개, 상세 {len(results)}개" + (f", 빈 상세 {empty}개" if empty else ""),
+        value=all_policies, extra={"empty": empty}
+    )
+
+
+# ✅ 파서 백엔드별 상세 페이지 파싱 시간 (ms/page), html.parser 결과와 다르면 표시 -> 결과가 다른 페이지 수 합계
+def run_parse_benchmark(pages: List[str], repeat: int = 3) -> int:
+    if not pages:
+        print("파싱 측정할 상세 페이지가 없습니다.")
+        return 0
+    reference = [parse_policy_detail(html, "html.parser") for html in pages]
+    total_mismatched = 0
+    for parser in PARSER_BACKENDS:
+        if resolve_parser(parser) != parser:
+            print(f"{parser:<12} (설치되어 있지 않아 건너뜀)")
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = [parse_policy_detail(html, parser) for html in pages]
+            best = min(best, time.perf_counter() - start)
+        mismatched = sum(1 for a, b in zip(reference, results) if a != b)
+        total_mismatched += mismatched
+        print(f"{parser:<12} {best / len(pages) * 1000:>8.3f} ms/page  "
+              f"(페이지 {len(pages)}개, html.parser와 결과가 다른 페이지 {mismatched}개)")
+    return total_mismatched
+
+
+# ✅ 상세 페이지 파싱 결과를 policies.jsonl 레코드로 만들어 색인 본문으로 바꿨을 때 제목 완전 일치 검색(lexical_index)에 쓰이는 제목이 그대로 나오는지 확인
+# -> 제목이 추출되지 않거나 다른 페이지 수
+def check_rendered_titles(pages: List[str]) -> int:
+    failed = 0
+    for n, html in enumerate(pages):
+        parsed = parse_policy_detail(html, "html.parser")
+        record = build_policy_record(f"R{n:06d}", parsed["title"], f"https://example.com/policy/{n}",
+                                     parsed["category"], "", parsed["data_store"])
+        if extract_policy_titles(render_policy_record(record)) != [parsed["title"]]:
+            failed += 1
+    print(f"{'record-title':<12} 색인 본문에서 제목을 추출하지 못한 레코드 {failed}개 (페이지 {len(pages)}개)")
+    return failed
+
+
+# ✅ 실제 사이트의 목록 페이지 list_pages개와 그 상세 페이지를 replay 디렉토리 형식으로 저장
+async def record_pages(directory: Path, list_pages: int, parser: Optional[str], requests_per_second: float):
+    (directory / LIST_DIRNAME).mkdir(parents=True, exist_ok=True)
+    (directory / DETAIL_DIRNAME).mkdir(parents=True, exist_ok=True)
+    saved = 0
+    async with AsyncFetcher(concurrency=2, requests_per_second=requests_per_second) as fetcher:
+        for page in range(1, list_pages + 1):
+            html = await fetcher.fetch_text(build_list_url(page))
+            policies = [p for p in parse_policy_list(html, parser) if p["policy_id"]]
+            if not policies:
+                break
+            (directory / LIST_DIRNAME / f"{page}.html").write_text(html, encoding="utf-8")
+            details = await asyncio.gather(*(fetcher.fetch_text(build_detail_url(p["policy_id"])) for p in policies))
+            for policy, detail in zip(policies, details):
+                (directory / DETAIL_DIRNAME / f"{policy['policy_id']}.html").write_text(detail, encoding="utf-8")
+            saved += len(policies)
+    print(f"녹화 완료: 목록 {page}페이지, 상세 {saved}개 -> {directory}")
+
+
+# ✅ fixture 페이지를 replay 디렉토리 형식으로 저장
+def save_fixtures(directory: Path, total_policies: int):
+    (directory / LIST_DIRNAME).mkdir(parents=True, exist_ok=True)
+    (directory / DETAIL_DIRNAME).mkdir(parents=True, exist_ok=True)
+    for page in range(1, (total_policies + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE + 1):
+        (directory / LIST_DIRNAME / f"{page}.html").write_text(fixture_list_html(page, total_policies), encoding="utf-8")
+    for n in range(total_policies):
+        (directory / DETAIL_DIRNAME / f"R{n:06d}.html").write_text(fixture_detail_html(f"R{n:06d}"), encoding="utf-8")
+    print(f"fixture 페이지 저장: 정책 {total_policies}개 -> {directory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 replay 서버 대상 크롤러 처리량/파싱 측정")
+    parser.add_argument("--policies", type=int, default=200, help="fixture 정책 수")
+    parser.add_argument("--replay-dir", default="", help="녹화된 페이지 디렉토리 (list/<페이지>.html, detail/<정책 ID>.html)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="replay 서버 응답 지연 시간 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503으로 응답할 요청 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=0, help="오류 주입 난수 seed")
+    parser.add_argument("--concurrency", type=int, default=8, help="비동기 모드 호스트당 동시 요청 수")
+    parser.add_argument("--rps", type=float, default=0.0, help="비동기 모드 초당 요청 수 (0 이하: 제한 없음)")
+    parser.add_argument("--backoff", type=float, default=0.05, help="비동기 모드 재시도 기본 대기 시간 (초)")
+    parser.add_argument("--skip-sync", action="store_true", help="동기 모드 측정(list, sections, sync-2x, sync) 생략")
+    parser.add_argument("--new-policies", type=int, default=5, help="증분 크롤링 측정 시 새로 추가되는 정책 수")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=None, help="크롤링 측정에 사용할 파서 백엔드")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 최대 메모리 측정 생략 (측정 부하 제거)")
+    parser.add_argument("--check", action="store_true", help="파싱 결과 불일치/오류 주입 없는 실패가 있으면 종료 코드 1")
+    parser.add_argument("--parse", action="store_true", help="네트워크 없이 파서 백엔드별 상세 페이지 파싱 속도만 비교")
+    parser.add_argument("--parse-dir", default="", help="파싱 비교에 사용할 저장된 상세 페이지(.html) 디렉토리")
+    parser.add_argument("--save-fixtures", default="", help="fixture 페이지를 이 디렉토리에 replay 형식으로 저장")
+    parser.add_argument("--record", default="", help="실제 사이트 페이지를 이 디렉토리에 replay 형식으로 저장")
+    parser.add_argument("--record-pages", type=int, default=3, help="녹화할 목록 페이지 수")
+    args = parser.parse_args()
+
+    if args.record:
+        asyncio.run(record_pages(Path(args.record), args.record_pages, args.parser, requests_per_second=1.0))
+        raise SystemExit(0)
+
+    if args.save_fixtures:
+        save_fixtures(Path(args.save_fixtures), args.policies)
+
+    if args.parse:
+        if args.parse_dir:
+            parse_dir = Path(args.parse_dir)
+            if (parse_dir / DETAIL_DIRNAME).is_dir():
+                parse_dir = parse_dir / DETAIL_DIRNAME
+            pages = [p.read_text(encoding="utf-8") for p in sorted(parse_dir.glob("*.html"))]
+        else:
+            pages = [fixture_detail_html(f"R{n:06d}") for n in range(args.policies)]
+        mismatched = run_parse_benchmark(pages) + check_rendered_titles(pages)
+        raise SystemExit(1 if args.check and mismatched else 0)
+
+    source = PageSource(args.policies, Path(args.replay_dir) if args.replay_dir else None)
+    server, base_url = start_fixture_server(source, args.latency_ms / 1000, args.error_rate, args.seed)
+    print(f"replay 서버: {base_url} ({'녹화 페이지 ' + args.replay_dir if source.is_replay else f'fixture 정책 {args.policies}개'}, "
+          f"응답 지연 {args.latency_ms}ms, 오류 주입 {args.error_rate:.0%})")
+    trace_memory = not args.no_memory
+    fetcher_options = {"concurrency": args.concurrency, "requests_per_second": args.rps, "backoff_seconds": args.backoff}
+    problems: List[str] = []
+    try:
+        if not args.skip_sync:
+            listed = measure("list", server, lambda: bench_list_pages(base_url, args.parser), trace_memory)
+            for name in ("sections", "sync-2x", "sync"):
+                result = measure(name, server, lambda: bench_details_sync(base_url, args.parser, listed.value, name),
+                                 trace_memory)
+                if not args.error_rate and (result.failures or result.extra["empty"]):
+                    problems.append(f"{name}: 실패 {result.failures}, 빈 상세 {result.extra['empty']}")
+
+        full = measure("async", server, lambda: bench_async(base_url, args.parser, fetcher_options), trace_memory)
+        if not args.error_rate and (full.failures or full.extra["empty"]):
+            problems.append(f"async: 실패 {full.failures}, 빈 상세 {full.extra['empty']}")
+        all_policies = full.value
+
+        # 증분 크롤링: 위에서 받은 정책은 저장된 것으로 보고, 새 정책이 목록 앞에 추가된 상태에서 다시 크롤링
+        if not source.is_replay:
+            source.total_policies = args.policies + args.new_policies
+            measure("incremental", server, lambda: bench_async(
+                base_url, args.parser, fetcher_options,
+                skip_ids={p["policy_id"] for p in all_policies}, stop_after_known=DEFAULT_STOP_AFTER_KNOWN
+            ), trace_memory)
+            source.total_policies = args.policies
+
+        # HTTP 캐시 재검증: 첫 요청은 200 + 저장, 두 번째 요청은 이미 저장한 정책의 재검증 (304면 파싱하지 않음)
+        async def revalidate(policies, cache, stats, known=False):
+            async with AsyncFetcher(cache=cache, stats=stats, **fetcher_options) as fetcher:
+                return await asyncio.gather(*(crawl_policy_detail(fetcher, p, base_url, args.parser, revalidate=known)
+                                              for p in policies))
+
+        def bench_revalidate() -> BenchResult:
+            stats = FetchStats()
+            results = asyncio.run(revalidate(all_policies, cache, stats, known=True))
+            not_modified = sum(1 for r in results if r.get("not_modified"))
+            return BenchResult(pages=len(results), retries=stats.retries,
+                               failures=sum(1 for r in results if "error" in r),
+                               note=f"캐시 재사용 {cache.hits}, 변경 없음 {not_modified}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(Path(tmp))
+            asyncio.run(revalidate(all_policies, cache, FetchStats()))
+            cache.hits = 0
+            measure("revalidate", server, bench_revalidate, trace_memory)
+
+        # 중단 후 이어서 실행: replay 서버가 전체 크롤링 요청 수의 절반을 응답하면 크롤링을 취소하고, 같은 체크포인트로 다시 실행
+        # (경과 시간 기준으로 중단하면 실행마다 중단 지점이 달라짐)
+        async def interrupted_crawl(checkpoint: CrawlCheckpoint) -> bool:
+            loop = asyncio.get_running_loop()
+            task = asyncio.ensure_future(crawl_all_policies(base_url=base_url, parser=args.parser,
+                                                            checkpoint=checkpoint, **fetcher_options))
+            server.on_cutoff = lambda: loop.call_soon_threadsafe(task.cancel)
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        with tempfile.TemporaryDirectory() as tmp:
+            server.request_count = 0
+            server.cutoff = full.extra["requests"] // 2
+            try:
+                interrupted = asyncio.run(interrupted_crawl(CrawlCheckpoint(Path(tmp))))
+            finally:
+                server.cutoff, server.on_cutoff = 0, None
+            interrupted_requests = min(server.request_count, full.extra["requests"] // 2)
+
+            def bench_resume() -> BenchResult:
+                stats = FetchStats()
+                resumed_policies, results = asyncio.run(crawl_all_policies(
+                    base_url=base_url, parser=args.parser, checkpoint=CrawlCheckpoint(Path(tmp), resume=True),
+                    stats=stats, **fetcher_options
+                ))
+                return BenchResult(pages=stats.requests - stats.retries - stats.failures, retries=stats.retries,
+                                   failures=sum(1 for r in results if "error" in r),
+                                   note=f"목록 {len(resumed_policies)}개, 중단 전 요청 {interrupted_requests}")
+
+            resumed = measure("resume", server, bench_resume, trace_memory)
+            if not interrupted:
+                problems.append("resume: 크롤링이 중단되지 않음")
+            elif resumed.extra["requests"] >= full.extra["requests"]:
+                problems.append(f"resume: 이어서 실행한 요청 {resumed.extra['requests']}개가 "
+                                f"전체 크롤링 {full.extra['requests']}개보다 적지 않음")
+    finally:
+        server.shutdown()
+
+    print()
+    sample_pages = source.detail_pages(PARSE_SAMPLE_PAGES)
+    mismatched = run_parse_benchmark(sample_pages)
+    if mismatched:
+        problems.append(f"파서 백엔드 간 결과가 다른 페이지 {mismatched}개")
+    untitled = check_rendered_titles(sample_pages)
+    if untitled:
+        problems.append(f"색인 본문에서 제목을 추출하지 못한 레코드 {untitled}개")
+
+    if args.check and problems:
+        print("\n❌ 확인 실패: " + " / ".join(problems))
+        sys.exit(1)
@@ -7,6 +7,8 @@
 번거로움을 해결하기 위해 제작되었습니다.
 
 - .txt 파일 스캔 후 현재 파일별 해시값 목록 생성
+- 구조화 정책 레코드(policies.jsonl)는 정책마다 "policies.jsonl#<정책 ID>" 항목과 레코드 해시로 스캔
+  (정책 하나가 바뀌면 그 정책의 청크만 다시 임베딩)
 - 이전 처리 정보(JSON)와 현재 파일 목록/해시값 비교
 - 변경 파일(신규/수정/삭제) 목록 반환
 - 처리 후 최신 파일 정보를 JSON에 업데이트
@@ -27,6 +29,8 @@ from typing import List, Dict, Tuple, Set, Any
 
 # config.py setting load
 import config
+# 구조화 정책 레코드 로드/해시
+from policy_metadata import load_policy_records, policy_record_hash, policy_record_path
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +93,10 @@ def scan_data_directory(data_path: Path) -> Dict[str, str]:
         # 초기값을 그대로 반환
         return current_files_hashes
 
+    # 구조화 정책 레코드는 정책 단위 항목으로 추가
+    for policy_id, record in load_policy_records(data_path).items():
+        current_files_hashes[policy_record_path(policy_id)] = policy_record_hash(record)
+
     # os.work() : 입력 받은 경로의 하위 디렉토리를 전부 방문, 각 디렉토리의 튜플을 반환
     # 해당 튜플의 구조는 dirpath(str), dirnames(list), filenames(list)로 구성됨
     # root : dirpath | files : filenames
@@ -118,6 +126,11 @@ def scan_data_directory(data_path: Path) -> Dict[str, str]:
         # 업데이트 된 current_files_hashes 반환
         return current_files_hashes
 
+# 데이터 파일 {상대 경로: 해시} 전체를 대표하는 해시 (코퍼스 버전 식별용, 파일이 하나라도 바뀌면 달라짐)
+def calculate_manifest_hash(current_files_hashes: Dict[str, str]) -> str:
+    manifest = json.dumps(sorted(current_files_hashes.items()), ensure_ascii=False)
+    return hashlib.sha256(manifest.encode("utf-8")).hexdigest()
+
 # 현재 파일 해시와 이전 메타데이터 비교, 변경된 파일(신규/수정/삭제) 목록 반환.
 def get_changed_files(
     current_file_hashes: Dict[str, str],
@@ -0,0 +1,140 @@
+# embedding_batcher.py
+"""
+동시에 들어오는 질문 임베딩(embed_query) 요청을 짧은 시간 동안 모아서
+한 번의 배치 연산(embed_documents)으로 처리하는 마이크로 배처를 제공합니다.
+
+/ask 요청이 동시에 처리되면 요청마다 embed_query가 따로 호출되는데,
+CPU에서는 문장 N개를 한 번에 인코딩하는 것이 N번 따로 인코딩하는 것보다 훨씬 효율적입니다.
+
+- 최대 대기 시간(EMBEDDING_BATCH_MAX_WAIT_MS) 또는 최대 배치 크기(EMBEDDING_BATCH_MAX_SIZE)에 도달하면 실행
+- 대기 중인 요청이 없으면 기다리는 동안 도착한 요청까지만 모아서 바로 실행
+- 배치 수, 평균 배치 크기, 대기/인코딩 시간 등의 지표 제공 (stats)
+
+HuggingFaceEmbeddings와 OnnxEmbeddings는 질문과 문서를 같은 방식으로 인코딩하므로
+질문을 embed_documents로 묶어 처리해도 결과 벡터는 동일합니다.
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Tuple
+# 로거
+import logging
+
+# LangChain 임베딩 인터페이스
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    embed_query 요청을 모아서 배치로 처리하는 임베딩 래퍼.
+    embed_documents는 이미 배치 호출이므로 원래 모델에 그대로 전달합니다.
+    """
+    def __init__(self,
+                 base_embeddings: Embeddings,
+                 max_wait_ms: float = settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+                 max_batch_size: int = settings.EMBEDDING_BATCH_MAX_SIZE):
+        self.base_embeddings = base_embeddings
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        # (질문, 결과를 전달할 Future, 요청 시각)
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+
+        # 지표
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._total_wait_seconds = 0.0
+        self._total_encode_seconds = 0.0
+        self._errors = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base_embeddings.embed_documents(texts)
+
+    # 배치 처리 스레드는 첫 질문이 들어올 때 시작
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+                self._worker.start()
+                logger.info(f"임베딩 마이크로 배처 시작 (최대 대기: {self.max_wait_seconds * 1000:.1f}ms, 최대 배치: {self.max_batch_size})")
+
+    # 큐에서 요청을 모아 배치로 인코딩하고 결과를 각 요청의 Future로 돌려줌
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][2] + self.max_wait_seconds
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # 이미 큐에 쌓인 요청은 기다리지 않고 가져오고, 비어있으면 남은 시간만큼만 대기
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: List[Tuple[str, Future, float]]):
+        start = time.perf_counter()
+        try:
+            vectors = self.base_embeddings.embed_documents([text for text, _, _ in batch])
+        except Exception as e:
+            logger.error(f"마이크로 배치 임베딩 중 오류 발생 (배치 크기: {len(batch)}): {e}", exc_info=True)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            with self._stats_lock:
+                self._errors += 1
+            return
+        encode_seconds = time.perf_counter() - start
+
+        for (_, future, _), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._total_wait_seconds += sum(start - enqueued_at for _, _, enqueued_at in batch)
+            self._total_encode_seconds += encode_seconds
+
+    # 누적 지표 반환
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0,
+                "max_batch_size_seen": self._max_batch_seen,
+                "avg_queue_wait_ms": round(self._total_wait_seconds / self._requests * 1000, 3) if self._requests else 0,
+                "avg_encode_ms": round(self._total_encode_seconds / self._batches * 1000, 3) if self._batches else 0,
+                "queued": self._queue.qsize(),
+                "errors": self._errors,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "max_batch_size": self.max_batch_size,
+            }
+
+
+# 설정에 따라 MicroBatchingEmbeddings로 감싸거나 원래 모델을 그대로 반환
+def wrap_for_micro_batching(embeddings: Embeddings) -> Embeddings:
+    if not settings.EMBEDDING_MICRO_BATCHING:
+        return embeddings
+    # 공유 임베딩 서버는 서버 쪽에서 배치를 묶으므로 클라이언트에서 다시 묶지 않음
+    if getattr(embeddings, "is_remote", False):
+        return embeddings
+    return MicroBatchingEmbeddings(embeddings)
@@ -0,0 +1,169 @@
+# embedding_benchmark.py
+"""
+임베딩 백엔드(torch / onnx)의 성능과 검색 품질을 비교하는 벤치마크 스크립트입니다.
+
+- 지연 시간 : 질문 1개 임베딩(embed_query)의 p50 / p95 (ms)
+- 처리량 : 코퍼스 청크 임베딩(embed_documents) chunks/sec
+- 메모리 : 모델 로드 후 / 실행 중 최대 RSS (MB)
+- 검색 품질 : torch 백엔드 top-k 대비 recall@k, 청크 벡터 코사인 유사도
+
+각 백엔드는 메모리 측정이 섞이지 않도록 별도 프로세스에서 실행합니다.
+
+python embedding_benchmark.py --backends torch onnx --max-chunks 2000 --k 3
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any
+# 로거
+import logging
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 질문 파일을 지정하지 않았을 때 사용할 기본 질문
+DEFAULT_QUERIES = [
+    "청년 월세 지원 신청자격은 어떻게 되나요?",
+    "서울시 청년수당 신청방법이 궁금해요",
+    "취업 준비생을 위한 지원 정책이 있나요?",
+    "청년 창업 지원금은 얼마인가요?",
+    "신혼부부 주거 지원 사업개요를 알려줘",
+    "대학생 학자금 대출 이자 지원 내용이 뭔가요?",
+    "마음건강 상담 지원 신청은 어디서 하나요?",
+    "청년 일자리 정책 기타 정보가 있나요?",
+]
+
+
+# 현재 프로세스의 최대 RSS (MB), 측정할 수 없으면 None
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+        # 리눅스에서 ru_maxrss 단위는 KB, macOS는 byte
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+# 코퍼스를 청크 단위 텍스트 리스트로 로드 (max_chunks가 None이면 전체)
+def load_corpus_chunks(max_chunks: int | None) -> List[str]:
+    from data_manager import scan_data_directory
+    from rag_main_runner import load_docs_from_paths
+    from rag_utils import get_text_splitter, split_documents
+
+    relative_paths = sorted(scan_data_directory(settings.DATA_PATH).keys())
+    docs = load_docs_from_paths(settings.DATA_PATH, relative_paths)
+    split_docs = split_documents(get_text_splitter(), docs)
+    return [doc.page_content for doc in split_docs[:max_chunks]]
+
+
+# 별도 프로세스에서 실행: 백엔드 1개 측정 후 벡터는 .npy로 저장
+def _run_backend(backend: str, chunks: List[str], queries: List[str], output_dir: str) -> Dict[str, Any]:
+    from rag_utils import get_embedding_model
+
+    rss_before = _peak_rss_mb()
+    load_start = time.perf_counter()
+    embeddings = get_embedding_model(backend=backend)
+    load_seconds = time.perf_counter() - load_start
+    rss_after_load = _peak_rss_mb()
+
+    # 첫 호출의 초기화 비용이 지연 시간에 섞이지 않도록 한 번 예열
+    embeddings.embed_query(queries[0])
+
+    query_latencies = []
+    query_vectors = []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        query_latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    chunk_vectors = embeddings.embed_documents(chunks)
+    embed_seconds = time.perf_counter() - start
+
+    np.save(os.path.join(output_dir, f"{backend}_queries.npy"), np.array(query_vectors, dtype=np.float32))
+    np.save(os.path.join(output_dir, f"{backend}_chunks.npy"), np.array(chunk_vectors, dtype=np.float32))
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "query_p50_ms": round(float(np.percentile(query_latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(query_latencies, 95)), 2),
+        "chunks_per_sec": round(len(chunks) / embed_seconds, 2) if embed_seconds > 0 else None,
+        "rss_before_mb": rss_before,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+# 기준 벡터(reference) 대비 top-k 검색 결과의 평균 recall@k
+def recall_at_k(ref_queries: np.ndarray, ref_chunks: np.ndarray,
+                cand_queries: np.ndarray, cand_chunks: np.ndarray, k: int) -> float:
+    k = min(k, len(ref_chunks))
+    ref_top = np.argsort(-(ref_queries @ ref_chunks.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_queries @ cand_chunks.T), axis=1)[:, :k]
+    hits = [len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]
+    return float(np.mean(hits))
+
+
+def run_benchmark(backends: List[str], chunks: List[str], queries: List[str], k: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"chunks": len(chunks), "queries": len(queries), "k": k, "backends": {}}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for backend in backends:
+            logger.info(f"'{backend}' 백엔드 측정 중...")
+            # 백엔드마다 새 프로세스를 띄워 메모리 측정값이 서로 섞이지 않게 함
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                stats = executor.submit(_run_backend, backend, chunks, queries, output_dir).result()
+            results["backends"][backend] = stats
+
+        # 첫 번째 백엔드를 기준으로 나머지 백엔드의 검색 품질 비교
+        reference = backends[0]
+        ref_queries = np.load(os.path.join(output_dir, f"{reference}_queries.npy"))
+        ref_chunks = np.load(os.path.join(output_dir, f"{reference}_chunks.npy"))
+        for backend in backends[1:]:
+            cand_queries = np.load(os.path.join(output_dir, f"{backend}_queries.npy"))
+            cand_chunks = np.load(os.path.join(output_dir, f"{backend}_chunks.npy"))
+            cosines = (ref_chunks * cand_chunks).sum(axis=1)
+            results["backends"][backend].update({
+                f"recall@{k}_vs_{reference}": round(recall_at_k(ref_queries, ref_chunks, cand_queries, cand_chunks, k), 4),
+                "min_cosine_vs_reference": round(float(cosines.min()), 5),
+                "mean_cosine_vs_reference": round(float(cosines.mean()), 5),
+                "within_tolerance": bool(cosines.min() >= settings.ONNX_MIN_COSINE),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="임베딩 백엔드 벤치마크 (torch vs onnx)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], help="첫 번째 백엔드가 recall 기준")
+    parser.add_argument("--max-chunks", type=int, default=2000, help="임베딩할 최대 청크 수")
+    parser.add_argument("--queries-file", type=Path, help="한 줄에 질문 1개씩 적힌 텍스트 파일")
+    parser.add_argument("--k", type=int, default=settings.SEARCH_K, help="recall@k의 k")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    corpus_chunks = load_corpus_chunks(args.max_chunks)
+    if not corpus_chunks:
+        logger.error(f"'{settings.DATA_PATH}'에서 청크를 불러오지 못했습니다. 데이터를 먼저 준비하세요.")
+        sys.exit(1)
+
+    print(json.dumps(run_benchmark(args.backends, corpus_chunks, queries, args.k), indent=4, ensure_ascii=False))
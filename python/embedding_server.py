@@ -0,0 +1,207 @@
+# embedding_server.py
+"""
+임베딩 모델을 하나의 전용 로컬 프로세스에 올려두고, Unix 소켓으로 임베딩 요청을 처리합니다.
+
+uvicorn 워커마다 startup_event에서 KURE 모델(+ torch)을 따로 로드하면
+노드당 메모리가 워커 수에 비례해서 늘어납니다.
+EMBEDDING_SERVER_SOCKET을 설정하면 API 워커는 모델을 로드하지 않고
+EmbeddingClient(LangChain Embeddings 구현)를 통해 이 프로세스에 임베딩을 요청합니다.
+
+- 서버 : 연결마다 스레드로 처리, 여러 워커의 질문 임베딩은 MicroBatchingEmbeddings로 묶어서 배치 인코딩
+- 프로토콜 : [4byte 길이][JSON 헤더] 요청 -> [4byte 길이][JSON 헤더][4byte 길이][float32 벡터 바이트] 응답
+
+python embedding_server.py   # EMBEDDING_SERVER_SOCKET 경로에서 대기 (uvicorn 실행 전에 먼저 실행)
+"""
+import os
+import json
+import socket
+import struct
+import threading
+import socketserver
+from array import array
+from typing import List, Dict, Any, Tuple
+# 로거
+import logging
+
+# LangChain 임베딩 인터페이스
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 요청 1개에 담을 최대 문장 수 (프레임 크기 제한)
+MAX_TEXTS_PER_REQUEST = 256
+# 프레임 길이 헤더: 4byte unsigned int (big endian)
+_LENGTH = struct.Struct("!I")
+
+
+# 소켓에서 정확히 size 바이트를 읽음 (연결이 끊기면 ConnectionError)
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("임베딩 서버 연결이 끊어졌습니다.")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def _send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, size)
+
+
+# 벡터 리스트 <-> float32 바이트 변환 (JSON 대신 바이너리로 보내 직렬화 비용을 줄임)
+def _pack_vectors(vectors: List[List[float]]) -> Tuple[bytes, int]:
+    dim = len(vectors[0]) if vectors else 0
+    flat = array("f")
+    for vector in vectors:
+        flat.extend(vector)
+    return flat.tobytes(), dim
+
+
+def _unpack_vectors(data: bytes, count: int, dim: int) -> List[List[float]]:
+    flat = array("f")
+    flat.frombytes(data)
+    values = flat.tolist()
+    return [values[i * dim:(i + 1) * dim] for i in range(count)]
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    # 연결 1개에서 여러 요청을 순서대로 처리 (클라이언트는 연결을 재사용)
+    def handle(self):
+        embeddings: Embeddings = self.server.embeddings
+        while True:
+            try:
+                request = json.loads(_recv_frame(self.request).decode("utf-8"))
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                texts = request.get("texts", [])
+                if request.get("op") == "embed_query":
+                    # 여러 연결(워커)에서 동시에 들어온 질문은 마이크로 배처에서 하나의 배치로 묶임
+                    vectors = [embeddings.embed_query(text) for text in texts]
+                elif request.get("op") == "embed_documents":
+                    vectors = embeddings.embed_documents(texts)
+                else:
+                    raise ValueError(f"알 수 없는 요청입니다: {request.get('op')}")
+                body, dim = _pack_vectors(vectors)
+                header = {"count": len(vectors), "dim": dim}
+            except Exception as e:
+                logger.error(f"임베딩 요청 처리 중 오류 발생: {e}", exc_info=True)
+                body, header = b"", {"error": str(e)}
+
+            try:
+                _send_frame(self.request, json.dumps(header).encode("utf-8"))
+                _send_frame(self.request, body)
+            except OSError:
+                return
+
+
+# 연결마다 스레드를 만들어 처리하는 Unix 소켓 서버 (POSIX 전용)
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embeddings: Embeddings):
+        self.embeddings = embeddings
+        # 이전 실행에서 남은 소켓 파일 정리
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+        # 같은 그룹의 API 워커만 접근하도록 권한 제한
+        os.chmod(socket_path, 0o660)
+
+
+class EmbeddingClient(Embeddings):
+    """
+    embedding_server.py 프로세스에 임베딩을 요청하는 LangChain Embeddings 구현.
+    스레드마다 연결을 하나씩 유지하며, 연결이 끊기면 한 번 재연결을 시도합니다.
+    """
+    # 원격 모델임을 표시 (대량 임베딩/마이크로 배칭 래퍼는 서버 쪽에서 처리하므로 적용하지 않음)
+    is_remote = True
+
+    def __init__(self,
+                 socket_path: str = settings.EMBEDDING_SERVER_SOCKET,
+                 timeout: float = settings.EMBEDDING_SERVER_TIMEOUT):
+        if not socket_path:
+            raise ValueError("EmbeddingClient 생성 시 socket_path는 필수 항목입니다.")
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _request(self, op: str, texts: List[str]) -> List[List[float]]:
+        payload = json.dumps({"op": op, "texts": texts}, ensure_ascii=False).encode("utf-8")
+        # 연결 재사용 중 서버가 재시작된 경우를 위해 한 번만 재시도
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            try:
+                if sock is None:
+                    sock = self._local.sock = self._connect()
+                _send_frame(sock, payload)
+                header: Dict[str, Any] = json.loads(_recv_frame(sock).decode("utf-8"))
+                body = _recv_frame(sock)
+                break
+            except (ConnectionError, OSError) as e:
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt == 1:
+                    logger.error(f"임베딩 서버({self.socket_path}) 요청 실패: {e}")
+                    raise
+
+        if "error" in header:
+            raise RuntimeError(f"임베딩 서버 오류: {header['error']}")
+        return _unpack_vectors(body, header["count"], header["dim"])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request("embed_query", [text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), MAX_TEXTS_PER_REQUEST):
+            vectors.extend(self._request("embed_documents", texts[start:start + MAX_TEXTS_PER_REQUEST]))
+        return vectors
+
+
+# 임베딩 서버 실행 (모델 1회 로드 후 요청 대기)
+def serve(socket_path: str = settings.EMBEDDING_SERVER_SOCKET):
+    if not socket_path:
+        raise ValueError("EMBEDDING_SERVER_SOCKET이 설정되지 않았습니다.")
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("현재 운영체제는 Unix 소켓을 지원하지 않습니다.")
+
+    from rag_utils import get_embedding_model
+    from embedding_batcher import MicroBatchingEmbeddings
+
+    # 서버 자신은 원격 클라이언트가 아닌 실제 모델을 로드해야 함
+    model = get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME, use_server=False)
+    # 여러 워커에서 동시에 들어온 질문 임베딩을 배치로 묶음
+    embeddings = MicroBatchingEmbeddings(model)
+
+    with EmbeddingServer(socket_path, embeddings) as server:
+        logger.info(f"임베딩 서버 시작: '{socket_path}' (모델: {settings.EMBEDDING_MODEL_NAME}, 백엔드: {settings.EMBEDDING_BACKEND})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("임베딩 서버 종료 요청 수신.")
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            logger.info(f"임베딩 서버 종료. 처리 지표: {embeddings.stats()}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    serve()
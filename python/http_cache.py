@@ -0,0 +1,103 @@
+# http_cache.py
+"""
+정책 상세 페이지용 로컬 HTTP 캐시 (ETag / Last-Modified 재검증).
+
+응답 본문과 ETag/Last-Modified 헤더를 URL 해시별로 저장해두고, 다음 요청에
+If-None-Match / If-Modified-Since 헤더를 붙여서 서버가 304 Not Modified를 주면 저장된 본문을 사용합니다.
+(서버가 두 헤더를 모두 주지 않는 페이지는 저장하지 않음)
+
+크롤러는 이미 저장한 정책의 상세 페이지도 이 캐시로 재검증해서, 304면 파싱 없이 건너뛰고
+200이면 저장된 정책 레코드와 비교해 바뀐 정책만 다시 저장합니다. (DataCollection.py)
+재검증되지 않은 채 max_age_days가 지난 항목과 max_entries를 넘는 오래된 항목은 prune()으로 삭제합니다.
+
+이 모듈은 크롤러(동기/비동기)에서 사용하므로 표준 라이브러리만 사용합니다.
+"""
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional, Mapping
+
+# 기본 캐시 디렉토리 이름 (크롤러 데이터 디렉토리 아래)
+HTTP_CACHE_DIRNAME = ".http_cache"
+# 캐시 정리 기본값 (재검증되지 않은 기간, 최대 항목 수)
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_ENTRIES = 20000
+
+
+class HttpCache:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # 지표
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.html"
+
+    # 저장된 응답이 있으면 재검증 요청 헤더 반환
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.is_file() or not body_path.is_file():
+            return {}
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    # 304 응답을 받았을 때 저장된 본문 반환
+    # 재검증된 항목은 메타 파일 수정 시각을 갱신해서 prune() 대상에서 제외
+    def load(self, url: str) -> Optional[str]:
+        meta_path, body_path = self._paths(url)
+        if not body_path.is_file():
+            return None
+        self.hits += 1
+        if meta_path.is_file():
+            os.utime(meta_path)
+        return body_path.read_text(encoding="utf-8")
+
+    # 200 응답 본문과 검증 헤더 저장 (ETag / Last-Modified가 모두 없으면 저장하지 않음)
+    def store(self, url: str, text: str, headers: Mapping[str, str]):
+        self.misses += 1
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        body_path.write_text(text, encoding="utf-8")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f, ensure_ascii=False)
+
+    # 마지막 저장/재검증 후 max_age_days가 지난 항목을 삭제하고, 남은 항목이 max_entries보다 많으면 오래된 것부터 삭제
+    def prune(self, max_age_days: float = DEFAULT_MAX_AGE_DAYS, max_entries: int = DEFAULT_MAX_ENTRIES) -> int:
+        entries = []
+        for meta_path in self.directory.glob("*.json"):
+            try:
+                entries.append((meta_path.stat().st_mtime, meta_path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for rank, (mtime, meta_path) in enumerate(entries):
+            if mtime >= cutoff and rank < max_entries:
+                continue
+            meta_path.unlink(missing_ok=True)
+            meta_path.with_suffix(".html").unlink(missing_ok=True)
+            removed += 1
+        # 메타 파일 없이 남은 본문 (저장 도중 중단)
+        for body_path in self.directory.glob("*.html"):
+            if not body_path.with_suffix(".json").is_file():
+                body_path.unlink(missing_ok=True)
+        self.evicted += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted}
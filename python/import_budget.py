@@ -0,0 +1,102 @@
+# import_budget.py
+"""
+'import main'에 걸리는 시간을 python -X importtime으로 측정하고, 예산 초과 여부를 검사합니다.
+
+빠른 시작(PIPELINE_INIT_MODE = background / lazy)이 의미가 있으려면
+main을 import하는 시점에 torch, Chroma(langchain_community), langchain_google_genai, konlpy 같은
+무거운 모듈이 로드되지 않아야 합니다. 누군가 모듈 상단에 다시 import를 추가하면 이 검사가 실패합니다.
+
+- 총 import 시간이 IMPORT_TIME_BUDGET_MS를 넘으면 실패
+- 금지 모듈(LAZY_ONLY_MODULES)이 import되면 실패
+- 누적 시간이 큰 모듈 상위 목록 출력
+
+python import_budget.py            # 검사 (실패 시 종료 코드 1)
+python import_budget.py --top 30   # 상위 30개 모듈 출력
+"""
+import os
+import sys
+import argparse
+import subprocess
+from typing import List, Dict, Any, Tuple
+
+from config import settings, BASE_DIR
+
+# main import 시점에는 로드되면 안 되는 모듈 (실제로 사용하는 함수 안에서만 import)
+LAZY_ONLY_MODULES = (
+    "torch",
+    "langchain_community",
+    "langchain_google_genai",
+    "langchain_huggingface",
+    "konlpy",
+    "sentence_transformers",
+    "onnxruntime",
+    "chromadb",
+)
+
+
+# python -X importtime 출력을 (모듈 이름, 누적 시간 us) 리스트로 변환
+# 출력 형식: "import time: self [us] | cumulative | imported package"
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # 구분자 뒤 공백 1칸을 제거하면, 남은 앞쪽 공백(2칸 단위)이 중첩 깊이를 나타냄
+            records.append((name[1:].rstrip(), int(cumulative)))
+        except ValueError:
+            continue
+    return records
+
+
+def measure_import(module: str = "main") -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BASE_DIR),
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'import {module}' 실패:\n{result.stderr[-2000:]}")
+
+    records = parse_importtime(result.stderr)
+    # 최상위(들여쓰기 없는) 모듈의 누적 시간 합이 전체 import 시간
+    top_level = [(name, us) for name, us in records if not name.startswith(" ")]
+    total_ms = sum(us for _, us in top_level) / 1000
+    loaded = {name.strip().split(".")[0] for name, _ in records}
+    return {
+        "total_ms": round(total_ms, 1),
+        "records": records,
+        "lazy_only_loaded": sorted(m for m in LAZY_ONLY_MODULES if m in loaded),
+    }
+
+
+def check_budget(budget_ms: int = settings.IMPORT_TIME_BUDGET_MS, top: int = 15) -> bool:
+    report = measure_import("main")
+    heaviest = sorted(report["records"], key=lambda r: r[1], reverse=True)[:top]
+
+    print(f"'import main' 총 시간: {report['total_ms']}ms (예산: {budget_ms}ms)")
+    print(f"누적 시간 상위 {top}개 모듈:")
+    for name, us in heaviest:
+        print(f"  {us / 1000:9.1f}ms  {name.strip()}")
+
+    ok = True
+    if report["lazy_only_loaded"]:
+        print(f"[실패] main import 시점에 로드되면 안 되는 모듈이 로드됨: {report['lazy_only_loaded']}")
+        ok = False
+    if report["total_ms"] > budget_ms:
+        print(f"[실패] import 시간이 예산을 초과함: {report['total_ms']}ms > {budget_ms}ms")
+        ok = False
+    if ok:
+        print("[통과] import 시간 예산 검사")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="main 모듈 import 시간 예산 검사")
+    parser.add_argument("--budget-ms", type=int, default=settings.IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(0 if check_budget(args.budget_ms, args.top) else 1)
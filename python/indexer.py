@@ -0,0 +1,110 @@
+# indexer.py
+"""
+API 서버와 분리된 오프라인 색인 명령입니다.
+기존에는 FastAPI 시작(RAGPipeline 초기화) 중에만 임베딩/색인이 실행되어, CPU를 많이 쓰는 색인 작업이
+API 워커의 시작/재시작에 묶여 있었습니다. 이 명령은 RAGPipeline과 같은 색인 코드(CorpusIndexer)로
+새 벡터 저장소 버전을 만들고, 검증(vectorstore_versions.validate_version)을 통과하면 CURRENT를 전환합니다.
+LLM, 검색 구성 요소는 만들지 않습니다.
+
+- build             : 증분 색인 (현재 버전을 복사해서 변경된 파일만 반영)
+- build --full      : 빈 디렉토리에 전체 재생성
+- build --dry-run   : 변경 파일 수와 임베딩할 청크 수만 계산 (임베딩/저장하지 않음)
+- build --workers N : 대량 임베딩 워커 프로세스 수 (EMBEDDING_BULK_WORKERS)
+- export / import   : 버전 디렉토리를 tar.gz 한 파일로 내보내고, 다른 노드에서 풀어서 CURRENT 전환
+                      (버전에 복사해둔 정책 파일 policies.jsonl, policy_metadata.json과
+                       그 코퍼스로 미리 생성한 답변도 함께 옮기므로 API 노드에 데이터 디렉토리가 없어도 됨)
+
+API 노드는 .env에 VECTORSTORE_READ_ONLY=true를 설정하면 색인하지 않고 현재 버전만 로드하며,
+CURRENT가 바뀌면(build, import) 재시작 없이 새 버전을 로드합니다. (corpus_watcher.py)
+
+    python indexer.py build --workers 8
+    python indexer.py build --full --dry-run
+    python indexer.py export index.tar.gz
+    python indexer.py import index.tar.gz
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Any
+# 로거
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 진행 상황 한 줄 출력 (터미널이면 같은 줄을 덮어씀)
+def print_progress(state: Dict[str, Any]):
+    rate = state["chunks_done"] / state["seconds"] if state["seconds"] > 0 else 0.0
+    line = (f"파일 {state['files_done']}/{state['files_total']}  "
+            f"청크 {state['chunks_done']}/{state['chunks_total']}  {rate:,.1f} chunks/s")
+    print(line, end="\r" if sys.stdout.isatty() else "\n", flush=True)
+
+
+def run_build(args) -> int:
+    from rag_utils import get_embedding_model
+    from bulk_embedder import BulkEmbeddings, wrap_for_bulk_embedding
+    from rag_main_runner import CorpusIndexer
+
+    indexer = CorpusIndexer(data_path=args.data, vectorstore_path=args.base,
+                            batch_chunks=args.batch_chunks or settings.INDEXER_BATCH_CHUNKS)
+    if args.dry_run:
+        result = indexer.dry_run(full=args.full, force=args.force)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0
+
+    embeddings = wrap_for_bulk_embedding(get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME))
+    if args.workers and isinstance(embeddings, BulkEmbeddings):
+        embeddings.num_workers = args.workers
+    indexer.embeddings = embeddings
+    result = indexer.index(full=args.full, force=args.force, progress=print_progress)
+    if sys.stdout.isatty():
+        print()
+    if result["status"] == "reindexed":
+        print(f"✅ 새 버전으로 전환: {Path(result['store_path']).name} ({result['mode']}, "
+              f"청크 +{result['added_chunks']} / -{result['deleted_chunks']}, {result['chunks_per_second']} chunks/s, "
+              f"{result['build_seconds']}s)")
+    elif result["status"] == "up_to_date":
+        print(f"현재 버전이 데이터와 같아 색인하지 않습니다: {Path(result['store_path']).name}")
+    print(json.dumps(result.get("validation", result), indent=2, ensure_ascii=False))
+    return 0 if result["status"] in ("reindexed", "up_to_date") else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--base", default=str(settings.VECTORSTORE_PATH), help="벡터 저장소 기본 경로 (VECTORSTORE_PATH)")
+    parser = argparse.ArgumentParser(description="API 서버와 분리된 벡터 저장소 색인")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", parents=[common], help="데이터 디렉토리를 새 버전으로 색인하고 검증 후 전환")
+    build_parser.add_argument("--data", default=str(settings.DATA_PATH), help="데이터 디렉토리 (DATA_PATH)")
+    build_parser.add_argument("--full", action="store_true", help="현재 버전을 복사하지 않고 전체 재생성")
+    build_parser.add_argument("--force", action="store_true", help="검증 실패/rollback으로 기록된 코퍼스도 다시 색인")
+    build_parser.add_argument("--dry-run", action="store_true", help="변경 파일 수와 임베딩할 청크 수만 출력")
+    build_parser.add_argument("--workers", type=int, default=0,
+                              help="대량 임베딩 워커 프로세스 수 (0이면 EMBEDDING_BULK_WORKERS, 1이면 현재 프로세스에서 임베딩)")
+    build_parser.add_argument("--batch-chunks", type=int, default=0,
+                              help="한 번에 임베딩해서 저장할 청크 수 (0이면 INDEXER_BATCH_CHUNKS)")
+
+    export_parser = subparsers.add_parser("export", parents=[common], help="현재 버전(또는 --version)을 tar.gz로 내보내기")
+    export_parser.add_argument("out", help="결과 파일 경로 (예: index.tar.gz)")
+    export_parser.add_argument("--version", default=None, help="내보낼 버전 디렉토리 이름")
+
+    import_parser = subparsers.add_parser("import", parents=[common], help="내보낸 버전 파일을 풀고 CURRENT 전환")
+    import_parser.add_argument("archive", help="export로 만든 파일 경로")
+    args = parser.parse_args()
+
+    from vectorstore_versions import export_version, import_version, version_lock
+
+    base = Path(args.base)
+    if args.command == "build":
+        sys.exit(run_build(args))
+    elif args.command == "export":
+        print(f"내보내기 완료: {export_version(base, Path(args.out), args.version)}")
+    else:
+        with version_lock(base):
+            imported = import_version(base, Path(args.archive))
+        print(f"CURRENT -> {imported.name} (실행 중인 서버는 다음 코퍼스 변경 확인 때 이 버전을 로드합니다)")
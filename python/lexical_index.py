@@ -0,0 +1,257 @@
+# lexical_index.py
+"""
+벡터 저장소와 같은 청크를 대상으로 하는 메모리 내 BM25 역색인과 하이브리드 검색기를 제공합니다.
+
+사용자는 "청년월세"처럼 정확한 사업명이나 지역명으로 검색하는 경우가 많은데,
+임베딩(dense) 검색만으로는 이런 질문에서 정답 청크를 놓치는 경우가 있어 SEARCH_K를 키워야 했습니다.
+
+- 토크나이저 : 정규식 기반. 한글은 음절 bigram(조사가 붙어도 일치), 영문/숫자는 단어 단위
+- LexicalIndex : 청크 ID 기준으로 추가/삭제 가능한 BM25 역색인 (벡터 저장소와 함께 갱신, pickle로 저장)
+- HybridRetriever : 벡터 검색 결과와 BM25 결과를 RRF(Reciprocal Rank Fusion)로 결합
+- 제목 빠른 경로 : 질문이 정책 제목과 정확히 일치하면 임베딩/벡터 검색 없이 해당 정책 청크를 바로 반환
+"""
+import re
+import math
+import pickle
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+# 로거
+import logging
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+from config import settings
+# 제목 정규화/추출은 크롤러(crawler_bench.py 등)에서도 쓰므로 표준 라이브러리만 쓰는 policy_metadata에 둠
+from policy_metadata import normalize_title, extract_policy_titles
+
+logger = logging.getLogger(__name__)
+
+# 한글 연속 구간, 영문 단어, 숫자
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z]+|[0-9]+")
+
+
+# 한글은 음절 bigram으로, 영문/숫자는 단어 단위로 분리
+# 예) "청년월세를 신청" -> ["청년", "년월", "월세", "세를", "신청"]
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        word = match.group()
+        if "가" <= word[0] <= "힣" and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    청크 ID 기준 BM25 역색인.
+    벡터 저장소와 같은 ID를 사용하므로 파일 변경 시 같은 ID로 추가/삭제합니다.
+    """
+    def __init__(self, k1: float = settings.LEXICAL_BM25_K1, b: float = settings.LEXICAL_BM25_B):
+        self.k1 = k1
+        self.b = b
+        # 단어 -> {청크 ID: 단어 빈도}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # 청크 ID -> {단어: 단어 빈도} (삭제 시 역색인에서 제거하기 위해 보관)
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        # 정규화된 정책 제목 -> 청크 ID 리스트 (제목 빠른 경로)
+        self._titles: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, ids: List[str], texts: List[str]):
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self._doc_lengths:
+                self.remove([doc_id])
+            term_counts: Dict[str, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                term_counts[token] = term_counts.get(token, 0) + 1
+            for term, count in term_counts.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            self._doc_terms[doc_id] = term_counts
+            self._doc_lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+            for title in extract_policy_titles(text):
+                self._titles.setdefault(normalize_title(title), []).append(doc_id)
+
+    def remove(self, ids: List[str]):
+        removed = set()
+        for doc_id in ids:
+            term_counts = self._doc_terms.pop(doc_id, None)
+            if term_counts is None:
+                continue
+            for term in term_counts:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths.pop(doc_id)
+            removed.add(doc_id)
+        if removed:
+            for title in list(self._titles):
+                remaining = [i for i in self._titles[title] if i not in removed]
+                if remaining:
+                    self._titles[title] = remaining
+                else:
+                    del self._titles[title]
+
+    # 질문이 정책 제목과 정확히 일치하면 해당 청크 ID 리스트, 아니면 None
+    def match_title(self, query: str) -> Optional[List[str]]:
+        return self._titles.get(normalize_title(query))
+
+    # BM25 점수 상위 k개의 (청크 ID, 점수) 반환
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        total_docs = len(self._doc_lengths)
+        if total_docs == 0 or k <= 0:
+            return []
+        avg_length = self._total_length / total_docs
+        # 대부분의 청크에 등장하는 단어(예: "청년")는 변별력이 거의 없고 역색인 순회 비용만 크므로 제외
+        max_df = max(1, int(total_docs * settings.LEXICAL_MAX_DF_RATIO))
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings or len(postings) > max_df:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if len(scores) > k:
+            import heapq
+            return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def save(self, path: str | Path = settings.LEXICAL_INDEX_PATH):
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+        logger.info(f"BM25 역색인 저장 완료: '{path}' (청크 {len(self)}개, 단어 {len(self._postings)}개, 제목 {len(self._titles)}개)")
+
+    @classmethod
+    def load(cls, path: str | Path = settings.LEXICAL_INDEX_PATH) -> Optional["LexicalIndex"]:
+        path = Path(path)
+        if not path.is_file():
+            return None
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"BM25 역색인 파일 로드 실패 ({e}). 다시 생성합니다.")
+            return None
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+    # 벡터 저장소에 저장된 청크 전체로 역색인을 새로 생성
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "LexicalIndex":
+        index = cls()
+        stored = vectorstore.get(include=["documents"])
+        index.add(stored["ids"], stored["documents"])
+        logger.info(f"벡터 저장소로부터 BM25 역색인 생성 완료 (청크 {len(index)}개)")
+        return index
+
+
+# 검색 결과 Document의 청크 ID (Chroma 버전에 따라 doc.id가 없을 수 있어 메타데이터로 대체)
+def get_chunk_id(doc: Document) -> str:
+    if doc.id:
+        return doc.id
+    return f"{doc.metadata.get('relative_path')}#{doc.metadata.get('chunk_index')}"
+
+
+# 여러 순위 리스트를 RRF로 결합: score(d) = sum(1 / (rrf_k + rank))
+def reciprocal_rank_fusion(ranked_lists: List[List[str]], rrf_k: int = settings.HYBRID_RRF_K) -> List[str]:
+    scores: Dict[str, float] = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    벡터 검색 + BM25 검색을 RRF로 결합하는 LangChain 검색기.
+    질문이 정책 제목과 정확히 일치하면 벡터 검색 없이 해당 정책의 전체 청크를 청크 순서대로 반환합니다.
+    """
+    vectorstore: Any
+    lexical_index: Any
+    k: int = settings.SEARCH_K
+    fetch_k: int = settings.HYBRID_FETCH_K
+    rrf_k: int = settings.HYBRID_RRF_K
+    title_fast_path: bool = settings.HYBRID_TITLE_FAST_PATH
+    search_kwargs: Dict[str, Any] = {}
+
+    # 청크 ID 순서대로 벡터 저장소에서 Document 조회
+    def _load_documents(self, ids: List[str]) -> List[Document]:
+        if not ids:
+            return []
+        stored = self.vectorstore.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            doc_id: Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
+    # 제목이 일치한 청크(제목 헤더가 있는 첫 청크)를 같은 정책의 전체 청크로 확장해서 청크 순서대로 반환
+    # 정책 ID가 있으면 정책 ID로, 없으면 같은 파일의 같은 제목 블록으로 찾음
+    def _load_policy_documents(self, matched: List[Document]) -> List[Document]:
+        docs_by_id: Dict[str, Document] = {}
+        for doc in matched:
+            docs_by_id[doc.id] = doc
+            policy_id = doc.metadata.get("policy_id")
+            if policy_id:
+                where = {"policy_id": policy_id}
+            elif doc.metadata.get("relative_path") and doc.metadata.get("title"):
+                where = {"$and": [{"relative_path": doc.metadata["relative_path"]}, {"title": doc.metadata["title"]}]}
+            else:
+                continue
+            stored = self.vectorstore.get(where=where, include=["documents", "metadatas"])
+            for doc_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                docs_by_id.setdefault(doc_id, Document(page_content=text, metadata=metadata or {}, id=doc_id))
+        return sorted(docs_by_id.values(),
+                      key=lambda d: (d.metadata.get("relative_path", ""), d.metadata.get("chunk_index", 0)))
+
+    # kwargs : retriever.invoke(question, filter=where)로 전달된 검색 옵션 (search_kwargs보다 우선)
+    #          embedding : 이미 계산한 질문 임베딩이 있으면 벡터 검색에서 다시 임베딩하지 않음
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any) -> List[Document]:
+        search_kwargs = {**self.search_kwargs, **kwargs}
+        embedding = search_kwargs.pop("embedding", None)
+        where = search_kwargs.get("filter")
+        if self.title_fast_path and not where:
+            title_ids = self.lexical_index.match_title(query)
+            if title_ids:
+                docs = self._load_policy_documents(self._load_documents(title_ids))
+                logger.debug(f"제목 빠른 경로: '{query}' -> 청크 {len(docs)}개")
+                return docs
+
+        if embedding is not None:
+            vector_docs = self.vectorstore.similarity_search_by_vector(embedding, k=self.fetch_k, **search_kwargs)
+        else:
+            vector_docs = self.vectorstore.similarity_search(query, k=self.fetch_k, **search_kwargs)
+        if where:
+            # 메타데이터 필터는 벡터 검색에만 적용되므로, BM25 후보를 넉넉히 뽑아 필터를 통과한 청크만 사용
+            allowed = set(self.vectorstore.get(where=where, include=[])["ids"])
+            lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(query, self.fetch_k * 4) if doc_id in allowed]
+            lexical_ids = lexical_ids[:self.fetch_k]
+        else:
+            lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(query, self.fetch_k)]
+
+        docs_by_id = {get_chunk_id(doc): doc for doc in vector_docs}
+        fused_ids = reciprocal_rank_fusion([list(docs_by_id), lexical_ids], self.rrf_k)[:self.k]
+        missing = [doc_id for doc_id in fused_ids if doc_id not in docs_by_id]
+        for doc in self._load_documents(missing):
+            docs_by_id[doc.id] = doc
+        return [docs_by_id[doc_id] for doc_id in fused_ids if doc_id in docs_by_id]
@@ -9,15 +9,22 @@ uvicorn main:app --host 0.0.0.0 --port 8000 --log-level info
 """
 # FastAPI - fastapi의 핵심 클래스, 객체 생성을 위한 import
 # HTTPException - 클라이언트에 오류 메시지를 JSON 형식으로 반환
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Response
 # react와의 연결을 위해 import
 from fastapi.middleware.cors import CORSMiddleware
+# 동기(blocking) 함수를 이벤트 루프 밖의 스레드 풀에서 실행하기 위한 import
+from fastapi.concurrency import run_in_threadpool
 # 데이터 타입 유효성 검사와 응답 모델 정의를 위한 import
 # 제미나이 LLM이 text 데이터를 생성하더라도 클라이언트가 이해할 수 있는 형태로(JSON 등) 감싸주고,
 # 해당 타입으로 응답할 것임을 fast api에 알리는 역할
 from pydantic import BaseModel
 # 로그
 import logging
+# 백그라운드 초기화 스레드
+import threading
+# 관리자 토큰 비교
+import hmac
+from typing import Optional, TYPE_CHECKING
 # 유저별 대화 기록 저장 및
 from chat_memory import UserChatMemory
 
@@ -26,7 +33,10 @@ from config import settings, create_initial_directories
 
 
 # RAG 파이프라인 클래스 가져오기 - 내 파일
-from rag_main_runner import RAGPipeline
+# rag_main_runner는 langchain_community, torch 등 로드가 느린 모듈을 불러오므로
+# 모듈 로드 시점이 아니라 파이프라인을 실제로 생성할 때 import (_initialize_rag_pipeline 참고)
+if TYPE_CHECKING:
+    from rag_main_runner import RAGPipeline
 
 # 로거 설정(추후에 로거 단독 모듈로 분리 예정)
 # 이해되지 않는 부분이 많아 모듈화 진행하면서 다시 정리하는 게 좋을 듯
@@ -48,7 +58,53 @@ app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG_MODE)
 # RAG 파이프라인 인스턴스를 담을 변수 선언.
 # 초기값은 None이며, 애플리케이션 시작 시 (lifespan 또는 startup_event 내에서)
 # 실제 RAGPipeline 객체가 생성되어 할당될 예정.
-rag_pipeline_instance: RAGPipeline | None = None
+rag_pipeline_instance: "RAGPipeline | None" = None
+# 파이프라인 초기화 상태 : "not_started" | "initializing" | "ready" | "failed"
+pipeline_init_state: str = "not_started"
+# 백그라운드 초기화와 첫 요청의 지연 초기화가 동시에 실행되지 않도록 잠금
+_pipeline_init_lock = threading.Lock()
+# DATA_PATH 변경 감지 후 재색인하는 백그라운드 스레드 (CORPUS_WATCH_ENABLED)
+corpus_watcher = None
+
+# RAG 파이프라인 생성 (이미 생성되어 있으면 기존 인스턴스 반환)
+# settings.PIPELINE_INIT_MODE에 따라 startup_event, 백그라운드 스레드, 첫 /ask 요청 중 한 곳에서 호출됨
+def _initialize_rag_pipeline():
+    global rag_pipeline_instance, pipeline_init_state
+    with _pipeline_init_lock:
+        if rag_pipeline_instance is not None:
+            return rag_pipeline_instance
+        pipeline_init_state = "initializing"
+        try:
+            logger.info("RAG 파이프라인 초기화를 시작합니다...")
+            from rag_main_runner import RAGPipeline
+
+            # RAGPipeline 클래스의 인스턴스를 생성해서 rag_pipeline_instance 변수에 할당
+            # 이는 모듈 레벨이라고 지칭할 수 있는데, 자바에서 static 변수와 유사한 개념
+            rag_pipeline_instance = RAGPipeline(
+                data_path=str(settings.DATA_PATH), # 원본 데이터 디렉토리 경로 전달
+                vectorstore_path=str(settings.VECTORSTORE_PATH), # 벡터DB 경로 전달
+                # force_create_db=True : 기존 벡터DB가 존재하더라도 항상 새로운 벡터DB를 생성
+                # 개발 편의상 False로 두거나, 필요시 True로 변경하여 테스트
+                force_create_db=False
+            )
+            pipeline_init_state = "ready"
+            logger.info("RAG 파이프라인 초기화 성공.")
+            _start_corpus_watcher()
+        except Exception as e:
+            pipeline_init_state = "failed"
+            # exc_info=True : 자바에서의 e.printStackTrace()와 유사한 역할
+            logger.error(f"RAG 파이프라인 초기화 중 심각한 오류 발생: {e}", exc_info=True)
+            # rag_pipeline_instance는 초기값인 None으로 유지되어 API 요청이 들어오면 오류 반환
+    return rag_pipeline_instance
+
+# 파이프라인 초기화 후 코퍼스 변경 감시 시작
+def _start_corpus_watcher():
+    global corpus_watcher
+    if not settings.CORPUS_WATCH_ENABLED or corpus_watcher is not None:
+        return
+    from corpus_watcher import CorpusWatcher
+    corpus_watcher = CorpusWatcher(rag_pipeline_instance)
+    corpus_watcher.start()
 
 # --- FastAPI 시작 시 실행될 이벤트 핸들러 ---
 # FastAPI 애플리케이션의 시작 시점과 종료 시점에 특정 코드를 실행할 수 있도록 해주는 메커니즘
@@ -56,34 +112,38 @@ rag_pipeline_instance: RAGPipeline | None = None
 @app.on_event("startup")
 async def startup_event():
     logger.info("--- startup_event 시작 ---")  # startup_event 시작 확인
-    global rag_pipeline_instance # 전역 변수를 사용하겠다고 선언
+    global pipeline_init_state # 전역 변수를 사용하겠다고 선언
     logger.info(f"애플리케이션 '{settings.APP_NAME}' 시작...")
     logger.info(f"디버그 모드: {settings.DEBUG_MODE}")
     logger.info(f"데이터 경로: {settings.DATA_PATH}")
     logger.info(f"벡터 저장소 경로: {settings.VECTORSTORE_PATH}")
-
-    try:
-        # 초기 디렉토리 생성 (DATA_PATH 등)
-        # config.py에 정의된 함수
-        # 디렉토리 존재 여부를 확인하고, 없다면 새로 생성해주는 역할
-        create_initial_directories()
-
-        logger.info("RAG 파이프라인 초기화를 시작합니다...")
-
-        # RAGPipeline 클래스의 인스턴스를 생성해서 rag_pipeline_instance 변수에 할당
-        # 이는 모듈 레벨이라고 지칭할 수 있는데, 자바에서 static 변수와 유사한 개념
-        rag_pipeline_instance = RAGPipeline(
-            data_path=str(settings.DATA_PATH), # 원본 데이터 디렉토리 경로 전달
-            vectorstore_path=str(settings.VECTORSTORE_PATH), # 벡터DB 경로 전달
-            # force_create_db=True : 기존 벡터DB가 존재하더라도 항상 새로운 벡터DB를 생성
-            # 개발 편의상 False로 두거나, 필요시 True로 변경하여 테스트
-            force_create_db=False
-        )
-        logger.info("RAG 파이프라인 초기화 성공.")
-    except Exception as e:
-        # exc_info=True : 자바에서의 e.printStackTrace()와 유사한 역할
-        logger.error(f"RAG 파이프라인 초기화 중 심각한 오류 발생: {e}", exc_info=True)
-        # rag_pipeline_instance는 초기값인 None으로 유지되어 API 요청이 들어오면 오류 반환
+    logger.info(f"벡터 저장소 읽기 전용(indexer.py 색인 결과만 로드): {settings.VECTORSTORE_READ_ONLY}")
+    logger.info(f"파이프라인 초기화 모드: {settings.PIPELINE_INIT_MODE}")
+
+    # 초기 디렉토리 생성 (DATA_PATH 등)
+    # config.py에 정의된 함수
+    # 디렉토리 존재 여부를 확인하고, 없다면 새로 생성해주는 역할
+    create_initial_directories()
+
+    if settings.PIPELINE_INIT_MODE == "background":
+        # 서버는 바로 요청을 받기 시작하고, 모델 로드와 벡터DB 동기화는 백그라운드에서 진행
+        # 초기화가 끝나기 전의 /ask 요청은 503으로 응답
+        pipeline_init_state = "initializing"
+        threading.Thread(target=_initialize_rag_pipeline, name="rag-pipeline-init", daemon=True).start()
+    elif settings.PIPELINE_INIT_MODE == "lazy":
+        # 첫 /ask 요청이 들어올 때 초기화 (/clear_history, / 만 처리하는 워커는 모델을 로드하지 않음)
+        logger.info("RAG 파이프라인은 첫 /ask 요청 시 초기화됩니다.")
+    else:
+        # eager : 기존과 같이 시작 시점에 초기화를 끝낸 뒤 요청을 받음
+        _initialize_rag_pipeline()
+
+    if not settings.ADMIN_TOKEN:
+        logger.warning("ADMIN_TOKEN이 설정되지 않아 /admin/* 엔드포인트를 비활성화합니다. (404 응답)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if corpus_watcher is not None:
+        corpus_watcher.stop()
 
 
 # --- CORS 미들웨어 설정 ---
@@ -99,6 +159,11 @@ app.add_middleware(
 class SearchRequest(BaseModel):
     member_id: str
     question: str
+    # 선택 검색 필터 (지정하지 않으면 질문에서 추론)
+    category: Optional[str] = None # 정책 분류 (예: "주거")
+    region: Optional[str] = None # 광역 지자체 (예: "서울")
+    district: Optional[str] = None # 자치구 (예: "강남구")
+    open_only: Optional[bool] = None # True면 현재 신청 가능한 정책만
 
 # --- 응답 모델 정의 ---
 class SearchResponse(BaseModel):
@@ -116,6 +181,15 @@ async def search_rag_system(request_data: SearchRequest):
 
     logger.info(f"'/ask' 엔드포인트 수신 - 사용자 ID: {member_id}, 질문: {question_text}")
 
+    # lazy 모드에서는 첫 요청 시 파이프라인 생성 (동시에 들어온 요청은 잠금에서 대기)
+    if rag_pipeline_instance is None and settings.PIPELINE_INIT_MODE == "lazy":
+        await run_in_threadpool(_initialize_rag_pipeline)
+
+    # 백그라운드 초기화가 아직 진행 중이면
+    if rag_pipeline_instance is None and pipeline_init_state == "initializing":
+        logger.warning("RAG 파이프라인 초기화가 진행 중이라 요청을 처리할 수 없습니다.")
+        raise HTTPException(status_code=503, detail="RAG 시스템을 준비 중입니다. 잠시 후 다시 시도해주세요.")
+
     # startup_event에서 rag_pipeline_instance 생성에 실패했으면 (기본값이 None임)
     if rag_pipeline_instance is None:
         logger.error("RAG 파이프라인이 초기화되지 않아 요청을 처리할 수 없습니다.")
@@ -152,9 +226,22 @@ async def search_rag_system(request_data: SearchRequest):
 
         chat_history = chat_memory_manager.get_chat_messages()
 
-        answer_str = rag_pipeline_instance.query(
+        # query는 임베딩/검색/LLM 호출을 동기로 수행하므로 스레드 풀에서 실행
+        # 이벤트 루프가 막히지 않아 여러 /ask 요청이 동시에 처리됨 (질문 임베딩은 마이크로 배처에서 묶임)
+        filters = {
+            key: value for key, value in {
+                "category": request_data.category,
+                "region": request_data.region,
+                "district": request_data.district,
+                "open_only": request_data.open_only,
+            }.items() if value
+        }
+        answer_str = await run_in_threadpool(
+            rag_pipeline_instance.query,
             question_text,
-            history=chat_history
+            history=chat_history,
+            filters=filters or None,
+            member_id=member_id
         )
 
         chat_memory_manager.add_question(question_text)
@@ -185,18 +272,75 @@ async def clear_user_history(request_data: ClearHistoryRequest):
             history_file_path=str(settings.CHAT_HISTORY_FILE)
         )
         chat_memory_manager.clear_history()
+        # 후속 질문용으로 보관 중인 직전 검색 문맥도 함께 삭제
+        if rag_pipeline_instance is not None:
+            rag_pipeline_instance.clear_member_context(member_id)
         logger.info(f"사용자 '{member_id}'의 대화 기록이 성공적으로 삭제되었습니다.")
         return {"message": f"사용자 '{member_id}'의 대화 기록이 삭제되었습니다."}
     except Exception as e:
         logger.error(f"사용자 '{member_id}'의 대화 기록 삭제 중 오류 발생: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="대화 기록 삭제 중 오류가 발생했습니다.")
 
+@app.get("/stats")
+async def pipeline_stats():
+    if rag_pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다.")
+    return rag_pipeline_instance.get_stats()
+
+# 관리자 토큰 확인 (settings.ADMIN_TOKEN이 비어있으면 /admin/* 자체를 없는 경로로 응답)
+def _check_admin_token(token: Optional[str]):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+# 데이터 디렉토리 변경 사항을 새 벡터 저장소 버전에 반영하고, 검증을 통과하면 검색 구성 요소를 교체 (서버 재시작 없음, 처리 중인 질문은 이전 코퍼스로 계속 처리)
+# wait=false : 백그라운드에서 실행하고 바로 202 반환 (진행 상황은 GET /admin/reindex)
+# wait=true : 재색인이 끝날 때까지 기다렸다가 결과 반환
+# full=true : 현재 버전을 복사하지 않고 전체 재생성 | force=true : 검증 실패/rollback으로 기록된 코퍼스도 다시 생성
+@app.post("/admin/reindex", status_code=202)
+async def admin_reindex(response: Response, wait: bool = False, full: bool = False, force: bool = False,
+                        x_admin_token: Optional[str] = Header(default=None)):
+    _check_admin_token(x_admin_token)
+    if rag_pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다.")
+    logger.info(f"'/admin/reindex' 엔드포인트 수신 (wait={wait}, full={full}, force={force})")
+    if wait:
+        response.status_code = 200
+        return await run_in_threadpool(rag_pipeline_instance.reindex, full, force)
+    if rag_pipeline_instance.is_reindexing():
+        return {"status": "busy"}
+    threading.Thread(target=rag_pipeline_instance.reindex, args=(full, force), name="rag-reindex", daemon=True).start()
+    return {"status": "started"}
+
+# 이전 벡터 저장소 버전(또는 target 버전)으로 되돌리기 (다른 워커는 다음 코퍼스 변경 확인 때 같은 버전을 로드)
+@app.post("/admin/rollback")
+async def admin_rollback(target: Optional[str] = None, x_admin_token: Optional[str] = Header(default=None)):
+    _check_admin_token(x_admin_token)
+    if rag_pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다.")
+    logger.info(f"'/admin/rollback' 엔드포인트 수신 (target={target})")
+    result = await run_in_threadpool(rag_pipeline_instance.rollback, target)
+    if result["status"] == "busy":
+        raise HTTPException(status_code=409, detail="재색인이 실행 중입니다. 잠시 후 다시 시도해주세요.")
+    if result["status"] == "failed":
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@app.get("/admin/reindex")
+async def admin_reindex_status(x_admin_token: Optional[str] = Header(default=None)):
+    _check_admin_token(x_admin_token)
+    if rag_pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다.")
+    return rag_pipeline_instance.get_stats()["corpus"]
+
 @app.get("/")
 # 비동기 함수의 정의
 async def root():
     logger.info("루트 엔드포인트 '/' 요청 수신")
     # 모듈 레벨의 상태를 확인하고 알맞은 문자열을 반환
-    return {"message": f"Welcome to {settings.APP_NAME}! RAG System Status: {'Ready' if rag_pipeline_instance else 'Not Ready'}"}
+    status = "Ready" if rag_pipeline_instance else ("Initializing" if pipeline_init_state == "initializing" else "Not Ready")
+    return {"message": f"Welcome to {settings.APP_NAME}! RAG System Status: {status}"}
 
 logger.info("--- main.py 파일 로드 완료 ---")
 # --- Uvicorn으로 실행 (개발 시 터미널에서 직접 실행 권장) ---
@@ -0,0 +1,258 @@
+# onnx_embeddings.py
+"""
+KURE 임베딩 모델을 ONNX 그래프로 변환하고, ONNX Runtime(CPU)으로 실행하는 임베딩 백엔드를 제공합니다.
+
+- export_onnx_model : sentence-transformers 모델을 ONNX로 변환하고 동적 int8 양자화 모델을 함께 생성
+- OnnxEmbeddings : LangChain Embeddings 인터페이스 구현 (torch 없이 onnxruntime + tokenizers만 사용)
+- verify_onnx_compatibility : torch 백엔드 벡터와 코사인 유사도로 호환성 확인
+
+변환은 torch가 설치된 환경에서 한 번만 실행하면 되고,
+API 워커는 변환된 모델 디렉토리만 있으면 torch 없이 동작합니다.
+
+python onnx_embeddings.py export   # 모델 변환 + int8 양자화
+python onnx_embeddings.py verify   # torch 백엔드와 벡터 호환성 확인 (예시 문장 + 코퍼스의 가장 긴 청크)
+"""
+import json
+from pathlib import Path
+from typing import List, Dict, Any
+# 로거
+import logging
+
+import numpy as np
+# LangChain 임베딩 인터페이스
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 변환 결과물 파일 이름
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+EMBEDDING_CONFIG_FILE = "embedding_config.json"
+
+
+# sentence-transformers 모델을 ONNX로 변환하고 int8 양자화 모델을 생성
+def export_onnx_model(model_name: str = settings.EMBEDDING_MODEL_NAME,
+                      output_dir: Path = settings.ONNX_MODEL_DIR,
+                      quantize: bool = True) -> Path:
+    # 변환 시에만 필요한 무거운 모듈은 함수 안에서 import
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"ONNX 변환 시작: '{model_name}' -> '{output_dir}'")
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model
+    tokenizer = st_model.tokenizer
+    transformer.eval()
+
+    # sentence-transformers의 Pooling 설정을 그대로 따름 (KURE-v1은 CLS 풀링)
+    pooling_module = st_model[1]
+    pooling = "cls" if getattr(pooling_module, "pooling_mode_cls_token", False) else "mean"
+
+    # 원본 모델과 같은 길이까지 임베딩해야 긴 청크(CHUNK_SIZE 1650자)도 잘리지 않고 torch 벡터와 같아짐
+    max_seq_length = settings.ONNX_MAX_SEQ_LENGTH or st_model.max_seq_length or tokenizer.model_max_length
+
+    dummy = tokenizer(["임베딩 변환용 예시 문장입니다."], return_tensors="pt")
+    fp32_path = output_dir / ONNX_FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            # 배치 크기와 문장 길이는 실행 시점에 결정
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=17,
+        )
+    # fast tokenizer 정의(tokenizer.json)를 함께 저장 -> 실행 시 transformers 없이 tokenizers만 사용
+    tokenizer.save_pretrained(str(output_dir))
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        logger.info("동적 int8 양자화 진행 중...")
+        quantize_dynamic(
+            model_input=str(fp32_path),
+            model_output=str(output_dir / ONNX_INT8_FILE),
+            weight_type=QuantType.QInt8,
+            # fp32 모델이 2GB를 넘으면 가중치가 외부 데이터 파일로 저장되어 있음
+            use_external_data_format=True,
+        )
+
+    embedding_config = {
+        "model_name": model_name,
+        "pooling": pooling,
+        "normalize": True,
+        "max_seq_length": max_seq_length,
+        "quantized": quantize,
+    }
+    with open(output_dir / EMBEDDING_CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(embedding_config, f, indent=4, ensure_ascii=False)
+
+    logger.info(f"ONNX 변환 완료 (풀링: {pooling}, 최대 토큰: {max_seq_length}, int8: {quantize})")
+    return output_dir
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    export_onnx_model로 변환된 모델을 ONNX Runtime(CPU)으로 실행하는 임베딩 클래스.
+    HuggingFaceEmbeddings와 동일하게 정규화된 벡터를 반환합니다.
+    """
+    def __init__(self,
+                 model_dir: Path = settings.ONNX_MODEL_DIR,
+                 use_int8: bool = settings.ONNX_USE_INT8,
+                 batch_size: int = 32,
+                 intra_op_threads: int = settings.ONNX_INTRA_OP_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        config_path = self.model_dir / EMBEDDING_CONFIG_FILE
+        if not config_path.is_file():
+            raise FileNotFoundError(f"ONNX 임베딩 설정 파일이 없습니다: '{config_path}' (export_onnx_model을 먼저 실행하세요)")
+        with open(config_path, "r", encoding="utf-8") as f:
+            self.embedding_config: Dict[str, Any] = json.load(f)
+
+        self.source_model_name: str = self.embedding_config.get("model_name", "")
+        self.pooling: str = self.embedding_config.get("pooling", "cls")
+        self.normalize: bool = self.embedding_config.get("normalize", True)
+        self.batch_size = batch_size
+
+        model_file = ONNX_INT8_FILE if use_int8 else ONNX_FP32_FILE
+        model_path = self.model_dir / model_file
+        if not model_path.is_file():
+            raise FileNotFoundError(f"ONNX 모델 파일이 없습니다: '{model_path}'")
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            session_options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"]
+        )
+
+        # ONNX 그래프는 길이 제한이 없으므로 잘라낼 길이는 설정값 -> 변환 시 기록한 원본 모델 길이 순으로 결정
+        self.max_seq_length: int = settings.ONNX_MAX_SEQ_LENGTH or self.embedding_config.get("max_seq_length") or 512
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        # 최대 길이를 넘어 잘린 문장 수 (verify 결과와 경고 로그에 사용)
+        self.truncated_texts = 0
+        # 배치 내 최장 문장 길이에 맞춰 패딩
+        pad_id = self.tokenizer.token_to_id("<pad>")
+        self.tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token="<pad>")
+
+    # 문장 배치 1개를 임베딩해서 (배치 크기, 차원) 배열로 반환
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        truncated = sum(1 for e in encodings if e.overflowing)
+        if truncated:
+            if not self.truncated_texts:
+                logger.warning(f"ONNX 임베딩 입력이 최대 토큰 길이({self.max_seq_length})를 넘어 잘렸습니다. "
+                               f"torch 백엔드 벡터와 달라지므로 ONNX_MAX_SEQ_LENGTH 또는 변환 설정을 확인하세요.")
+            self.truncated_texts += truncated
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        last_hidden_state = self.session.run(
+            ["last_hidden_state"],
+            {"input_ids": input_ids, "attention_mask": attention_mask}
+        )[0]
+
+        if self.pooling == "cls":
+            vectors = last_hidden_state[:, 0]
+        else:
+            # 패딩 토큰을 제외한 평균
+            mask = attention_mask[..., None].astype(np.float32)
+            vectors = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # 길이가 비슷한 문장끼리 묶어서 패딩 낭비를 줄이고, 원래 순서로 되돌림
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results: List[List[float] | None] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch_indexes = order[start:start + self.batch_size]
+            vectors = self._encode_batch([texts[i] for i in batch_indexes])
+            for idx, vector in zip(batch_indexes, vectors):
+                results[idx] = vector.tolist()
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode_batch([text])[0].tolist()
+
+
+# ONNX 벡터와 torch 백엔드 벡터의 코사인 유사도를 비교해 호환성 확인
+def verify_onnx_compatibility(texts: List[str],
+                              onnx_embeddings: Embeddings | None = None,
+                              torch_embeddings: Embeddings | None = None,
+                              min_cosine: float = settings.ONNX_MIN_COSINE) -> Dict[str, Any]:
+    from rag_utils import get_embedding_model
+
+    onnx_embeddings = onnx_embeddings or get_embedding_model(backend="onnx")
+    torch_embeddings = torch_embeddings or get_embedding_model(backend="torch")
+
+    onnx_vectors = np.array(onnx_embeddings.embed_documents(texts), dtype=np.float32)
+    torch_vectors = np.array(torch_embeddings.embed_documents(texts), dtype=np.float32)
+    # 두 백엔드 모두 정규화된 벡터이므로 내적이 곧 코사인 유사도
+    cosines = (onnx_vectors * torch_vectors).sum(axis=1)
+
+    result = {
+        "texts": len(texts),
+        "max_chars": max(len(text) for text in texts),
+        "truncated_texts": getattr(onnx_embeddings, "truncated_texts", None),
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "tolerance": min_cosine,
+        "compatible": bool(cosines.min() >= min_cosine) and not getattr(onnx_embeddings, "truncated_texts", 0),
+    }
+    if result["compatible"]:
+        logger.info(f"ONNX 벡터 호환성 확인 완료: {result}")
+    else:
+        logger.warning(f"ONNX 벡터가 허용 오차를 벗어났습니다. 기존 벡터 저장소와 섞어 쓰지 말고 재색인하세요: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="KURE 임베딩 모델 ONNX 변환/검증")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--no-quantize", action="store_true", help="int8 양자화 모델을 만들지 않음")
+    parser.add_argument("--long-chunks", type=int, default=16,
+                        help="verify에 함께 넣을 코퍼스의 가장 긴 청크 수 (0이면 예시 문장만 사용)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx_model(quantize=not args.no_quantize)
+    else:
+        sample_texts = [
+            "청년 월세 지원 신청자격은 어떻게 되나요?",
+            "서울시 청년수당 신청방법이 궁금해요",
+            "사업개요: 서울에 거주하는 미취업 청년에게 구직활동 지원금을 지급합니다.",
+            "지원내용 월 50만원, 최대 6개월 지급",
+        ]
+        if args.long_chunks > 0:
+            # 짧은 예시 문장만으로는 최대 토큰 길이 차이를 잡지 못하므로 실제 코퍼스의 가장 긴 청크를 함께 비교
+            from embedding_benchmark import load_corpus_chunks
+            chunks = load_corpus_chunks(max_chunks=None)
+            sample_texts += sorted(chunks, key=len, reverse=True)[:args.long_chunks]
+        print(verify_onnx_compatibility(sample_texts))
@@ -0,0 +1,229 @@
+# policy_db.py
+"""
+크롤링한 정책(title, url)을 policies 테이블에 묶음 단위로 저장합니다.
+
+기존 DataCollection.py는 정책마다 cursor.execute로 INSERT를 한 번씩 보내고, 중복은 행마다
+IntegrityError를 잡아서 판단해서 DB 왕복 횟수가 정책 수만큼 생깁니다.
+
+- OraclePolicyWriter : oracledb 연결 풀 + executemany(배열 DML)로 batch_size개씩 MERGE
+  (unique_title_url(title, url)에 이미 있으면 건너뜀), batcherrors로 행별 오류를 모아서 보고하고 묶음마다 커밋
+- SqlitePolicyWriter : 같은 인터페이스의 SQLite 구현 (Oracle 없이 로컬에서 크롤러 실행/측정)
+
+MERGE는 같은 행을 다시 넣어도 중복되지 않으므로, 크롤링을 이어서 실행할 때(--resume)
+이전 실행에서 커밋되지 않았을 수 있는 행을 다시 보내도 안전합니다.
+묶음 저장이 실패하면(일시적인 DB 오류 등) 행을 버리지 않고 남겨 두었다가 다음 flush에서 다시 저장하고,
+add(on_saved=...)로 받은 콜백은 그 행이 커밋된 뒤에만 호출합니다. (크롤러는 이때 정책 ID를 저장 완료로 기록)
+
+python policy_db.py --rows 20000 --batch-size 500   # SQLite로 행 단위 INSERT와 묶음 저장 비교
+
+이 모듈은 크롤러에서 사용하므로 config(Settings) 대신 인자로 설정을 받습니다.
+"""
+import time
+import sqlite3
+import argparse
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional, Callable
+
+try:
+    import oracledb
+except ImportError:
+    oracledb = None
+
+# 커밋 단위 기본값 (DataCollection.py --db-batch-size 기본값)
+DEFAULT_DB_BATCH_SIZE = 200
+# 연결 풀 최대 연결 수 (크롤러는 저장 단계가 하나라서 작게 유지)
+DEFAULT_POOL_MAX = 2
+
+# (title, url)이 이미 있으면 건너뛰는 MERGE (policies.unique_title_url)
+ORACLE_MERGE_SQL = """
+MERGE INTO policies p
+USING (SELECT :1 AS title, :2 AS url FROM dual) s
+ON (p.title = s.title AND p.url = s.url)
+WHEN NOT MATCHED THEN INSERT (title, url) VALUES (s.title, s.url)
+"""
+SQLITE_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS policies (
+    policy_no INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    CONSTRAINT unique_title_url UNIQUE (title, url)
+)
+"""
+SQLITE_INSERT_SQL = "INSERT INTO policies (title, url) VALUES (?, ?) ON CONFLICT (title, url) DO NOTHING"
+
+
+class PolicyDbWriter(ABC):
+    """
+    정책 행을 모아두었다가 batch_size개가 되면 한 번에 저장/커밋합니다.
+    with 블록을 벗어나거나 close()를 호출하면 남은 행을 저장합니다.
+    """
+    def __init__(self, batch_size: int = DEFAULT_DB_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.pending: List[Tuple[str, str]] = []
+        # pending과 같은 순서의 커밋 후 콜백
+        self._pending_callbacks: List[Optional[Callable[[], None]]] = []
+        # 지표
+        self.inserted = 0
+        self.skipped = 0
+        self.batches = 0
+        # 저장하지 못한 행: [(title, url, 오류 메시지)]
+        self.errors: List[Tuple[str, str, str]] = []
+
+    def __enter__(self) -> "PolicyDbWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # on_saved : 이 행이 커밋된 뒤 호출 (행 오류로 저장되지 않으면 호출하지 않음)
+    def add(self, title: str, url: str, on_saved: Optional[Callable[[], None]] = None):
+        self.pending.append((title, url))
+        self._pending_callbacks.append(on_saved)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    # 모아둔 행 저장 + 커밋 (실패하면 예외를 그대로 올리고 행은 pending에 남겨서 다음 flush에서 다시 저장)
+    def flush(self):
+        if not self.pending:
+            return
+        rows, callbacks = list(self.pending), list(self._pending_callbacks)
+        inserted, errors = self._write_batch(rows)
+        # 커밋이 끝난 행만 대기열에서 제거
+        del self.pending[:len(rows)]
+        del self._pending_callbacks[:len(rows)]
+        self.batches += 1
+        self.inserted += inserted
+        self.skipped += len(rows) - inserted - len(errors)
+        failed_offsets = set()
+        for offset, message in errors:
+            title, url = rows[offset]
+            failed_offsets.add(offset)
+            self.errors.append((title, url, message))
+            print(f"[DB ERROR] 제목 : {title} | 오류 : {message}")
+        for offset, callback in enumerate(callbacks):
+            if callback is not None and offset not in failed_offsets:
+                callback()
+
+    # 하위 클래스 구현: 행 묶음 저장 + 커밋 -> (새로 저장된 행 수, [(행 위치, 오류 메시지)])
+    # 묶음 전체가 실패하면 커밋하지 않고 예외 발생
+    @abstractmethod
+    def _write_batch(self, rows: List[Tuple[str, str]]) -> Tuple[int, List[Tuple[int, str]]]:
+        ...
+
+    def _close(self):
+        pass
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "failed": len(self.errors),
+            "batches": self.batches,
+            "pending": len(self.pending),
+        }
+
+
+class OraclePolicyWriter(PolicyDbWriter):
+    def __init__(self, user: str, password: str, host: str, port: int, service_name: str,
+                 batch_size: int = DEFAULT_DB_BATCH_SIZE, pool_max: int = DEFAULT_POOL_MAX):
+        if oracledb is None:
+            raise ImportError("oracledb가 설치되어 있지 않습니다. pip install oracledb 또는 --sqlite로 실행하세요.")
+        super().__init__(batch_size)
+        dsn = oracledb.makedsn(host, port, service_name=service_name)
+        self.pool = oracledb.create_pool(user=user, password=password, dsn=dsn, min=1, max=pool_max, increment=1)
+
+    def _write_batch(self, rows: List[Tuple[str, str]]) -> Tuple[int, List[Tuple[int, str]]]:
+        with self.pool.acquire() as conn:
+            with conn.cursor() as cursor:
+                # 배열 DML 한 번으로 전송, 오류 행이 있어도 나머지 행은 처리 (batcherrors)
+                cursor.executemany(ORACLE_MERGE_SQL, rows, batcherrors=True, arraydmlrowcounts=True)
+                inserted = sum(cursor.getarraydmlrowcounts())
+                errors = [(error.offset, error.message) for error in cursor.getbatcherrors()]
+            conn.commit()
+        return inserted, errors
+
+    def _close(self):
+        self.pool.close()
+
+
+class SqlitePolicyWriter(PolicyDbWriter):
+    def __init__(self, path: str = ":memory:", batch_size: int = DEFAULT_DB_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(SQLITE_SCHEMA_SQL)
+        self.conn.commit()
+
+    def _write_batch(self, rows: List[Tuple[str, str]]) -> Tuple[int, List[Tuple[int, str]]]:
+        before = self.conn.total_changes
+        try:
+            self.conn.executemany(SQLITE_INSERT_SQL, rows)
+            errors = []
+        except sqlite3.Error:
+            # SQLite에는 batcherrors가 없으므로 오류가 나면 이 묶음만 행 단위로 다시 저장해서 오류 행을 찾음
+            self.conn.rollback()
+            before = self.conn.total_changes
+            errors = []
+            for offset, row in enumerate(rows):
+                try:
+                    self.conn.execute(SQLITE_INSERT_SQL, row)
+                except sqlite3.Error as e:
+                    errors.append((offset, str(e)))
+        self.conn.commit()
+        return self.conn.total_changes - before, errors
+
+    def _close(self):
+        self.conn.close()
+
+
+# ✅ 기존 방식 (행마다 INSERT, 중복은 IntegrityError로 판단, 행마다 커밋) -> 새로 저장된 행 수
+def insert_rows_one_by_one(conn: sqlite3.Connection, rows: List[Tuple[str, str]]) -> int:
+    inserted = 0
+    for row in rows:
+        try:
+            conn.execute("INSERT INTO policies (title, url) VALUES (?, ?)", row)
+            conn.commit()
+            inserted += 1
+        except sqlite3.IntegrityError:
+            pass
+    return inserted
+
+
+# ✅ 측정용 정책 행 (duplicate_ratio만큼 앞쪽 행을 다시 넣어서 중복 처리도 포함)
+def sample_rows(count: int, duplicate_ratio: float = 0.1) -> List[Tuple[str, str]]:
+    rows = [(f"청년 정책 {n}", f"https://youth.seoul.go.kr/infoData/plcyInfo/view.do?plcyBizId=R{n:06d}")
+            for n in range(count)]
+    return rows + rows[:int(count * duplicate_ratio)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="정책 DB 저장 방식 비교 (SQLite 파일)")
+    parser.add_argument("--rows", type=int, default=20000, help="저장할 정책 행 수")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_DB_BATCH_SIZE, help="묶음 저장 커밋 단위")
+    args = parser.parse_args()
+
+    rows = sample_rows(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.db"
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute(SQLITE_SCHEMA_SQL)
+        start = time.perf_counter()
+        inserted = insert_rows_one_by_one(conn, rows)
+        elapsed = time.perf_counter() - start
+        conn.close()
+        print(f"{'one-by-one':<12} 저장 {inserted:>7}  {elapsed:>8.2f}s  {len(rows) / elapsed:>10.0f} rows/s")
+
+        start = time.perf_counter()
+        with SqlitePolicyWriter(Path(tmp) / "batched.db", args.batch_size) as writer:
+            for title, url in rows:
+                writer.add(title, url)
+        elapsed = time.perf_counter() - start
+        print(f"{'batched':<12} 저장 {writer.inserted:>7}  {elapsed:>8.2f}s  {len(rows) / elapsed:>10.0f} rows/s"
+              f"  (중복 {writer.skipped}, 오류 {len(writer.errors)}, 커밋 {writer.batches})")
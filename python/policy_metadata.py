@@ -0,0 +1,272 @@
+# policy_metadata.py
+"""
+정책별 메타데이터(분류, 지역, 신청 기간)를 크롤러에서 벡터 저장소 청크까지 전달하고,
+질문에서 검색 필터를 추론합니다.
+
+- 크롤러(DataCollection.py)는 정책마다 구조화 레코드 한 줄을 policies.jsonl에 추가하고
+  (정책 ID, 제목, URL, 분류, 설명, 섹션 {섹션명: {항목명: 값}}), policy_metadata.json(정책 ID -> 메타데이터)을 저장
+- RAGPipeline은 policies.jsonl의 레코드를 정책마다 Document 1개로 바로 읽고 (레코드 해시로 정책 단위 변경 감지),
+  기존 형식의 데이터 파일(.txt)은 정책 블록 단위 Document로 나누어 정책 ID로 메타데이터를 찾아 청크 메타데이터에 포함
+- /ask는 명시적인 필터를 받거나 질문에서 필터를 추론해서 벡터 검색의 사전 필터(where)로 사용
+
+메타데이터 값은 Chroma where 절에서 사용할 수 있도록 문자열/정수만 사용합니다.
+(신청 기간은 YYYYMMDD 정수, 상시 모집은 apply_end = 99991231)
+
+이 모듈은 크롤러에서도 import하므로 표준 라이브러리만 사용합니다.
+"""
+import re
+import json
+import hashlib
+import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 데이터 디렉토리에 크롤러가 저장하는 메타데이터 파일 (.txt가 아니므로 색인 대상 스캔에서 제외됨)
+POLICY_METADATA_FILENAME = "policy_metadata.json"
+# 크롤러가 저장하는 구조화 정책 레코드 (한 줄에 정책 1개, 같은 정책이 다시 저장되면 마지막 줄이 우선)
+POLICY_RECORDS_FILENAME = "policies.jsonl"
+# 이전 버전 크롤러가 저장한 섹션 원본 파일 (policies.jsonl보다 먼저 읽어서 같은 정책은 policies.jsonl이 우선)
+LEGACY_POLICY_SECTIONS_FILENAME = "policy_sections.jsonl"
+# 색인 대상 목록에서 정책 레코드를 가리키는 상대 경로 접두사 ("policies.jsonl#<정책 ID>")
+POLICY_RECORD_PATH_PREFIX = f"{POLICY_RECORDS_FILENAME}#"
+# 레코드 해시에서 제외하는 항목 (다시 크롤링해도 내용이 같으면 같은 해시)
+_VOLATILE_RECORD_KEYS = ("crawled_at",)
+# 크롤러가 정책마다 데이터 파일에 저장하는 대표 질문 (answer_precompute.py에서 미리 답변 생성에도 사용)
+CANONICAL_QUESTIONS = (
+    "사업개요에 대해 알려줘",
+    "신청자격은 어떻게 되나요?",
+    "신청방법이 궁금해요",
+    "기타 정보가 있나요?",
+    "지원 내용이 뭔가요?",
+)
+# 상시 모집 정책의 신청 종료일
+ALWAYS_OPEN_END = 99991231
+
+# 광역 지자체 (질문/정책에 등장하는 짧은 이름)
+REGIONS = ("서울", "부산", "대구", "인천", "광주", "대전", "울산", "세종",
+           "경기", "강원", "충북", "충남", "전북", "전남", "경북", "경남", "제주")
+# 서울 자치구
+SEOUL_DISTRICTS = ("종로구", "중구", "용산구", "성동구", "광진구", "동대문구", "중랑구", "성북구", "강북구",
+                   "도봉구", "노원구", "은평구", "서대문구", "마포구", "양천구", "강서구", "구로구", "금천구",
+                   "영등포구", "동작구", "관악구", "서초구", "강남구", "송파구", "강동구")
+# 크롤링 대상 사이트의 기본 지역 (youth.seoul.go.kr)
+DEFAULT_SOURCE_REGION = "서울"
+
+# 신청 기간을 나타내는 항목명
+_APPLY_PERIOD_KEYS = ("신청기간", "접수기간", "모집기간", "신청 기간", "접수 기간", "모집 기간")
+# 2025.01.02 / 2025-1-2 / 2025년 1월 2일
+_DATE_PATTERN = re.compile(r"(20\d{2})\s*[.\-/년]\s*(\d{1,2})\s*[.\-/월]\s*(\d{1,2})")
+_POLICY_ID_PATTERN = re.compile(r"plcyBizId=([^&\s]+)")
+# 데이터 파일의 정책 블록: '"""제목\nURL\n본문..."""' (DataCollection.save_policy_result_to_file 형식)
+_POLICY_BLOCK_PATTERN = re.compile(r'"""([^\n"]+)\n(https?://\S+)\n(.*?)"""', re.DOTALL)
+# 데이터 파일의 정책 블록 시작: '"""제목' 다음 줄에 URL (청크 본문에서 제목 완전 일치 검색용 제목 추출)
+_POLICY_TITLE_PATTERN = re.compile(r'^"""([^\n"]+)\n(https?://\S+)', re.MULTILINE)
+# 제목 비교 시 제거할 문자 (공백, 문장 부호 등)
+_TITLE_STRIP_PATTERN = re.compile(r"[^0-9a-z가-힣]")
+# 현재 신청 가능한 정책을 묻는 표현
+_OPEN_NOW_PATTERN = re.compile(r"신청\s*가능|모집\s*중|접수\s*중|지금\s*신청|현재\s*신청")
+
+
+def extract_policy_id(url: str) -> Optional[str]:
+    match = _POLICY_ID_PATTERN.search(url)
+    return match.group(1).strip() if match else None
+
+
+# 제목 비교용 정규화 (소문자, 공백/문장 부호 제거)
+def normalize_title(text: str) -> str:
+    return _TITLE_STRIP_PATTERN.sub("", text.lower())
+
+
+# 청크 본문에 포함된 정책 제목 목록 추출 (lexical_index의 제목 완전 일치 검색에서 사용)
+def extract_policy_titles(text: str) -> List[str]:
+    return [match.group(1).strip() for match in _POLICY_TITLE_PATTERN.finditer(text)]
+
+
+def today_int() -> int:
+    return int(datetime.date.today().strftime("%Y%m%d"))
+
+
+# 신청 기간 텍스트 -> {"apply_period": 원문, "apply_start": YYYYMMDD, "apply_end": YYYYMMDD}
+def parse_apply_period(text: str) -> Dict[str, Any]:
+    period: Dict[str, Any] = {"apply_period": text.strip()}
+    if "상시" in text:
+        period["apply_end"] = ALWAYS_OPEN_END
+    dates = [int(f"{y}{int(m):02d}{int(d):02d}") for y, m, d in _DATE_PATTERN.findall(text)]
+    if dates:
+        period["apply_start"] = dates[0]
+        period.setdefault("apply_end", dates[-1])
+    return period
+
+
+# 크롤링 결과로부터 정책 메타데이터 생성
+# data_store : DataCollection.crawl_all_sections 결과 {섹션명: {항목명: 값}}
+def extract_policy_metadata(title: str,
+                            url: str,
+                            category: str = "",
+                            description: str = "",
+                            data_store: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = {"title": title, "url": url, "region": DEFAULT_SOURCE_REGION}
+    if category:
+        metadata["category"] = category
+
+    district = next((d for d in SEOUL_DISTRICTS if d in f"{title} {description}"), None)
+    if district:
+        metadata["district"] = district
+
+    for section in (data_store or {}).values():
+        for key, value in section.items():
+            if any(k in key for k in _APPLY_PERIOD_KEYS) and value:
+                metadata.update(parse_apply_period(value))
+                break
+        if "apply_period" in metadata:
+            break
+    return metadata
+
+
+def load_policy_metadata(data_path: Path) -> Dict[str, Dict[str, Any]]:
+    path = Path(data_path) / POLICY_METADATA_FILENAME
+    if not path.is_file():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"정책 메타데이터 파일 로드 실패 ({path}): {e}")
+        return {}
+
+
+def save_policy_metadata(data_path: Path, metadata: Dict[str, Dict[str, Any]]):
+    path = Path(data_path) / POLICY_METADATA_FILENAME
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+# 크롤링 결과로부터 구조화 정책 레코드 생성
+# sections : 정책 상세 페이지 파싱 결과 {섹션명: {항목명: 값}}
+def build_policy_record(policy_id: str, title: str, url: str, category: str = "", description: str = "",
+                        sections: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Any]:
+    return {
+        "policy_id": policy_id,
+        "title": title,
+        "url": url,
+        "category": category,
+        "description": description,
+        "sections": sections or {},
+        "crawled_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+# 정책 레코드를 policies.jsonl에 한 줄로 추가
+def append_policy_record(data_path: Path, record: Dict[str, Any]):
+    with open(Path(data_path) / POLICY_RECORDS_FILENAME, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# 정책 ID -> 정책 레코드 (같은 정책이 여러 번 저장되었으면 마지막 줄, 이전 버전 섹션 파일도 함께 읽음)
+def load_policy_records(data_path: Path) -> Dict[str, Dict[str, Any]]:
+    records: Dict[str, Dict[str, Any]] = {}
+    for filename in (LEGACY_POLICY_SECTIONS_FILENAME, POLICY_RECORDS_FILENAME):
+        path = Path(data_path) / filename
+        if not path.is_file():
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"정책 레코드 파일의 잘못된 줄을 건너뜁니다 ({filename}): {line[:80]}")
+                    continue
+                if record.get("policy_id"):
+                    record.setdefault("sections", {})
+                    records[record["policy_id"]] = record
+    return records
+
+
+# 정책 레코드 내용 해시 (정책 단위 변경 감지용)
+def policy_record_hash(record: Dict[str, Any]) -> str:
+    content = {key: value for key, value in record.items() if key not in _VOLATILE_RECORD_KEYS}
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# 색인 대상 상대 경로 <-> 정책 ID
+def policy_record_path(policy_id: str) -> str:
+    return f"{POLICY_RECORD_PATH_PREFIX}{policy_id}"
+
+
+def parse_policy_record_path(relative_path: str) -> Optional[str]:
+    if relative_path.startswith(POLICY_RECORD_PATH_PREFIX):
+        return relative_path[len(POLICY_RECORD_PATH_PREFIX):]
+    return None
+
+
+# 정책 레코드 -> 검색/프롬프트에 사용하는 본문 (섹션별 "항목명: 값")
+# 텍스트 데이터 파일과 같은 '"""제목\nURL ... """' 블록 형식 (extract_policy_titles로 제목 완전 일치 검색)
+def render_policy_record(record: Dict[str, Any]) -> str:
+    lines = ['"""' + record["title"], record["url"]]
+    if record.get("category"):
+        lines.append(f"분류: {record['category']}")
+    if record.get("description"):
+        lines.append(record["description"])
+    for section_name, rows in record.get("sections", {}).items():
+        lines.append(f"[{section_name}]")
+        lines.extend(f"{key}: {value}" for key, value in rows.items())
+    lines.append('"""')
+    return "\n".join(lines)
+
+
+# 데이터 파일 내용을 정책 블록 리스트로 분리 [{"title", "url", "content"}]
+# content는 블록 원문 전체('"""제목 ... """')로, 기존 청크 내용과 같은 형식을 유지
+def split_policy_blocks(text: str) -> List[Dict[str, str]]:
+    return [
+        {"title": match.group(1).strip(), "url": match.group(2).strip(), "content": match.group(0)}
+        for match in _POLICY_BLOCK_PATTERN.finditer(text)
+    ]
+
+
+# 질문에서 검색 필터 추론 (지역/자치구/분류/현재 신청 가능 여부)
+# known_categories : 정책 메타데이터에 존재하는 분류 이름 목록
+# 크롤링 대상 사이트의 기본 지역(서울)은 필터로 추론하지 않음
+# (모든 정책이 해당 지역이라 걸러낼 것이 없고, 지역 메타데이터가 없는 청크만 빠짐)
+def infer_filters(question: str, known_categories: Iterable[str] = ()) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {}
+    district = next((d for d in SEOUL_DISTRICTS if d in question and len(d) > 2), None)
+    if district:
+        filters["district"] = district
+    region = next((r for r in REGIONS if r in question), None)
+    if region and region != DEFAULT_SOURCE_REGION:
+        filters["region"] = region
+    category = next((c for c in known_categories if c and c in question), None)
+    if category:
+        filters["category"] = category
+    if _OPEN_NOW_PATTERN.search(question):
+        filters["open_only"] = True
+    return filters
+
+
+# 필터 dict -> 벡터 저장소 where 절 (Chroma 형식, 조건이 2개 이상이면 $and)
+# open_only는 where 절에 넣지 않고 검색 결과에서 is_closed로 제외
+# (where 절의 apply_end 조건은 신청 기간을 해석하지 못한 정책까지 함께 제외함)
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not filters:
+        return None
+    conditions: List[Dict[str, Any]] = []
+    for key in ("category", "region", "district"):
+        if filters.get(key):
+            conditions.append({key: filters[key]})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+# 신청 종료일이 지난 정책인지 (apply_end가 없으면 마감 여부를 알 수 없으므로 마감으로 보지 않음)
+def is_closed(metadata: Dict[str, Any], today: Optional[int] = None) -> bool:
+    apply_end = metadata.get("apply_end")
+    return isinstance(apply_end, int) and apply_end < (today or today_int())
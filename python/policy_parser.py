@@ -0,0 +1,168 @@
+# policy_parser.py
+"""
+청년 정책 사이트(youth.seoul.go.kr) 목록/상세 페이지의 URL 생성과 HTML 파싱.
+
+DataCollection.py(동기 크롤러)와 async_crawler.py(비동기 크롤러)가 같은 파싱 로직을 사용하도록
+네트워크 요청 없이 HTML 문자열만 받아서 처리합니다.
+
+상세 페이지는 한 번만 파싱해서(parse_policy_detail) 제목, 분류, 섹션을 같은 DOM에서 추출합니다.
+파서 백엔드
+- "html.parser" : BeautifulSoup + 표준 라이브러리 파서 (기존 방식, 추가 설치 없음)
+- "lxml"        : BeautifulSoup + lxml 트리 빌더 (같은 BeautifulSoup 코드, 파싱만 빠름)
+- "lxml-html"   : lxml.html + XPath 직접 사용 (BeautifulSoup 객체를 만들지 않아 가장 빠름)
+lxml이 설치되어 있지 않으면 "html.parser"를 사용합니다.
+"""
+from typing import List, Dict, Any, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# 크롤링 대상 사이트 (크롤러 벤치마크에서는 로컬 fixture 서버 주소로 바꿔서 사용)
+BASE_URL = "https://youth.seoul.go.kr"
+PARSER_BACKENDS = ("html.parser", "lxml", "lxml-html")
+# lxml이 있으면 가장 빠른 백엔드를 기본값으로 사용
+DEFAULT_PARSER = "lxml-html" if lxml_html is not None else "html.parser"
+
+
+# ✅ 파서 백엔드 이름 확인 (lxml이 없으면 html.parser로 대체)
+def resolve_parser(parser: Optional[str] = None) -> str:
+    parser = parser or DEFAULT_PARSER
+    if parser not in PARSER_BACKENDS:
+        raise ValueError(f"지원하지 않는 파서 백엔드입니다: {parser} (사용 가능: {', '.join(PARSER_BACKENDS)})")
+    if parser != "html.parser" and lxml_html is None:
+        print(f"⚠️ lxml이 설치되어 있지 않아 '{parser}' 대신 html.parser를 사용합니다.")
+        return "html.parser"
+    return parser
+
+
+# BeautifulSoup 트리 빌더 이름 ("lxml-html"은 목록 페이지 파싱 시 lxml 트리 빌더로 처리)
+def _soup_builder(parser: str) -> str:
+    return "html.parser" if parser == "html.parser" else "lxml"
+
+
+# ✅ 정책 목록 페이지 URL
+def build_list_url(page: int, base_url: str = BASE_URL) -> str:
+    return f"{base_url}/infoData/plcyInfo/ctList.do?sprtInfoId=&plcyBizId=&key=2309150002&sc_detailAt=&pageIndex={page}&orderBy=regYmd+desc&blueWorksYn=N&tabKind=002&sw=&sc_rcritCurentSitu=001&sc_rcritCurentSitu=002"
+
+
+# ✅ 정책 상세 페이지 URL
+def build_detail_url(policy_id: str, base_url: str = BASE_URL) -> str:
+    return f"{base_url}/infoData/plcyInfo/view.do?plcyBizId={policy_id}&tab=001&key=2309150002"
+
+
+# ✅ 정책 목록 페이지 HTML -> [{category, title, policy_id, a_class, description}]
+def parse_policy_list(html: str, parser: Optional[str] = None) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(html, _soup_builder(resolve_parser(parser)))  #HTML 파싱
+
+    policy_items = soup.select("ul.policy-list li") # 정책 항목들 선택
+    policy_data = []
+
+    for item in policy_items:
+        try:
+            category = item.select_one("span.bg-blue").get_text(strip=True) # 카테고리 추출
+            a_tag = item.select_one("a.tit.txt-over1")  # 제목링크
+            title = a_tag.get_text(strip=True)  # 제목내용
+            onclick = a_tag.get("onclick", "")  # 클릭 시 이동
+            class_attr = a_tag.get("class", []) # 클래스 속성 추출
+
+            policy_id = ""
+            if "goView" in onclick:
+                policy_id = onclick.replace("goView('", "").replace("');", "").strip()  # 정책 ID 추출
+
+            description = item.select_one("em.txt-over1").get_text(separator=" ", strip=True) # 설명 텍스트
+
+            policy_data.append({
+                "category": category,
+                "title": title,
+                "policy_id": policy_id,
+                "a_class": class_attr,
+                "description": description
+            })
+        except Exception as e:
+            print("파싱 오류:", e)
+            continue    # 에러 발생 시 해당 항목 건너뜀
+    return policy_data # 수집된 정책 목록 반환
+
+
+# ✅ BeautifulSoup DOM -> {섹션명: {항목명: 값}}
+def _soup_sections(soup: BeautifulSoup) -> Dict[str, Dict[str, str]]:
+    data_store = {}
+    titles = soup.find_all("strong", class_="tit")
+
+    for title in titles:
+        section_name = title.get_text(strip=True)   # 섹션 제목 텍스트 추축
+        table = title.find_next("table", class_="form-table form-resp-table")
+        if table:
+            section_data = {}
+            rows = table.find_all("tr") # 표의 모든 행추출
+            for row in rows:
+                ths = row.find_all("th")
+                tds = row.find_all("td")
+                for th, td in zip(ths, tds):
+                    key = th.get_text(strip=True)   # 항목 명
+                    val = td.get_text(" ", strip=True).replace("\xa0", " ") # 값 (공백 포함 처리)
+                    section_data[key] = val # 섹션 데이터에 저장
+            data_store[section_name] = section_data # 전체 저장소에 섹션 저장
+    return data_store   # 결과 반환
+
+
+# class 속성에 주어진 클래스가 모두 포함된 요소를 찾는 XPath 조건
+def _has_classes(*classes: str) -> str:
+    return " and ".join(f'contains(concat(" ", normalize-space(@class), " "), " {c} ")' for c in classes)
+
+
+# BeautifulSoup의 get_text(separator, strip=True)와 같은 결과
+def _lxml_text(element, separator: str = "") -> str:
+    return separator.join(text.strip() for text in element.itertext() if text.strip())
+
+
+# ✅ lxml DOM -> {섹션명: {항목명: 값}} (_soup_sections와 같은 결과)
+def _lxml_sections(doc) -> Dict[str, Dict[str, str]]:
+    data_store = {}
+    for title in doc.xpath(f"//strong[{_has_classes('tit')}]"):
+        section_name = _lxml_text(title)
+        tables = title.xpath(f"following::table[{_has_classes('form-table', 'form-resp-table')}][1]")
+        if tables:
+            section_data = {}
+            for row in tables[0].xpath(".//tr"):
+                for th, td in zip(row.xpath(".//th"), row.xpath(".//td")):
+                    section_data[_lxml_text(th)] = _lxml_text(td, " ").replace("\xa0", " ")
+            data_store[section_name] = section_data
+    return data_store
+
+
+# ✅ 정책 상세 페이지 HTML을 한 번만 파싱해서 {title, category, data_store} 반환
+# category : 상세 페이지의 분류 표시(span.bg-blue), 없으면 빈 문자열 (목록 페이지에 분류가 없을 때 사용)
+def parse_policy_detail(html: str, parser: Optional[str] = None) -> Dict[str, Any]:
+    parser = resolve_parser(parser)
+    if parser == "lxml-html":
+        doc = lxml_html.fromstring(html)
+        titles = doc.xpath(f"//strong[{_has_classes('title')}]")
+        if not titles:
+            raise ValueError("정책 제목(strong.title)을 찾을 수 없습니다.")
+        categories = doc.xpath(f"//span[{_has_classes('bg-blue')}]")
+        return {
+            "title": _lxml_text(titles[0]),
+            "category": _lxml_text(categories[0]) if categories else "",
+            "data_store": _lxml_sections(doc),
+        }
+
+    soup = BeautifulSoup(html, _soup_builder(parser))
+    title = soup.find("strong", class_="title")
+    if title is None:
+        raise ValueError("정책 제목(strong.title)을 찾을 수 없습니다.")
+    category = soup.find("span", class_="bg-blue")
+    return {
+        "title": title.get_text(strip=True),
+        "category": category.get_text(strip=True) if category else "",
+        "data_store": _soup_sections(soup),
+    }
+
+
+# ✅ 정책 상세 페이지 HTML -> {섹션명: {항목명: 값}}
+def parse_policy_sections(html: str, parser: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+    return parse_policy_detail(html, parser)["data_store"]
@@ -0,0 +1,145 @@
+# policy_store.py
+"""
+크롤러가 저장한 구조화 정책 레코드(policies.jsonl)로 구조화된 정책 저장소를 만들고,
+"OO 정책 신청자격", "OO 신청방법 알려줘"처럼 (정책, 항목)이 명확한 질문은 LLM 없이 바로 답변합니다.
+
+- PolicyStore : 정책 ID -> {제목, URL, 섹션 {섹션명: {항목명: 값}}} + 정규화된 제목 색인
+- IntentRouter : 질문에서 정책 제목과 항목(신청자격/신청방법/지원내용 등)을 찾아
+  둘 다 하나로 확정되는 경우에만 저장된 항목 내용과 출처 URL을 반환 (애매하면 None -> 기존 RAG 처리)
+"""
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+# 로거
+import logging
+
+from config import settings
+from policy_metadata import load_policy_records, normalize_title, POLICY_RECORDS_FILENAME
+
+logger = logging.getLogger(__name__)
+
+# 항목 이름 -> 질문에서 해당 항목을 가리키는 표현
+# 섹션명/항목명에서 찾을 때는 항목 이름과 앞쪽 표현을 함께 사용
+FIELD_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "신청자격": ("신청자격", "지원자격", "자격", "대상", "조건"),
+    "신청방법": ("신청방법", "접수방법", "신청절차", "어떻게신청", "신청하려면", "신청하는법"),
+    "지원내용": ("지원내용", "지원혜택", "혜택", "지원금", "지원규모"),
+    "사업개요": ("사업개요", "개요", "어떤사업", "무슨사업"),
+    "신청기간": ("신청기간", "접수기간", "모집기간", "마감", "언제까지"),
+    "문의처": ("문의처", "문의", "연락처", "전화번호"),
+}
+
+
+@dataclass
+class PolicyRecord:
+    policy_id: str
+    title: str
+    url: str
+    sections: Dict[str, Dict[str, str]]
+
+    # 항목(field)에 해당하는 내용: 섹션명이 일치하면 섹션 전체, 아니면 항목명이 일치하는 행
+    def field_text(self, field: str) -> Optional[str]:
+        names = (field,) + FIELD_KEYWORDS.get(field, ())[:2]
+        for section_name, rows in self.sections.items():
+            if any(name in section_name.replace(" ", "") for name in names) and rows:
+                return "\n".join(f"{key}: {value}" for key, value in rows.items())
+        for rows in self.sections.values():
+            for key, value in rows.items():
+                if any(name in key.replace(" ", "") for name in names) and value:
+                    return f"{key}: {value}"
+        return None
+
+
+@dataclass
+class RoutedAnswer:
+    policy_id: str
+    field: str
+    answer: str
+
+
+class PolicyStore:
+    def __init__(self, data_path: Path = settings.DATA_PATH):
+        self.records: Dict[str, PolicyRecord] = {}
+        # 정규화된 제목 -> 정책 ID
+        self.title_index: Dict[str, str] = {}
+        path = Path(data_path) / POLICY_RECORDS_FILENAME
+        # 같은 정책이 다시 저장된 경우 마지막 줄이 우선
+        for policy_id, data in load_policy_records(data_path).items():
+            self.records[policy_id] = PolicyRecord(
+                policy_id=policy_id, title=data["title"], url=data["url"], sections=data["sections"]
+            )
+        for record in self.records.values():
+            self.title_index[normalize_title(record.title)] = record.policy_id
+        logger.info(f"구조화 정책 저장소 로드 완료: 정책 {len(self.records)}개 ('{path}')")
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    # 질문에 포함된 정책 제목 중 가장 긴 것 (길이가 같은 후보가 여럿이면 확정할 수 없으므로 None)
+    def find_policy(self, normalized_question: str) -> Optional[PolicyRecord]:
+        matches = [
+            (len(title), policy_id) for title, policy_id in self.title_index.items()
+            if len(title) >= settings.INTENT_ROUTER_MIN_TITLE_CHARS and title in normalized_question
+        ]
+        if not matches:
+            return None
+        matches.sort(reverse=True)
+        if len(matches) > 1 and matches[0][0] == matches[1][0]:
+            return None
+        return self.records[matches[0][1]]
+
+
+class IntentRouter:
+    """
+    RAGPipeline.query 앞단의 라우터.
+    (정책, 항목)이 하나로 확정되면 저장된 항목 내용을 바로 반환합니다.
+    """
+    def __init__(self, store: PolicyStore):
+        self.store = store
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._routed = 0
+
+    # 질문에서 언급된 항목 이름 리스트
+    @staticmethod
+    def detect_fields(normalized_question: str) -> List[str]:
+        return [field for field, keywords in FIELD_KEYWORDS.items()
+                if any(keyword in normalized_question for keyword in keywords)]
+
+    def route(self, question: str) -> Optional[RoutedAnswer]:
+        with self._stats_lock:
+            self._requests += 1
+        if not len(self.store):
+            return None
+
+        normalized = normalize_title(question)
+        record = self.store.find_policy(normalized)
+        if record is None:
+            return None
+        # 질문에서 정책 제목 부분을 뺀 나머지에서 항목을 찾음 (제목 안의 "지원" 등과 혼동 방지)
+        fields = self.detect_fields(normalized.replace(normalize_title(record.title), " "))
+        if len(fields) != 1:
+            return None
+        text = record.field_text(fields[0])
+        if not text:
+            return None
+
+        with self._stats_lock:
+            self._routed += 1
+        logger.info(f"구조화 정책 저장소에서 바로 답변: '{record.title}' / {fields[0]}")
+        return RoutedAnswer(
+            policy_id=record.policy_id,
+            field=fields[0],
+            answer=f"[{record.title}] {fields[0]}\n{text}\n\n출처: {record.url}",
+        )
+
+    # 누적 지표 반환
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "policies": len(self.store),
+                "requests": self._requests,
+                "routed": self._routed,
+                "routed_ratio": round(self._routed / self._requests, 4) if self._requests else 0,
+            }
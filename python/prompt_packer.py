@@ -0,0 +1,200 @@
+# prompt_packer.py
+"""
+LLM 프롬프트에 들어가는 질문, 문맥, 대화 기록을 토큰 예산(PROMPT_TOKEN_BUDGET) 안에 맞춰 채웁니다.
+
+문맥(context_str)과 대화 기록(chat_history_str)의 길이에 제한이 없으면
+요청마다 프롬프트 크기와 Gemini 응답 시간이 크게 달라집니다.
+
+- 채우는 순서 : 질문 -> 관련도가 높은 문맥 블록 -> 최근 대화 -> 오래된 대화
+- 예산을 넘는 항목은 문장 경계에서 잘라서 들어갈 수 있는 만큼만 포함
+- 토큰 수는 로컬 토크나이저(tokenizers, KURE-v1 tokenizer.json)로 계산,
+  토크나이저를 사용할 수 없으면 문자 수 기반 추정(PROMPT_CHARS_PER_TOKEN)으로 대체
+"""
+import re
+import math
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+# 로거
+import logging
+
+from langchain_core.messages import BaseMessage
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 대화 기록이 없을 때 프롬프트에 넣는 문구 (기존 RAGPipeline.query와 동일)
+EMPTY_HISTORY_TEXT = "이전 대화 기록이 존재하지 않습니다."
+# 문장 경계: 마침표/물음표/느낌표(+닫는 따옴표/괄호) 뒤 공백, 또는 줄바꿈
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。])[\"')\]]*\s+|\n+")
+
+
+# 토큰 수 계산 함수 생성
+# 1. PROMPT_TOKENIZER_PATH의 tokenizer.json  2. ONNX 변환 결과물의 tokenizer.json
+# 3. 허깅페이스 캐시의 EMBEDDING_MODEL_NAME 토크나이저  4. 문자 수 기반 추정
+def get_token_counter() -> Callable[[str], int]:
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        Tokenizer = None
+
+    if Tokenizer is not None:
+        candidates = [Path(p) for p in (settings.PROMPT_TOKENIZER_PATH, settings.ONNX_MODEL_DIR / "tokenizer.json") if str(p)]
+        for path in candidates:
+            if path.is_file():
+                tokenizer = Tokenizer.from_file(str(path))
+                logger.info(f"프롬프트 토큰 계산에 로컬 토크나이저 사용: '{path}'")
+                return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        try:
+            tokenizer = Tokenizer.from_pretrained(settings.EMBEDDING_MODEL_NAME)
+            logger.info(f"프롬프트 토큰 계산에 '{settings.EMBEDDING_MODEL_NAME}' 토크나이저 사용")
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            logger.warning(f"토크나이저 로드 실패 ({e}). 문자 수 기반으로 토큰 수를 추정합니다.")
+
+    chars_per_token = settings.PROMPT_CHARS_PER_TOKEN
+    return lambda text: math.ceil(len(text) / chars_per_token)
+
+
+# 문장 단위로 분리 (구분자 포함, 이어 붙이면 원문과 같음)
+def split_sentences(text: str) -> List[str]:
+    sentences, start = [], 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+@dataclass
+class PackedPrompt:
+    question: str
+    context: str
+    chat_history: str
+    question_tokens: int
+    context_tokens: int
+    history_tokens: int
+    context_blocks_used: int
+    context_blocks_total: int
+    history_messages_used: int
+    history_messages_total: int
+
+    @property
+    def total_tokens(self) -> int:
+        return self.question_tokens + self.context_tokens + self.history_tokens
+
+
+class PromptPacker:
+    """
+    토큰 예산 안에서 질문/문맥/대화 기록을 우선순위대로 채웁니다.
+    예산은 프롬프트 템플릿 고정 문구를 제외한 가변 부분(질문 + 문맥 + 대화 기록)에 적용됩니다.
+    """
+    def __init__(self,
+                 token_budget: int = settings.PROMPT_TOKEN_BUDGET,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or get_token_counter()
+        # 지표
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._total_tokens = 0
+        self._max_tokens = 0
+        self._truncated = 0
+
+    # 예산 안에 들어가는 만큼 문장 단위로 앞에서부터 잘라서 반환 (한 문장도 안 들어가면 빈 문자열)
+    def truncate(self, text: str, budget: int) -> tuple[str, int]:
+        tokens = self.count_tokens(text)
+        if tokens <= budget:
+            return text, tokens
+        kept, used = [], 0
+        for sentence in split_sentences(text):
+            sentence_tokens = self.count_tokens(sentence)
+            if used + sentence_tokens > budget:
+                break
+            kept.append(sentence)
+            used += sentence_tokens
+        return "".join(kept).rstrip(), used
+
+    def pack(self, question: str, context_blocks: List[str], history: Optional[List[BaseMessage]] = None) -> PackedPrompt:
+        remaining = self.token_budget
+        truncated = False
+
+        # 1. 질문 (예산보다 길면 질문도 자름)
+        question_text, question_tokens = self.truncate(question, remaining)
+        if not question_text:
+            question_text, question_tokens = question, self.count_tokens(question)
+        truncated |= question_text != question
+        remaining -= question_tokens
+
+        # 2. 문맥 블록 (관련도 순)
+        context_parts: List[str] = []
+        context_tokens = 0
+        for block in context_blocks:
+            if remaining <= 0:
+                break
+            text, tokens = self.truncate(block, remaining)
+            if text:
+                context_parts.append(text)
+                context_tokens += tokens
+                remaining -= tokens
+            if text != block:
+                truncated = True
+                break
+
+        # 3. 대화 기록 (최근 메시지부터 채우고, 출력은 원래 시간 순서대로)
+        history_lines: List[str] = []
+        history_tokens = 0
+        messages = [m for m in (history or []) if m.type in ("human", "ai")]
+        for message in reversed(messages):
+            if remaining <= 0:
+                truncated = True
+                break
+            speaker = "사용자" if message.type == "human" else "AI"
+            line = f"{speaker}: {message.content}"
+            text, tokens = self.truncate(line, remaining)
+            if text:
+                history_lines.append(text)
+                history_tokens += tokens
+                remaining -= tokens
+            if text != line:
+                truncated = True
+                break
+        history_lines.reverse()
+
+        packed = PackedPrompt(
+            question=question_text,
+            context="\n\n".join(context_parts),
+            chat_history="\n".join(history_lines) if history_lines else EMPTY_HISTORY_TEXT,
+            question_tokens=question_tokens,
+            context_tokens=context_tokens,
+            history_tokens=history_tokens,
+            context_blocks_used=len(context_parts),
+            context_blocks_total=len(context_blocks),
+            history_messages_used=len(history_lines),
+            history_messages_total=len(messages),
+        )
+
+        with self._stats_lock:
+            self._requests += 1
+            self._total_tokens += packed.total_tokens
+            self._max_tokens = max(self._max_tokens, packed.total_tokens)
+            self._truncated += int(truncated)
+
+        logger.info(f"프롬프트 패킹: 총 {packed.total_tokens}/{self.token_budget}토큰 "
+                    f"(질문 {question_tokens}, 문맥 {context_tokens} [{packed.context_blocks_used}/{packed.context_blocks_total}블록], "
+                    f"대화 기록 {history_tokens} [{packed.history_messages_used}/{packed.history_messages_total}개])")
+        return packed
+
+    # 누적 지표 반환
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "requests": self._requests,
+                "token_budget": self.token_budget,
+                "avg_tokens": round(self._total_tokens / self._requests, 1) if self._requests else 0,
+                "max_tokens": self._max_tokens,
+                "truncated_requests": self._truncated,
+            }
@@ -0,0 +1,150 @@
+# query_router.py
+"""
+/ask 질문을 검색 전에 분류해서 필요 없는 벡터 검색을 건너뜁니다.
+
+- none     : 인사/감사/잡담 -> 검색 없이 대화 기록만으로 답변
+- reuse    : "아까 말한 거 다시 설명해줘"처럼 직전 답변에 대한 후속 질문
+             -> 같은 사용자(member_id)의 직전 검색 문맥을 재사용
+             후속 표현과 요청/조사를 뺀 나머지에 내용 단어가 있으면("청년 창업 지원 요약해줘") 새 주제로 보고 retrieve
+- retrieve : 그 외 -> 기존처럼 새로 검색
+
+분류는 규칙(정규식) 기반이라 임베딩/모델 호출이 없습니다.
+애매한 질문은 항상 retrieve로 보내서 답변 품질이 떨어지지 않도록 합니다.
+"""
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+# 로거
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+ROUTE_NONE = "none"
+ROUTE_REUSE = "reuse"
+ROUTE_RETRIEVE = "retrieve"
+
+# 검색하지 않을 때 프롬프트의 문맥 자리에 넣는 문구
+NO_RETRIEVAL_CONTEXT_TEXT = "검색한 문맥이 없습니다. 인사나 일상적인 대화이므로 대화 기록을 참고해서 짧고 자연스럽게 답변해주세요."
+
+# 인사/감사/잡담 (문장 전체가 이런 표현일 때만)
+_CHIT_CHAT_PATTERN = re.compile(
+    r"^\s*(안녕|하이|ㅎㅇ|hi|hello|반가워|반갑습니다|고마워|고맙습니다|감사|땡큐|thank|ㄱㅅ|잘\s*가|수고|"
+    r"좋아|알겠|알았|오케이|ok|ㅇㅋ|네|응|ㅇㅇ|넵|예|누구|너는\s*누구|뭐\s*할\s*수\s*있)"
+    r"(요|해요|해|하세요|합니다|습니다|니다|세요|어요|어|야|냐|니|이야)?[\s~!?.,ㅋㅎㅠㅜ^]*$",
+    re.IGNORECASE
+)
+# 잡담으로 볼 수 있는 최대 길이 (이보다 길면 정책 질문이 섞여 있을 가능성이 높음)
+_CHIT_CHAT_MAX_CHARS = 20
+# 직전 답변을 가리키는 표현
+_FOLLOW_UP_PATTERN = re.compile(
+    r"아까|방금|앞에서|위에서|이전\s*답변|그\s*정책|그거|그건|그것|다시\s*(설명|말|알려)|"
+    r"더\s*자세히|자세하게|요약|쉽게\s*(설명|말)|정리해"
+)
+# 후속 표현을 뺀 뒤 남아도 되는 단어 (요청 어미, 지시어, 조사) - 단어 전체가 일치할 때만
+_FOLLOW_UP_FILLER_PATTERN = re.compile(
+    r"(말한|말했던|얘기한|했던|답변|대답|설명|거|것|좀|더|다시|내용|부분|그|그럼|"
+    r"해|해줘|해줘요|해주세요|해줄래|해봐|줘|줘요|줄래|주세요|알려줘|알려줘요|알려주세요|알려줄래|말해줘|말해주세요|"
+    r"을|를|은|는|이|가|에|의|도|만|요)"
+)
+# 후속 표현/요청/조사를 빼고 남은 글자 수가 이보다 많으면 새 주제 질문으로 보고 새로 검색
+_FOLLOW_UP_MAX_RESIDUAL_CHARS = 1
+# 새 검색이 필요한 정책 관련 표현 (후속 질문처럼 보여도 이런 표현이 있으면 새로 검색)
+_NEW_TOPIC_PATTERN = re.compile(r"다른\s*정책|다른\s*거|말고|새로운|추천|찾아|있어\?|있나요|있을까")
+
+
+# 후속 표현이 있는 질문에서 후속 표현/요청 어미/조사를 뺀 나머지 글자 수 (정책 이름 등 내용 단어의 길이)
+def follow_up_residual_chars(text: str) -> int:
+    words = re.sub(r"[^\w\s]", " ", _FOLLOW_UP_PATTERN.sub(" ", text)).split()
+    return sum(len(word) for word in words if not _FOLLOW_UP_FILLER_PATTERN.fullmatch(word))
+
+
+# 질문 분류 (has_history: 대화 기록 존재 여부, has_cached_context: 재사용할 직전 검색 문맥 존재 여부)
+def classify_query(question: str, has_history: bool, has_cached_context: bool) -> str:
+    text = question.strip()
+    if len(text) <= _CHIT_CHAT_MAX_CHARS and _CHIT_CHAT_PATTERN.match(text):
+        return ROUTE_NONE
+    if has_history and has_cached_context and _FOLLOW_UP_PATTERN.search(text) and not _NEW_TOPIC_PATTERN.search(text) \
+            and follow_up_residual_chars(text) <= _FOLLOW_UP_MAX_RESIDUAL_CHARS:
+        return ROUTE_REUSE
+    return ROUTE_RETRIEVE
+
+
+class ContextCache:
+    """
+    사용자(member_id)별 직전 검색 문맥 블록 캐시 (LRU + TTL).
+    프로세스 메모리에만 보관하므로 워커가 여러 개면 워커별로 따로 관리됩니다.
+    """
+    def __init__(self,
+                 max_members: int = settings.QUERY_CONTEXT_CACHE_SIZE,
+                 ttl_seconds: float = settings.QUERY_CONTEXT_CACHE_TTL_SECONDS):
+        self.max_members = max_members
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # member_id -> (저장 시각, 문맥 블록 리스트)
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+
+    def get(self, member_id: Optional[str]) -> Optional[List[str]]:
+        if not member_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(member_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[member_id]
+                return None
+            self._entries.move_to_end(member_id)
+            return entry[1]
+
+    def put(self, member_id: Optional[str], context_blocks: List[str]):
+        if not member_id or not context_blocks:
+            return
+        with self._lock:
+            self._entries[member_id] = (time.monotonic(), context_blocks)
+            self._entries.move_to_end(member_id)
+            while len(self._entries) > self.max_members:
+                self._entries.popitem(last=False)
+
+    def clear(self, member_id: str):
+        with self._lock:
+            self._entries.pop(member_id, None)
+
+    # 전체 사용자 문맥 삭제 (코퍼스 교체 후 이전 코퍼스의 문맥을 재사용하지 않도록)
+    def clear_all(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class QueryRouter:
+    def __init__(self, context_cache: Optional[ContextCache] = None):
+        self.context_cache = context_cache or ContextCache()
+        # 지표
+        self._stats_lock = threading.Lock()
+        self._routes: Dict[str, int] = {ROUTE_NONE: 0, ROUTE_REUSE: 0, ROUTE_RETRIEVE: 0}
+
+    # (경로, 재사용할 문맥 블록) 반환 (reuse가 아니면 문맥 블록은 None)
+    def route(self, question: str, member_id: Optional[str], has_history: bool) -> Tuple[str, Optional[List[str]]]:
+        cached = self.context_cache.get(member_id)
+        route = classify_query(question, has_history, cached is not None)
+        with self._stats_lock:
+            self._routes[route] += 1
+        if route != ROUTE_RETRIEVE:
+            logger.info(f"질문 라우팅: {route} (사용자 ID: {member_id})")
+        return route, cached if route == ROUTE_REUSE else None
+
+    # 누적 지표 반환
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total = sum(self._routes.values())
+            return {
+                "routes": dict(self._routes),
+                "skipped_retrieval_ratio": round(1 - self._routes[ROUTE_RETRIEVE] / total, 4) if total else 0,
+                "cached_members": len(self.context_cache),
+            }
@@ -7,7 +7,6 @@ LLM 연동, 체인 구성 등 RAG 시스템의 핵심 단계를 초기화하고,
 
 uvicorn main:app --host 0.0.0.0 --port 8000 --log-level info
 """
-from langchain_community.vectorstores import Chroma
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import BaseMessage
@@ -20,28 +19,86 @@ from rag_utils import (
     split_documents, # Document 리스트를 청크 단위 Document 리스트로 분할
     get_embedding_model, # 임베딩 모델
     get_llm, # LLM 모델
-    create_or_load_vectorstore, # 벡터DB 생성 또는 기존 DB 로드
+    load_vectorstore, # 기존 벡터DB 로드 (VECTORSTORE_BACKEND에 따라 Chroma 또는 MmapVectorStore)
+    get_vectorstore_count, # 벡터DB에 저장된 청크 수
     get_retriever, # 벡터DB 문서 검색기
     create_rag_chain # RAG 체인 구성
 )
+# 대량 임베딩 시 멀티 프로세스 분산 처리
+from bulk_embedder import BulkEmbeddings, wrap_for_bulk_embedding
+# 동시 질문 임베딩을 배치로 묶어 처리
+from embedding_batcher import MicroBatchingEmbeddings, wrap_for_micro_batching
+# 벡터 저장소와 같은 청크에 대한 BM25 역색인
+from lexical_index import LexicalIndex, HybridRetriever
+# 검색된 청크를 MMR 선택 + 겹침 병합으로 프롬프트 문맥 구성
+from context_builder import ContextBuilder
+# 질문/문맥/대화 기록을 토큰 예산 안에 맞춰 채움
+from prompt_packer import PromptPacker
+# 정책별 항목 질문을 LLM 없이 답변하는 구조화 정책 저장소 + 라우터
+from policy_store import PolicyStore, IntentRouter
+# 인사/후속 질문의 벡터 검색 생략
+from query_router import QueryRouter, ROUTE_NONE, ROUTE_REUSE, NO_RETRIEVAL_CONTEXT_TEXT
+# 코퍼스 버전별로 미리 생성한 (정책 x 대표 질문) 답변
+from answer_precompute import AnswerStore
+# 재색인 결과를 버전 디렉토리에 만들고 CURRENT 포인터로 전환
+from vectorstore_versions import (
+    active_vectorstore_path,
+    lexical_index_path_for,
+    read_version_info,
+    read_version_files,
+    check_version_compatible,
+    write_version_info,
+    copy_corpus_files,
+    corpus_files_path,
+    create_version_dir,
+    validate_version,
+    promote_version,
+    prune_versions,
+    rollback_version,
+    mark_rejected,
+    is_rejected,
+    clear_rejected,
+    version_lock
+)
 # 랭체인 문서의 기본 단위인 Document 클래스 import
 from langchain_core.documents import Document
 import os
+import time
+# 재색인 중복 실행 방지
+import threading
+# 검색 구성 요소 스냅샷
+from dataclasses import dataclass, field, replace
 # 로거
 import logging
 from data_manager import (
     scan_data_directory,
+    calculate_manifest_hash,
     load_metadata,
     save_metadata,
-    get_changed_files,
-    update_metadata_after_processing,
-    remove_metadata_for_deleted_files
+    get_changed_files
 )
 # 파일 경로를 객체로 다루기 위한 import
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+# 정책 블록 분리, 분류/지역/신청 기간 메타데이터와 검색 필터
+from policy_metadata import (
+    load_policy_metadata,
+    load_policy_records,
+    parse_policy_record_path,
+    POLICY_RECORDS_FILENAME,
+    render_policy_record,
+    extract_policy_metadata,
+    split_policy_blocks,
+    extract_policy_id,
+    infer_filters,
+    build_where,
+    is_closed
+)
+from typing import List, Dict, Any, Tuple, Optional, Callable
 # 디렉토리 및 파일 트리 삭제 등 고수준 파일/디렉토리 작업을 위한 import
 import shutil
+# 벡터 저장소 공통 인터페이스 (Chroma, MmapVectorStore)
+from langchain_core.vectorstores import VectorStore
+from langchain_core.embeddings import Embeddings
 
 # 로거 객체 생성
 logger = logging.getLogger(__name__)
@@ -51,13 +108,39 @@ logger = logging.getLogger(__name__)
 def load_docs_from_paths(base_path: Path, relative_paths: List[str]) -> list[Document]:
     """
     지정된 디렉토리에서 텍스트 파일(.txt)을 읽어 Document 객체 리스트로 반환.
+    크롤러 형식의 파일은 정책 블록마다 Document 1개로 나누고,
+    policy_metadata.json의 분류/지역/신청 기간을 메타데이터에 포함.
+    "policies.jsonl#<정책 ID>" 경로는 구조화 정책 레코드를 Document 1개로 변환.
     """
     loaded_docs = []
     if not relative_paths:
         return loaded_docs
     logger.info(f"지정된 경로에서 문서 로드 시도 (기준: '{base_path}'): {len(relative_paths)}개 파일")
+    policy_metadata = load_policy_metadata(base_path)
+    policy_records = load_policy_records(base_path)
 
     for rel_path_str in relative_paths:
+        record_policy_id = parse_policy_record_path(rel_path_str)
+        if record_policy_id is not None:
+            record = policy_records.get(record_policy_id)
+            if record is None:
+                logger.warning(f"정책 레코드를 찾을 수 없음 (건너뜀): '{rel_path_str}'")
+                continue
+            record_metadata = {
+                "source": POLICY_RECORDS_FILENAME,
+                "relative_path": rel_path_str,
+                "policy_id": record_policy_id,
+            }
+            # 분류/지역/신청 기간은 레코드의 섹션에서 바로 추출
+            for key, value in extract_policy_metadata(
+                record["title"], record["url"], record.get("category", ""),
+                record.get("description", ""), record["sections"]
+            ).items():
+                if isinstance(value, (str, int, float)):
+                    record_metadata[key] = value
+            loaded_docs.append(Document(page_content=render_policy_record(record), metadata=record_metadata))
+            continue
+
         abs_file_path  = base_path / rel_path_str
         file_name = abs_file_path.name
 
@@ -79,9 +162,24 @@ def load_docs_from_paths(base_path: Path, relative_paths: List[str]) -> list[Doc
                 "source": file_name,
                 "relative_path": rel_path_str
             }
-            # 앞서 생성한 loaded_documents 리스트에 Document 타입으로 변환된 content와 metadata(파일명, 상대 경로)를 저장
-            loaded_docs.append(Document(page_content=content, doc_metadata=doc_metadata))
-            logger.debug(f"성공: '{file_name}' 로드 완료 (내용 길이: {len(content)})")
+            policy_blocks = split_policy_blocks(content)
+            if not policy_blocks:
+                # 앞서 생성한 loaded_documents 리스트에 Document 타입으로 변환된 content와 metadata(파일명, 상대 경로)를 저장
+                loaded_docs.append(Document(page_content=content, metadata=doc_metadata))
+            for block in policy_blocks:
+                block_metadata = {**doc_metadata, "title": block["title"], "url": block["url"]}
+                policy_id = extract_policy_id(block["url"])
+                if policy_id in policy_records:
+                    # 구조화 레코드가 있는 정책은 레코드 쪽 Document만 사용
+                    continue
+                if policy_id:
+                    block_metadata["policy_id"] = policy_id
+                    # 크롤러가 저장한 분류/지역/신청 기간 (title, url은 파일 내용 기준 유지)
+                    for key, value in policy_metadata.get(policy_id, {}).items():
+                        if key not in block_metadata and isinstance(value, (str, int, float)):
+                            block_metadata[key] = value
+                loaded_docs.append(Document(page_content=block["content"], metadata=block_metadata))
+            logger.debug(f"성공: '{file_name}' 로드 완료 (내용 길이: {len(content)}, 정책 블록: {len(policy_blocks)}개)")
         except Exception as e:
             logger.error(f"오류: '{abs_file_path}' 파일 읽기 중 예외 발생: {e}", exc_info=True)
 
@@ -93,33 +191,78 @@ def load_docs_from_paths(base_path: Path, relative_paths: List[str]) -> list[Doc
     return loaded_docs
 
 
-class RAGPipeline:
-    # 생성자 정의
+# 청크마다 "상대 경로#순번" 형태의 고정 ID와 chunk_index 메타데이터 부여
+# 같은 파일을 다시 처리해도 ID가 같으므로 삭제/교체를 ID 기준으로 할 수 있음
+def assign_chunk_ids(split_docs: List[Document]) -> List[str]:
+    ids: List[str] = []
+    next_index: Dict[str, int] = {}
+    for doc in split_docs:
+        rel_path = doc.metadata.get("relative_path") or doc.metadata.get("source", "unknown")
+        index = next_index.get(rel_path, 0)
+        next_index[rel_path] = index + 1
+        doc.metadata["chunk_index"] = index
+        ids.append(f"{rel_path}#{index}")
+    return ids
+
+
+@dataclass
+class CorpusSnapshot:
+    """
+    코퍼스(데이터 파일)에 따라 달라지는 검색 구성 요소 묶음.
+    재색인 시 새 스냅샷을 만든 뒤 참조 하나만 교체하므로, 질문 처리는 잠금 없이 시작 시점의 스냅샷을 끝까지 사용합니다.
+    """
+    vectorstore: Optional[VectorStore] = None
+    lexical_index: Optional[LexicalIndex] = None
+    retriever: Any = None
+    context_builder: Optional[ContextBuilder] = None
+    # 질문에서 분류 필터를 추론할 때 사용하는 분류 이름 목록
+    known_categories: List[str] = field(default_factory=list)
+    intent_router: Optional[IntentRouter] = None
+    answer_store: Optional[AnswerStore] = None
+    # 현재 데이터 파일 전체의 manifest 해시 (미리 생성한 답변의 버전)
+    manifest_hash: str = ""
+    # 벡터 저장소 디렉토리
+    store_path: str = ""
+    # 프로세스 시작 후 교체 횟수
+    version: int = 0
+
+
+# RAGPipeline의 속성을 현재 스냅샷의 필드로 연결 (값을 지정하면 그 필드만 바꾼 새 스냅샷으로 교체)
+def _corpus_attribute(name: str) -> property:
+    def getter(self):
+        return getattr(self._corpus, name)
+
+    def setter(self, value):
+        self._corpus = replace(self._corpus, **{name: value})
+
+    return property(getter, setter)
+
+
+class CorpusIndexer:
+    """
+    데이터 디렉토리(DATA_PATH)를 벡터 저장소 버전으로 색인합니다.
+    API 서버 없이 indexer.py에서 바로 사용하고, RAGPipeline은 이 클래스를 상속해서
+    서버 시작/재색인 때 같은 코드로 색인합니다. (LLM, 검색 구성 요소는 만들지 않음)
+    """
     def __init__(self,
                  data_path: str = str(settings.DATA_PATH),
                  vectorstore_path: str = str(settings.VECTORSTORE_PATH),
-                 # force_create_db = False : 벡터DB가 이미 존재한다면 새로 생성하지 않고 기존 것을 사용
-                 force_create_db: bool = False,
-                 # 모든 파일을 강제로 재임베딩할지 여부
-                 force_reprocess_all_files: bool = False
-                 ):
+                 embeddings: Optional[Embeddings] = None,
+                 # 한 번에 임베딩해서 저장할 청크 수 (진행 상황 출력 단위)
+                 batch_chunks: int = settings.INDEXER_BATCH_CHUNKS):
         self.data_path = Path(data_path) # 문자열로 들어온 data_path를 Path 객체로 변환
         self.vectorstore_path = vectorstore_path
-        self.force_create_db = force_create_db
-        self.force_reprocess_all_files = force_reprocess_all_files
-        self.rag_chain = None
-        # 기존의 지역 변수였던 embeddings와 vectorstore를 클래스 변수로 관리
-        # 다른 함수들에서 해당 변수들에 접근할 수 있게 만들기 위함
-        # 기존에는 _initialize_pipeline 함수가 끝나면 사라졌었음
-        self.embeddings = None
-        self.vectorstore: Chroma | None = None
-        self._initialize_pipeline()
+        # 청크 임베딩 모델 (RAGPipeline은 _initialize_pipeline에서 지정)
+        self.embeddings = embeddings
+        self.batch_chunks = max(1, batch_chunks)
 
     # 삭제할 문서 리스트의 상대 경로를 전달받아 문서를 삭제하는 함수
-    def _delete_docs_by_relative_paths(self, relative_paths: List[str]):
-        if not self.vectorstore or not relative_paths:
+    # 새 버전 디렉토리의 저장소/역색인에서 삭제 -> 삭제한 청크 수
+    def _delete_docs_by_relative_paths(self, relative_paths: List[str], vectorstore: VectorStore,
+                                       lexical_index: Optional[LexicalIndex] = None) -> int:
+        if not vectorstore or not relative_paths:
             logger.debug("벡터 저장소가 없거나 삭제할 경로 목록이 비어있어 삭제를 건너뜁니다.")
-            return
+            return 0
 
         logger.info(f"벡터 DB에서 다음 상대 경로의 문서 삭제 시도 (ID 기반): {relative_paths}")
 
@@ -128,8 +271,8 @@ class RAGPipeline:
 
         for rel_path_str in relative_paths:
             try:
-                # ChromaDB의 get. where문 사용
-                retrieved_docs_info = self.vectorstore.get(
+                # 벡터 저장소의 get. where문 사용 (Chroma, MmapVectorStore 공통)
+                retrieved_docs_info = vectorstore.get(
                     where={"relative_path": rel_path_str}
                 )
 
@@ -143,148 +286,304 @@ class RAGPipeline:
                 logger.error(f"경로 '{rel_path_str}'의 ID 조회 중 오류 발생: {e}", exc_info=True)
                 continue
 
-            if all_ids_to_delete:
-                unique_ids_to_delete = list(set(all_ids_to_delete))
-                logger.info(f"삭제할 고유 벡터 ID 목록 ({len(unique_ids_to_delete)}개): {unique_ids_to_delete}")
-                try:
-                    self.vectorstore.delete(ids=unique_ids_to_delete)
-                    self.vectorstore.persist()
-                except Exception as e:
-                    logger.error(f"벡터 삭제 API 호출 중 오류 발생 (ID: {unique_ids_to_delete}): {e}", exc_info=True)
-                else:
-                    logger.info("삭제할 벡터 ID가 없습니다.")
-
-
-    # initialize : 초기화
-    def _initialize_pipeline(self):
-        logger.info("RAG 파이프라인 초기화 시작...")
-
+        # 경로별로 모은 ID를 한 번에 삭제
+        if all_ids_to_delete:
+            unique_ids_to_delete = list(set(all_ids_to_delete))
+            logger.info(f"삭제할 고유 벡터 ID 목록 ({len(unique_ids_to_delete)}개): {unique_ids_to_delete}")
+            try:
+                vectorstore.delete(ids=unique_ids_to_delete)
+                vectorstore.persist()
+                if lexical_index is not None:
+                    lexical_index.remove(unique_ids_to_delete)
+                return len(unique_ids_to_delete)
+            except Exception as e:
+                logger.error(f"벡터 삭제 API 호출 중 오류 발생 (ID: {unique_ids_to_delete}): {e}", exc_info=True)
+        else:
+            logger.info("삭제할 벡터 ID가 없습니다.")
+        return 0
+
+    # 상대 경로 파일들을 읽어 청크로 분할 -> (청크 리스트, 청크 ID 리스트)
+    def _split_docs_from_paths(self, relative_paths: List[str]) -> Tuple[List[Document], List[str]]:
+        docs_to_process = load_docs_from_paths(self.data_path, relative_paths)
+        if not docs_to_process:
+            return [], []
+        # 텍스트를 청크 단위로 분할해주는 분할기 생성
+        text_splitter = get_text_splitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
+        # actual_docs(로드된 Documents 타입의 리스트)를 더 작은 청크 단위의 Document 객체 리스트로 분할해서 저장
+        split_docs = split_documents(text_splitter, docs_to_process)
+        split_ids = assign_chunk_ids(split_docs)
+        logger.info(f"{len(split_docs)}개의 문서 청크를 DB에 반영할 예정입니다.")
+        return split_docs, split_ids
+
+    # 저장된 BM25 역색인을 불러오고, 없거나 벡터 저장소와 청크 수가 다르면 벡터 저장소로부터 다시 생성
+    def _load_lexical_index(self, vectorstore: VectorStore, path: Path) -> Optional[LexicalIndex]:
+        if not settings.HYBRID_SEARCH_ENABLED:
+            return None
         try:
-            self.embeddings = get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME)
+            index = LexicalIndex.load(path)
+            vector_count = get_vectorstore_count(vectorstore)
+            if index is None or len(index) != vector_count:
+                logger.info(f"BM25 역색인이 없거나 벡터 저장소와 맞지 않아 다시 생성합니다. (벡터 저장소 청크: {vector_count}개)")
+                index = LexicalIndex.from_vectorstore(vectorstore)
+                # 읽기 전용 모드에서는 메모리에만 생성 (색인 결과물 디렉토리를 수정하지 않음)
+                if not settings.VECTORSTORE_READ_ONLY:
+                    index.save(path)
+            return index
         except Exception as e:
-            logger.error(f"임베딩 모델 로드 실패: {e}", exc_info=True)
-            raise
-
+            # 역색인이 없어도 벡터 검색만으로 동작 가능
+            logger.error(f"BM25 역색인 로드 실패, 벡터 검색만 사용합니다: {e}", exc_info=True)
+            return None
+
+    # 데이터 디렉토리와 현재 버전을 비교해서 색인 계획 생성 (version_lock 안에서 호출)
+    # full : 현재 버전을 복사하지 않고 빈 디렉토리에 전체 재생성
+    # force : 이전에 검증 실패/rollback으로 기록된 코퍼스도 다시 생성
+    # status : "up_to_date"(현재 버전이 데이터와 같음) | "rejected"(기록된 코퍼스라 만들지 않음) | "build"(새 버전 필요)
+    def plan_version(self, base_path: Path, full: bool = False, force: bool = False) -> Dict[str, Any]:
         # 현재 존재하는 모든 데이터 파일을 읽어오고 {상대 경로: 현재 해시값}으로 저장
         current_files_hashes = scan_data_directory(self.data_path)
-        # 현재 메타데이터
-        previous_metadata = load_metadata()
-        # 현재 파일 해시와 이전 메타데이터 비교, 변경된 파일(신규/수정/삭제) 목록 선언
+        manifest_hash = calculate_manifest_hash(current_files_hashes)
+        active_path = active_vectorstore_path(base_path)
+        active_info = read_version_info(active_path)
+        incremental = active_path.is_dir() and any(active_path.iterdir()) and not full
+
+        # 기본 경로(버전 디렉토리 이전 형식)는 data_files_metadata.json을 증분 기준으로 사용
+        previous_files = read_version_files(active_path)
+        if previous_files is None:
+            previous_files = load_metadata()
         new_file_paths, modified_file_paths, deleted_file_paths = get_changed_files(
-            current_files_hashes, previous_metadata
+            current_files_hashes, previous_files
         )
-        # Path 객체인 vectorstor_path를 문자열로 변환해서 저장
-        db_path_str = str(self.vectorstore_path)
-        # 벡터DB 초기화
-        self.vectorstore = None
-
-        db_action: str = "load_or_create"
-        files_to_load_for_db: List[str] = []
-        paths_to_delete_from_db: List[str] = []
-        # 이전 메타데이터 복사해서 저장
-        base_metadata_for_update: Dict[str, Any] = previous_metadata.copy()
-
-        if self.force_create_db:
-            logger.info(f"DB 강제 재생성 요청: 기존 벡터 저장소 '{db_path_str}' 삭제 시도.")
-            # 기존 벡터DB가 존재하면 삭제 먼저 진행
-            if os.path.exists(self.vectorstore_path):
-                shutil.rmtree(self.vectorstore_path)
-            db_action = "create_new"
-            # 현재 해시값을 가지고 있는 모든 파일
-            files_to_load_for_db = list(current_files_hashes.keys())
-            # 기존 벡터DB를 삭제했기에 저장해둔 이전 메타데이터도 삭제
-            base_metadata_for_update = {}
-        elif self.force_reprocess_all_files:
-            logger.info("모든 파일 강제 재처리 요청.")
-            db_action = "load_and_reprocess_all"
-            if previous_metadata:
-                paths_to_delete_from_db.extend(list(previous_metadata.keys()))
-            files_to_load_for_db = list(current_files_hashes.keys())
-            base_metadata_for_update = {}
+        plan = {
+            "status": "build",
+            "mode": "incremental" if incremental else "full",
+            "manifest_hash": manifest_hash,
+            "active_path": active_path,
+            "active_info": active_info,
+            "files": current_files_hashes,
+            "new_files": new_file_paths,
+            "modified_files": modified_file_paths,
+            "deleted_files": list(deleted_file_paths),
+            # 새로 읽어서 임베딩할 파일
+            "files_to_index": new_file_paths + modified_file_paths if incremental else list(current_files_hashes.keys()),
+        }
+        if incremental:
+            if active_info.get("manifest_hash") == manifest_hash or not (new_file_paths or modified_file_paths or deleted_file_paths):
+                plan["status"] = "up_to_date"
+            elif not force and is_rejected(base_path, manifest_hash):
+                plan["status"] = "rejected"
+        return plan
+
+    # 계획대로 새 버전 디렉토리를 만들고 검증 -> (결과, 벡터 저장소, 역색인)
+    # 검증에 실패하면 버전 디렉토리를 삭제하고 rejected로 기록 (CURRENT는 바꾸지 않음, 전환은 promote_built_version)
+    # progress : 청크 묶음(INDEXER_BATCH_CHUNKS)을 저장할 때마다 {"files_done", "files_total", "chunks_done", "chunks_total", "seconds"}로 호출
+    def build_version(self, base_path: Path, plan: Dict[str, Any],
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None
+                      ) -> Tuple[Dict[str, Any], VectorStore, Optional[LexicalIndex]]:
+        start_time = time.perf_counter()
+        incremental = plan["mode"] == "incremental"
+        version_path = create_version_dir(base_path, copy_active=incremental)
+        lexical_path = lexical_index_path_for(version_path, base_path)
+        vectorstore = load_vectorstore(self.embeddings, str(version_path))
+        previous_count = plan["active_info"].get("chunk_count", 0)
+        if incremental:
+            lexical_index = self._load_lexical_index(vectorstore, lexical_path)
+            previous_count = get_vectorstore_count(vectorstore)
+            deleted_count = self._delete_docs_by_relative_paths(
+                plan["deleted_files"] + plan["modified_files"], vectorstore, lexical_index
+            )
         else:
-            if deleted_file_paths:
-                paths_to_delete_from_db.extend(list(deleted_file_paths))
-            if modified_file_paths:
-                paths_to_delete_from_db.extend(modified_file_paths)
+            logger.info(f"벡터 저장소 전체 재생성: 파일 {len(plan['files'])}개")
+            lexical_index = LexicalIndex() if settings.HYBRID_SEARCH_ENABLED else None
+            deleted_count = 0
+
+        files_to_index = plan["files_to_index"]
+        split_docs, split_ids = self._split_docs_from_paths(files_to_index) if files_to_index else ([], [])
+        # 청크 ID는 파일별 순번이므로 묶음으로 나눠 저장해도 한 번에 저장한 것과 같음
+        batch_size = self.batch_chunks
+        files_done = set()
+        for start in range(0, len(split_docs), batch_size):
+            batch_docs, batch_ids = split_docs[start:start + batch_size], split_ids[start:start + batch_size]
+            vectorstore.add_documents(documents=batch_docs, ids=batch_ids)
+            if lexical_index is not None:
+                lexical_index.add(batch_ids, [doc.page_content for doc in batch_docs])
+            files_done.update(doc.metadata.get("relative_path") for doc in batch_docs)
+            if progress is not None:
+                progress({
+                    "files_done": len(files_done) if start + batch_size < len(split_docs) else len(files_to_index),
+                    "files_total": len(files_to_index),
+                    "chunks_done": start + len(batch_docs),
+                    "chunks_total": len(split_docs),
+                    "seconds": time.perf_counter() - start_time,
+                })
+        vectorstore.persist()
+        if lexical_index is not None:
+            lexical_index.save(lexical_path)
+        # 색인 작업이 끝났으므로 대량 임베딩 워커 풀 종료 (질의 임베딩은 현재 프로세스 모델 사용)
+        if isinstance(self.embeddings, BulkEmbeddings):
+            self.embeddings.close()
+        embed_seconds = time.perf_counter() - start_time
+
+        expected_count = (previous_count - deleted_count if incremental else 0) + len(split_docs)
+        validation = validate_version(vectorstore, lexical_index, expected_count, previous_count)
+        result = {
+            "status": "reindexed" if validation["ok"] else "rejected",
+            "mode": plan["mode"],
+            "manifest_hash": plan["manifest_hash"],
+            "store_path": str(version_path),
+            "new_files": len(plan["new_files"]),
+            "modified_files": len(plan["modified_files"]),
+            "deleted_files": len(plan["deleted_files"]),
+            "added_chunks": len(split_docs),
+            "deleted_chunks": deleted_count,
+            "chunks_per_second": round(len(split_docs) / embed_seconds, 1) if embed_seconds > 0 else 0,
+            "build_seconds": round(time.perf_counter() - start_time, 3),
+            "validation": validation,
+        }
+        if not validation["ok"]:
+            # 전환하지 않은 버전은 삭제하고 검증 결과만 기록 (현재 버전은 그대로 서비스)
+            mark_rejected(base_path, plan["manifest_hash"], "; ".join(validation["errors"]))
+            shutil.rmtree(version_path, ignore_errors=True)
+            return result, vectorstore, lexical_index
+        # 읽기 전용 노드가 데이터 디렉토리 없이도 같은 코퍼스의 정책 파일을 읽도록 함께 저장 (export에 포함)
+        copy_corpus_files(self.data_path, version_path)
+        files_metadata = {path: {"hash": file_hash} for path, file_hash in plan["files"].items()}
+        write_version_info(version_path, plan["manifest_hash"], validation["chunk_count"], files_metadata, validation)
+        return result, vectorstore, lexical_index
+
+    # 검증을 통과한 버전으로 CURRENT 전환
+    def promote_built_version(self, base_path: Path, result: Dict[str, Any]):
+        version_path = Path(result["store_path"])
+        promote_version(base_path, version_path)
+        clear_rejected(base_path)
+        # 기존 메타데이터 파일도 현재 버전 기준으로 저장
+        save_metadata(read_version_files(version_path))
+        prune_versions(base_path)
+
+    # 계획 단계에서 끝난 경우의 결과 (새 버전을 만들지 않음)
+    @staticmethod
+    def _plan_result(plan: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"status": plan["status"], "manifest_hash": plan["manifest_hash"], "store_path": str(plan["active_path"])}
+        if plan["status"] == "rejected":
+            result["reason"] = "검증에 실패했거나 rollback한 코퍼스입니다. 강제 재색인(force)으로 다시 만들 수 있습니다."
+        return result
+
+    # 색인 후 검증을 통과하면 CURRENT 전환 (indexer.py) -> 결과 status : "up_to_date" | "rejected" | "reindexed"
+    def index(self, full: bool = False, force: bool = False,
+              progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        base_path = Path(self.vectorstore_path)
+        with version_lock(base_path):
+            plan = self.plan_version(base_path, full=full, force=force or full)
+            if plan["status"] != "build":
+                return self._plan_result(plan)
+            result, _, _ = self.build_version(base_path, plan, progress)
+            if result["status"] == "reindexed":
+                self.promote_built_version(base_path, result)
+        return result
+
+    # 색인 계획과 예상 청크 수만 계산 (임베딩/저장하지 않음)
+    def dry_run(self, full: bool = False, force: bool = False) -> Dict[str, Any]:
+        plan = self.plan_version(Path(self.vectorstore_path), full=full, force=force or full)
+        result = self._plan_result(plan)
+        result.update({
+            "mode": plan["mode"],
+            "new_files": len(plan["new_files"]),
+            "modified_files": len(plan["modified_files"]),
+            "deleted_files": len(plan["deleted_files"]),
+            "files_to_index": len(plan["files_to_index"]),
+            "active_chunks": plan["active_info"].get("chunk_count"),
+        })
+        if plan["status"] == "build":
+            split_docs, _ = self._split_docs_from_paths(plan["files_to_index"]) if plan["files_to_index"] else ([], [])
+            result["status"] = "dry_run"
+            result["chunks_to_index"] = len(split_docs)
+        return result
+
+
+class RAGPipeline(CorpusIndexer):
+    vectorstore = _corpus_attribute("vectorstore")
+    lexical_index = _corpus_attribute("lexical_index")
+    retriever = _corpus_attribute("retriever")
+    context_builder = _corpus_attribute("context_builder")
+    known_categories = _corpus_attribute("known_categories")
+    intent_router = _corpus_attribute("intent_router")
+    answer_store = _corpus_attribute("answer_store")
+    corpus_manifest_hash = _corpus_attribute("manifest_hash")
+    corpus_store_path = _corpus_attribute("store_path")
 
-            files_to_load_for_db.extend(new_file_paths)
-            files_to_load_for_db.extend(modified_file_paths)
+    # 생성자 정의
+    def __init__(self,
+                 data_path: str = str(settings.DATA_PATH),
+                 vectorstore_path: str = str(settings.VECTORSTORE_PATH),
+                 # force_create_db = False : 벡터DB가 이미 존재한다면 새로 생성하지 않고 기존 것을 사용
+                 force_create_db: bool = False,
+                 # 모든 파일을 강제로 재임베딩할지 여부
+                 force_reprocess_all_files: bool = False
+                 ):
+        super().__init__(data_path, vectorstore_path)
+        self.force_create_db = force_create_db
+        self.force_reprocess_all_files = force_reprocess_all_files
+        self.rag_chain = None
+        # 코퍼스에 따라 달라지는 구성 요소 (vectorstore, retriever 등 아래 속성은 이 스냅샷의 필드)
+        self._corpus = CorpusSnapshot()
+        # reindex()가 동시에 두 번 실행되지 않도록 잠금 (검색은 이 잠금을 사용하지 않음)
+        self._reindex_lock = threading.Lock()
+        self.last_reindex: Dict[str, Any] = {}
+        # 기존의 지역 변수였던 embeddings와 vectorstore를 클래스 변수로 관리
+        # 다른 함수들에서 해당 변수들에 접근할 수 있게 만들기 위함
+        # 기존에는 _initialize_pipeline 함수가 끝나면 사라졌었음
+        self.query_embeddings = None
+        self.prompt_packer: PromptPacker | None = None
+        # 선택적 cross-encoder rerank 단계 (RERANK_ENABLED)
+        self.reranker = None
+        # 인사/후속 질문의 검색을 생략하는 라우터 (QUERY_ROUTER_ENABLED)
+        self.query_router: QueryRouter | None = None
+        self.retrieval_k = settings.SEARCH_K
+        self.fetch_k = settings.SEARCH_K
+        self._initialize_pipeline()
 
-            base_metadata_for_update = remove_metadata_for_deleted_files(
-                deleted_file_paths, base_metadata_for_update
-            )
+    # initialize : 초기화
+    def _initialize_pipeline(self):
+        logger.info(f"RAG 파이프라인 초기화 시작... (벡터 저장소 백엔드: {settings.VECTORSTORE_BACKEND})")
 
-        if db_action != "create new" and os.path.exists(self.vectorstore_path) and \
-            any(Path(self.vectorstore_path).iterdir()):
-                try:
-                    self.vectorstore = Chroma(persist_directory=db_path_str, embedding_function=self.embeddings)
-                    logger.info(f"기존 벡터 저장소 로드 완료 (액션: {db_action}).")
-                except Exception as e:
-                    logger.warning(f"기존 DB 로드 실패 ({e}). DB를 새로 생성합니다.", exc_info=True)
-
-                    if os.path.exists(self.vectorstore_path):
-                        shutil.rmtree(self.vectorstore_path)
-                        self.vectorstore_path = None
-                        db_action = "create_new"
-
-                if paths_to_delete_from_db and self.vectorstore:
-                    self._delete_docs_by_relative_paths(paths_to_delete_from_db)
-                elif paths_to_delete_from_db and not self.vectorstore:
-                    logger.warning(f"삭제할 벡터 경로({paths_to_delete_from_db})가 있으나, DB 객체가 로드되지 않아 삭제를 건너뜁니다 (DB가 새로 생성될 예정).")
-
-        split_docs_for_db: list[Document] = []
-        if files_to_load_for_db:
-            docs_to_process = load_docs_from_paths(
-                self.data_path,
-                files_to_load_for_db
+        try:
+            # 동시에 들어온 질문 임베딩(embed_query)은 마이크로 배처에서 묶어 처리하고,
+            # 전체 재색인처럼 청크가 많을 때는 embed_documents를 워커 프로세스로 분산
+            self.query_embeddings = wrap_for_micro_batching(
+                get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME)
             )
-            if docs_to_process:
-                # 텍스트를 청크 단위로 분할해주는 분할기 생성
-                text_splitter = get_text_splitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
-                # actual_docs(로드된 Documents 타입의 리스트)를 더 작은 청크 단위의 Document 객체 리스트로 분할해서 저장
-                split_docs_for_db = split_documents(text_splitter, docs_to_process)
-                logger.info(f"{len(split_docs_for_db)}개의 문서 청크를 DB에 반영할 예정입니다.")
-
-            if (db_action == "create_new" and self.vectorstore is None) or \
-                (split_docs_for_db and self.vectorstore is None):
-                if not split_docs_for_db and db_action == "create_new":
-                    logger.warning("새 DB 생성 요청되었으나 처리할 문서가 없습니다. 빈 DB가 생성될 수 있습니다.")
-
-                self.vectorstore = Chroma.from_documents(
-                    documents=split_docs_for_db if split_docs_for_db else [],
-                    embedding=self.embeddings,
-                    persist_directory=db_path_str
-                )
-                logger.info(f"새 벡터 저장소 생성 완료. 저장된 청크 수: {len(split_docs_for_db)}")
-
-            elif split_docs_for_db:
-                logger.info(f"{len(split_docs_for_db)}개의 청크를 기존 벡터 저장소에 추가합니다.")
-                self.vectorstore.add_documents(documents=split_docs_for_db)
-                logger.info("문서 추가 완료.")
-
-                if self.vectorstore is None:
-                    logger.error("벡터 저장소를 초기화할 수 없습니다.")
-                    raise ValueError("벡터 저장소 초기화 실패.")
-
-        # 파일에 변경 사항(추가/수정/삭제)이 있었는지 먼저 확인
-        if files_to_load_for_db or deleted_file_paths:
-
-            # 1. 벡터 DB 저장 (객체가 있을 때만)
-            if self.vectorstore:
-                logger.info("벡터 저장소의 변경사항을 디스크에 최종 저장합니다.")
-                self.vectorstore.persist()
-            else:
-                # 방어 코드
-                logger.warning("파일 변경이 있었으나 vectorstore 객체가 없어 DB 저장을 건너뜁니다.")
-
-            # 2. 메타데이터 저장
-            logger.info("파일 변경 내역 메타데이터를 저장합니다.")
-            final_metadata_to_save = update_metadata_after_processing(
-                files_to_load_for_db,
-                current_files_hashes,
-                base_metadata_for_update
+            self.embeddings = wrap_for_bulk_embedding(
+                self.query_embeddings,
+                model_name=settings.EMBEDDING_MODEL_NAME
             )
-            save_metadata(final_metadata_to_save)
+        except Exception as e:
+            logger.error(f"임베딩 모델 로드 실패: {e}", exc_info=True)
+            raise
+
+        # MMR을 사용하면 후보를 넉넉히 가져온 뒤 ContextBuilder에서 SEARCH_K개로 줄임
+        self.retrieval_k = max(settings.CONTEXT_CANDIDATE_K, settings.SEARCH_K) if settings.CONTEXT_MMR_ENABLED else settings.SEARCH_K
+        # rerank를 사용하면 더 넓은 후보를 가져와서 rerank 후 retrieval_k개만 남김
+        if settings.RERANK_ENABLED:
+            from reranker import CrossEncoderReranker
+            self.reranker = CrossEncoderReranker()
+        self.fetch_k = max(settings.RERANK_CANDIDATE_K, self.retrieval_k) if self.reranker else self.retrieval_k
+
+        # 데이터 파일 변경 사항(또는 force_create_db 전체 재생성)은 새 버전 디렉토리에 반영하고,
+        # 검증을 통과했을 때만 현재 버전으로 전환 (기존 저장소를 직접 수정하거나 삭제하지 않음)
+        # VECTORSTORE_READ_ONLY이면 색인하지 않고 indexer.py가 만든 현재 버전만 로드
+        base_path = Path(self.vectorstore_path)
+        full_rebuild = self.force_create_db or self.force_reprocess_all_files
+        result, snapshot = self._sync_version(base_path, full=full_rebuild, force=full_rebuild)
+        if snapshot is None:
+            # 새 버전이 검증에 실패했으면 기존 버전으로 서비스
+            active_path = active_vectorstore_path(base_path)
+            if not (active_path.is_dir() and any(active_path.iterdir())):
+                logger.error(f"검증을 통과한 벡터 저장소 버전이 없습니다: {result}")
+                raise ValueError("벡터 저장소 초기화 실패.")
+            logger.warning(f"새 벡터 저장소 버전으로 전환하지 못해 기존 버전으로 시작합니다: {result}")
+            snapshot = self._load_snapshot(base_path, active_path, read_version_info(active_path).get("manifest_hash", ""))
+        if result["status"] != "loaded":
+            self.last_reindex = result
+        self._corpus = snapshot
 
         # try:
         #     self.rag_chain = create_rag_chain(
@@ -296,56 +595,281 @@ class RAGPipeline:
         #     logger.error(f"LLM, Retriever 또는 RAG 체인 설정 실패: {e}", exc_info=True)
         #     raise
 
-        if self.vectorstore is None: # 방어 코드: vectorstore가 초기화되지 않았다면
-            logger.error("Vectorstore is not initialized. Cannot create retriever, prompt, llm.")
-            raise ValueError("Vectorstore initialization failed.")
-
         try:
-            self.retriever = get_retriever(self.vectorstore, settings.SEARCH_K)
+            self.prompt_packer = PromptPacker(token_budget=settings.PROMPT_TOKEN_BUDGET)
+            if settings.QUERY_ROUTER_ENABLED:
+                self.query_router = QueryRouter()
             self.llm = get_llm(model_name=settings.LLM_MODEL_NAME)
             self.prompt = ChatPromptTemplate.from_template(settings.PROMPT_TEMPLATE)
             self.output_parser = StrOutputParser()
-            logger.info("Retriever, LLM, Prompt, OutputParser 초기화 완료.")
+            logger.info("Retriever, ContextBuilder, PromptPacker, LLM, Prompt, OutputParser 초기화 완료.")
         except Exception as e:
             logger.error(f"RAG 구성 요소 (Retriever, LLM, Prompt, Parser) 초기화 실패: {e}", exc_info=True)
             raise
 
-        logger.info("RAG 파이프라인 초기화 완료.")
-
+        logger.info(f"RAG 파이프라인 초기화 완료. (벡터 저장소: '{self.corpus_store_path}')")
+
+    # 데이터 디렉토리와 현재 버전을 비교해서 필요하면 새 버전을 만들고, 검증을 통과하면 CURRENT 전환
+    # 반환 : (결과, 새로 서비스할 스냅샷 - 바꿀 필요가 없거나 검증에 실패했으면 None)
+    #        결과 status : "unchanged" | "loaded"(다른 프로세스가 만든 버전) | "reindexed" | "rejected"
+    def _sync_version(self, base_path: Path, full: bool = False,
+                      force: bool = False) -> Tuple[Dict[str, Any], Optional[CorpusSnapshot]]:
+        if settings.VECTORSTORE_READ_ONLY:
+            return self._reload_active_version(base_path)
+        with version_lock(base_path):
+            plan = self.plan_version(base_path, full=full, force=force)
+            active_path = plan["active_path"]
+            if plan["status"] == "up_to_date":
+                if str(active_path) == self.corpus_store_path:
+                    return {"status": "unchanged", "manifest_hash": plan["manifest_hash"]}, None
+                # 다른 워커가 잠금을 잡고 있던 동안 같은 코퍼스로 만든 버전
+                logger.info(f"이미 만들어진 벡터 저장소 버전을 로드합니다: '{active_path}'")
+                return ({**self._plan_result(plan), "status": "loaded"},
+                        self._load_snapshot(base_path, active_path, plan["manifest_hash"]))
+            if plan["status"] == "rejected":
+                # 검증 실패/rollback으로 기록된 코퍼스 (현재 버전이 바뀌었으면 그 버전만 로드)
+                snapshot = None
+                if str(active_path) != self.corpus_store_path:
+                    snapshot = self._load_snapshot(base_path, active_path, plan["active_info"].get("manifest_hash", ""))
+                return self._plan_result(plan), snapshot
+
+            result, vectorstore, lexical_index = self.build_version(base_path, plan)
+            if result["status"] != "reindexed":
+                return result, None
+            # 새 버전의 검색 구성 요소를 모두 만든 뒤에 디스크 포인터를 전환
+            snapshot = self._build_corpus_snapshot(vectorstore, lexical_index, plan["manifest_hash"], result["store_path"])
+            self.promote_built_version(base_path, result)
+            return result, snapshot
+
+    # 읽기 전용 모드 : 색인하지 않고 CURRENT가 가리키는 버전이 바뀌었을 때만 로드 (잠금 파일도 만들지 않음)
+    def _reload_active_version(self, base_path: Path) -> Tuple[Dict[str, Any], Optional[CorpusSnapshot]]:
+        active_path = active_vectorstore_path(base_path)
+        manifest_hash = read_version_info(active_path).get("manifest_hash", "")
+        if str(active_path) == self.corpus_store_path:
+            return {"status": "unchanged", "manifest_hash": manifest_hash}, None
+        if not (active_path.is_dir() and any(active_path.iterdir())):
+            raise ValueError(f"로드할 벡터 저장소가 없습니다: '{active_path}' (indexer.py로 먼저 색인하세요)")
+        logger.info(f"읽기 전용 모드: indexer.py가 만든 벡터 저장소 버전을 로드합니다: '{active_path}'")
+        return ({"status": "loaded", "manifest_hash": manifest_hash, "store_path": str(active_path)},
+                self._load_snapshot(base_path, active_path, manifest_hash))
+
+    # 버전 디렉토리의 저장소/역색인을 로드해서 스냅샷 생성
+    def _load_snapshot(self, base_path: Path, store_path: Path, manifest_hash: str) -> CorpusSnapshot:
+        check_version_compatible(store_path)
+        vectorstore = load_vectorstore(self.embeddings, str(store_path))
+        lexical_index = self._load_lexical_index(vectorstore, lexical_index_path_for(store_path, base_path))
+        logger.info(f"벡터 저장소 로드 완료: '{store_path}' (청크 {get_vectorstore_count(vectorstore)}개)")
+        return self._build_corpus_snapshot(vectorstore, lexical_index, manifest_hash, str(store_path))
+
+    # 벡터 저장소/역색인으로 검색 구성 요소를 만들어 새 스냅샷 반환 (현재 스냅샷은 바꾸지 않음)
+    # 정책 파일은 버전 디렉토리의 복사본을 우선 사용 (읽기 전용 노드는 데이터 디렉토리가 비어 있을 수 있음)
+    def _build_corpus_snapshot(self, vectorstore: VectorStore, lexical_index: Optional[LexicalIndex],
+                               manifest_hash: str, store_path: str) -> CorpusSnapshot:
+        policy_data_path = corpus_files_path(Path(store_path), self.data_path)
+        if not (policy_data_path / POLICY_RECORDS_FILENAME).is_file():
+            logger.warning(f"정책 레코드 파일({POLICY_RECORDS_FILENAME})이 없어 항목 라우터/필터 분류 목록이 비어 있습니다: "
+                           f"'{policy_data_path}' (indexer.py로 다시 색인하거나 데이터 디렉토리에 정책 파일을 두세요)")
+        snapshot = CorpusSnapshot(
+            vectorstore=vectorstore,
+            lexical_index=lexical_index,
+            retriever=get_retriever(vectorstore, self.fetch_k, lexical_index=lexical_index),
+            context_builder=ContextBuilder(vectorstore, k=settings.SEARCH_K),
+            known_categories=sorted({
+                m["category"] for m in load_policy_metadata(policy_data_path).values() if m.get("category")
+            }),
+            manifest_hash=manifest_hash,
+            store_path=store_path,
+        )
+        if settings.INTENT_ROUTER_ENABLED:
+            snapshot.intent_router = IntentRouter(PolicyStore(policy_data_path))
+        if settings.ANSWER_STORE_ENABLED:
+            snapshot.answer_store = AnswerStore(self.query_embeddings, manifest_hash)
+        return snapshot
+
+    # 새 스냅샷으로 교체 (참조 하나만 바꾸므로 질문 처리 중인 스레드는 이전 스냅샷을 끝까지 사용)
+    def _swap_corpus(self, snapshot: CorpusSnapshot):
+        previous = self._corpus
+        snapshot.version = previous.version + 1
+        self._corpus = snapshot
+        # 이전 코퍼스로 검색한 후속 질문용 문맥은 재사용하지 않음
+        if self.query_router is not None:
+            self.query_router.context_cache.clear_all()
+        logger.info(f"코퍼스 교체 완료: manifest {previous.manifest_hash[:12]} -> {snapshot.manifest_hash[:12]} "
+                    f"(버전 {snapshot.version}, 저장소 '{snapshot.store_path}')")
+
+    # 서버 실행 중 데이터 디렉토리 변경 사항 반영 (corpus_watcher.py, /admin/reindex)
+    # 새 버전 디렉토리를 만들어 검증을 통과하면 CURRENT를 전환한 뒤 스냅샷 교체, 실패하면 현재 버전으로 계속 서비스
+    # 다른 워커가 같은 코퍼스로 이미 만든 버전이 있으면 다시 임베딩하지 않고 로드만 함
+    # full : 전체 재생성 | force : 검증 실패/rollback으로 기록된 코퍼스도 다시 생성
+    # 반환 : {"status": "unchanged" | "reindexed" | "loaded" | "rejected" | "busy" | "failed", ...}
+    def reindex(self, full: bool = False, force: bool = False) -> Dict[str, Any]:
+        if not self._reindex_lock.acquire(blocking=False):
+            return {"status": "busy"}
+        start_time = time.perf_counter()
+        try:
+            result, snapshot = self._sync_version(Path(self.vectorstore_path), full=full, force=force or full)
+            if snapshot is not None:
+                self._swap_corpus(snapshot)
+        except Exception as e:
+            logger.error(f"재색인 실패, 기존 코퍼스로 계속 서비스합니다: {e}", exc_info=True)
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            self._reindex_lock.release()
+        result["seconds"] = round(time.perf_counter() - start_time, 3)
+        result["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if result["status"] != "unchanged":
+            self.last_reindex = result
+        return result
+
+    # 이전 버전(또는 target 버전)으로 되돌리고 스냅샷 교체 (/admin/rollback)
+    def rollback(self, target: Optional[str] = None) -> Dict[str, Any]:
+        if settings.VECTORSTORE_READ_ONLY:
+            return {"status": "failed", "error": "읽기 전용 모드입니다. 색인 노드에서 vectorstore_versions.py rollback을 실행하세요."}
+        if not self._reindex_lock.acquire(blocking=False):
+            return {"status": "busy"}
+        try:
+            base_path = Path(self.vectorstore_path)
+            with version_lock(base_path):
+                version_path = rollback_version(base_path, self.data_path, target)
+                snapshot = self._load_snapshot(base_path, version_path,
+                                               read_version_info(version_path).get("manifest_hash", ""))
+            self._swap_corpus(snapshot)
+            result = {"status": "rolled_back", "store_path": str(version_path), "manifest_hash": snapshot.manifest_hash}
+        except ValueError as e:
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            self._reindex_lock.release()
+        result["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.last_reindex = result
+        return result
+
+    def is_reindexing(self) -> bool:
+        return self._reindex_lock.locked()
+
+    # 파이프라인 구성 요소별 지표 반환 (/stats 엔드포인트에서 사용)
+    def get_stats(self) -> Dict[str, Any]:
+        corpus = self._corpus
+        stats: Dict[str, Any] = {
+            "corpus": {
+                "manifest_hash": corpus.manifest_hash,
+                "store_path": corpus.store_path,
+                "version": corpus.version,
+                "reindexing": self.is_reindexing(),
+                "last_reindex": self.last_reindex,
+            }
+        }
+        if isinstance(self.query_embeddings, MicroBatchingEmbeddings):
+            stats["embedding_batcher"] = self.query_embeddings.stats()
+        if corpus.context_builder is not None:
+            stats["context"] = corpus.context_builder.stats()
+        if self.prompt_packer is not None:
+            stats["prompt"] = self.prompt_packer.stats()
+        if self.reranker is not None:
+            stats["reranker"] = self.reranker.stats()
+        if corpus.intent_router is not None:
+            stats["intent_router"] = corpus.intent_router.stats()
+        if self.query_router is not None:
+            stats["query_router"] = self.query_router.stats()
+        if corpus.answer_store is not None:
+            stats["answer_store"] = corpus.answer_store.stats()
+        return stats
 
     # 사용자 질문을 전달해 LLM 답변을 반환
-    def query(self, question: str, history: Optional[List[BaseMessage]] = None) -> str:
-
-        if not all([self.retriever, self.prompt, self.llm, self.output_parser]):
+    # where 필터를 적용해서 검색 (필터가 없으면 전체 검색)
+    # query_vector : 이미 계산한 질문 임베딩 (하이브리드 검색기는 다시 임베딩하지 않고 사용)
+    def _retrieve(self, corpus: CorpusSnapshot, question: str, where: Optional[Dict[str, Any]],
+                  query_vector: Optional[List[float]] = None) -> List[Document]:
+        search_kwargs: Dict[str, Any] = {"filter": where} if where else {}
+        if query_vector is not None and isinstance(corpus.retriever, HybridRetriever):
+            search_kwargs["embedding"] = query_vector
+        return corpus.retriever.invoke(question, **search_kwargs)
+
+    # 질문 -> 문맥 블록 (필터 적용 검색 -> rerank -> 중복/겹침 제거, 관련도 순)
+    # corpus : 질문 처리를 시작할 때의 스냅샷 (처리 중에 재색인으로 교체되어도 같은 코퍼스로 검색)
+    def _retrieve_context_blocks(self, corpus: CorpusSnapshot, question: str, filters: Optional[Dict[str, Any]],
+                                 query_vector: Optional[List[float]] = None) -> List[str]:
+        inferred = False
+        if not filters and settings.FILTER_INFERENCE_ENABLED:
+            filters = infer_filters(question, corpus.known_categories)
+            inferred = bool(filters)
+        where = build_where(filters)
+        open_only = bool(filters and filters.get("open_only"))
+        if filters:
+            logger.info(f"검색 사전 필터 ({'추론' if inferred else '요청'}): {where}{' (신청 가능한 정책만)' if open_only else ''}")
+
+        retrieved_docs: List[Document] = self._retrieve(corpus, question, where, query_vector)
+        if open_only:
+            retrieved_docs = [doc for doc in retrieved_docs if not is_closed(doc.metadata)]
+        # 추론한 필터는 틀릴 수 있으므로, 필터로 찾은 문서가 k개보다 적으면 필터 없이 검색한 결과로 채움
+        if inferred and len(retrieved_docs) < self.retrieval_k:
+            logger.info(f"추론한 필터에 맞는 문서가 {len(retrieved_docs)}개뿐이라 필터 없이 검색한 결과로 채웁니다.")
+            seen = {doc.page_content for doc in retrieved_docs}
+            retrieved_docs = retrieved_docs + [
+                doc for doc in self._retrieve(corpus, question, None, query_vector)
+                if doc.page_content not in seen and not (open_only and is_closed(doc.metadata))
+            ]
+
+        logger.debug(f"검색된 문서 개수: {len(retrieved_docs)}")
+        for i, doc in enumerate(retrieved_docs):
+            logger.debug(f"문서 {i + 1} 소스: {doc.metadata.get('source', 'N/A')}, 내용 일부: {doc.page_content[:100]}...")
+
+        if self.reranker is not None:
+            retrieved_docs = self.reranker.rerank(question, retrieved_docs)
+        retrieved_docs = retrieved_docs[:self.retrieval_k]
+
+        return corpus.context_builder.build_blocks(retrieved_docs)
+
+    # 사용자의 직전 검색 문맥 삭제 (/clear_history에서 사용)
+    def clear_member_context(self, member_id: str):
+        if self.query_router is not None:
+            self.query_router.context_cache.clear(member_id)
+
+    # filters : {"category", "region", "district", "open_only"} 중 지정된 항목으로 사전 필터
+    #           (지정하지 않으면 질문에서 추론, 추론한 필터로 찾은 문서가 k개보다 적으면 필터 없이 검색한 결과로 채움)
+    # member_id : 후속 질문에서 직전 검색 문맥을 재사용할 때 사용자 구분에 사용
+    def query(self, question: str, history: Optional[List[BaseMessage]] = None,
+              filters: Optional[Dict[str, Any]] = None, member_id: Optional[str] = None) -> str:
+
+        # 재색인으로 스냅샷이 교체되어도 이 질문은 시작 시점의 코퍼스로 끝까지 처리 (잠금 없음)
+        corpus = self._corpus
+        if not all([corpus.retriever, self.prompt, self.llm, self.output_parser]):
             logger.error("RAG 파이프라인의 일부 구성요소가 초기화되지 않았습니다.")
             return "오류: RAG 시스템이 준비되지 않았습니다."
 
         try:
-            logger.info(f"RAG 파이프라인으로 질문 처리 중: {question}")
-
-            retrieved_docs: List[Document] = self.retriever.invoke(question)
-
-            logger.debug(f"검색된 문서 개수: {len(retrieved_docs)}")
-            for i, doc in enumerate(retrieved_docs):
-                logger.debug(f"문서 {i + 1} 소스: {doc.metadata.get('source', 'N/A')}, 내용 일부: {doc.page_content[:100]}...")
+            # 정책과 항목이 모두 확정되면 저장된 항목 내용을 바로 반환 (검색/LLM 호출 없음)
+            if corpus.intent_router is not None:
+                routed = corpus.intent_router.route(question)
+                if routed is not None:
+                    return routed.answer
+            # 현재 코퍼스로 미리 생성한 대표 질문 답변 (필터를 지정한 요청은 제외)
+            # 질문 임베딩은 한 번만 계산해서 아래 벡터 검색에도 사용
+            query_vector = None
+            if corpus.answer_store is not None and len(corpus.answer_store) and not filters:
+                query_vector = self.query_embeddings.embed_query(question)
+                precomputed = corpus.answer_store.lookup(question, query_vector)
+                if precomputed is not None:
+                    return precomputed["answer"]
 
-            context_parts = []
-            for doc in retrieved_docs:
-                context_parts.append(doc.page_content)
+            logger.info(f"RAG 파이프라인으로 질문 처리 중: {question}")
 
-            context_str = "\n\n".join(context_parts)
+            # 인사/잡담은 검색 없이, 직전 답변에 대한 후속 질문은 직전 검색 문맥을 재사용
+            route, cached_blocks = (None, None)
+            if self.query_router is not None and not filters:
+                route, cached_blocks = self.query_router.route(question, member_id, bool(history))
 
-            chat_history_str = ""
-            if history:
-                history_lines = []
-                for msg in history:
-                    if msg.type == "human":
-                        history_lines.append(f"사용자: {msg.content}")
-                    elif msg.type == "ai":
-                        history_lines.append(f"AI: {msg.content}")
-                chat_history_str = "\n".join(history_lines)
+            if route == ROUTE_NONE:
+                context_blocks: List[str] = []
+            elif route == ROUTE_REUSE:
+                context_blocks = cached_blocks
             else:
-                chat_history_str = "이전 대화 기록이 존재하지 않습니다."
+                # 중복/겹침을 제거한 문맥 블록 (관련도 순)
+                context_blocks = self._retrieve_context_blocks(corpus, question, filters, query_vector)
+                if self.query_router is not None:
+                    self.query_router.context_cache.put(member_id, context_blocks)
+
+            # 질문 -> 문맥 -> 최근 대화 -> 오래된 대화 순서로 토큰 예산 안에 채움
+            packed = self.prompt_packer.pack(question, context_blocks, history)
 
             chain = (
                     self.prompt
@@ -354,9 +878,9 @@ class RAGPipeline:
             )
 
             answer = chain.invoke({
-                "chat_history": chat_history_str,
-                "context": context_str,
-                "question": question
+                "chat_history": packed.chat_history,
+                "context": NO_RETRIEVAL_CONTEXT_TEXT if route == ROUTE_NONE else packed.context,
+                "question": packed.question
             })
 
             logger.info(f"RAG 파이프라인 답변 생성 완료.")
@@ -10,14 +10,11 @@ uvicorn main:app --host 0.0.0.0 --port 8000 --log-level info
 from config import settings
 from dotenv import load_dotenv
 import os
-# 제미나이 LLM import
-from langchain_google_genai import ChatGoogleGenerativeAI
-# Chroma 벡터 DB import
-from langchain_community.vectorstores import Chroma
+# 제미나이 LLM(langchain_google_genai), Chroma 벡터 DB(langchain_community),
+# 한국어 형태소 분할기(konlpy), torch 등 로드가 느린 모듈은 프로세스 시작 시간을 줄이기 위해
+# 실제로 사용하는 함수 안에서 import 함
 # 랭체인 문서의 기본 단위인 Document 클래스 import
 from langchain_core.documents import Document
-# 한국어 형태소 분할기 import
-from langchain_text_splitters import KonlpyTextSplitter
 # 프롬프트 템플릿 import
 from langchain_core.prompts import ChatPromptTemplate
 # 사용자의 질문을 어떤 변환이나 처리 과정을 거치지 않고 RAG 체인에 그대로 전달하기 위해 import
@@ -25,9 +22,6 @@ from langchain_core.runnables import RunnablePassthrough
 # 기본적으로 LLM은 여러가지 데이터가 담긴 구조화 객체를 반환함
 # 그 중에서 LLM의 답변 부분만 추출해 문자열로 변환시켜주는 역할
 from langchain_core.output_parsers import StrOutputParser
-# 허깅 페이스 임베딩 모델
-import torch
-from langchain_huggingface import HuggingFaceEmbeddings
 # 로거
 import logging
 
@@ -37,6 +31,8 @@ logger = logging.getLogger(__name__)
 # 텍스트 분할기
 def get_text_splitter(chunk_size: int = settings.CHUNK_SIZE,
                       chunk_overlap: int = settings.CHUNK_OVERLAP):
+    # 한국어 형태소 분할기 import
+    from langchain_text_splitters import KonlpyTextSplitter
     logger.info(f"텍스트 분할기 초기화 (chunk_size: {chunk_size}, chunk_overlap: {chunk_overlap})")
     return KonlpyTextSplitter(
         chunk_size=chunk_size,
@@ -50,16 +46,39 @@ def split_documents(text_splitter, docs: list[Document]):
     return split_docs
 
 # 임베딩 모델 호출
-def get_embedding_model(model_name: str = settings.EMBEDDING_MODEL_NAME):
+# settings.EMBEDDING_BACKEND에 따라 torch(HuggingFaceEmbeddings) 또는 ONNX Runtime 백엔드를 반환
+# batch_size : encode 시 한 번에 처리할 문장 수 (None이면 백엔드 기본값)
+# use_server : EMBEDDING_SERVER_SOCKET이 설정되어 있으면 모델을 로드하지 않고 공유 임베딩 서버 클라이언트를 반환
+def get_embedding_model(model_name: str = settings.EMBEDDING_MODEL_NAME,
+                        batch_size: int | None = None,
+                        backend: str = settings.EMBEDDING_BACKEND,
+                        use_server: bool = True):
+    if use_server and settings.EMBEDDING_SERVER_SOCKET:
+        from embedding_server import EmbeddingClient
+        logger.info(f"공유 임베딩 서버 사용: '{settings.EMBEDDING_SERVER_SOCKET}' (워커에서 모델을 로드하지 않음)")
+        return EmbeddingClient(socket_path=settings.EMBEDDING_SERVER_SOCKET)
+
+    if backend == "onnx":
+        return _get_onnx_embedding_model(model_name, batch_size)
+    if backend != "torch":
+        raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: '{backend}' (torch 또는 onnx)")
+
+    # ONNX 백엔드만 사용하는 워커가 torch를 불러오지 않도록 torch 경로에서만 import
+    import torch
+    # 허깅 페이스 임베딩 모델
+    from langchain_huggingface import HuggingFaceEmbeddings
     try:
         # CUDA를 지원하는 NVIDIA GPU가 사용 가능하면 'cuda' (GPU 사용), 그렇지 않으면 'cpu' (CPU 사용)
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        # 임베딩 벡터의 정규화
+        # 임베딩 모델이 만든 숫자 벡터들의 길이를 모두 1로 통일시켜서, 의미적인 방향 비교를 더 쉽고 정확하게 하자
+        encode_kwargs = {'normalize_embeddings': True}
+        if batch_size:
+            encode_kwargs['batch_size'] = batch_size
         embeddings = HuggingFaceEmbeddings(
             model_name=model_name,
             model_kwargs={'device': device},
-            # 임베딩 벡터의 정규화
-            # 임베딩 모델이 만든 숫자 벡터들의 길이를 모두 1로 통일시켜서, 의미적인 방향 비교를 더 쉽고 정확하게 하자
-            encode_kwargs={'normalize_embeddings': True}
+            encode_kwargs=encode_kwargs
         )
         logger.info(f"임베딩 모델 '{model_name}' 로드 완료 (device: {device})")
 
@@ -69,6 +88,23 @@ def get_embedding_model(model_name: str = settings.EMBEDDING_MODEL_NAME):
         logger.error(f"HuggingFaceEmbeddings ({model_name}) 초기화 중 오류: {e}", exc_info=True)
         raise
 
+# ONNX Runtime 임베딩 모델 호출 (onnx_embeddings.export_onnx_model로 미리 변환된 모델 사용)
+def _get_onnx_embedding_model(model_name: str, batch_size: int | None = None):
+    from onnx_embeddings import OnnxEmbeddings
+    try:
+        embeddings = OnnxEmbeddings(
+            model_dir=settings.ONNX_MODEL_DIR,
+            use_int8=settings.ONNX_USE_INT8,
+            batch_size=batch_size or 32
+        )
+        if embeddings.source_model_name != model_name:
+            logger.warning(f"ONNX 모델의 원본({embeddings.source_model_name})이 설정된 임베딩 모델({model_name})과 다릅니다.")
+        logger.info(f"ONNX 임베딩 모델 로드 완료 (경로: {settings.ONNX_MODEL_DIR}, int8: {settings.ONNX_USE_INT8})")
+        return embeddings
+    except Exception as e:
+        logger.error(f"OnnxEmbeddings ({settings.ONNX_MODEL_DIR}) 초기화 중 오류: {e}", exc_info=True)
+        raise
+
 # LLM 모델 호출
 def get_llm(model_name: str = settings.LLM_MODEL_NAME,
             temperature: float = 0.3):
@@ -79,6 +115,8 @@ def get_llm(model_name: str = settings.LLM_MODEL_NAME,
         logger.error("LLM 초기화 오류: Google API 키가 설정되지 않았습니다 (settings.GOOGLE_API_KEY 확인).")
         raise ValueError("Google API 키가 LLM 초기화에 필요합니다 (settings.GOOGLE_API_KEY 확인).")
 
+    # 제미나이 LLM import
+    from langchain_google_genai import ChatGoogleGenerativeAI
     try:
         llm = ChatGoogleGenerativeAI(
             model=model_name,
@@ -92,39 +130,79 @@ def get_llm(model_name: str = settings.LLM_MODEL_NAME,
         logger.error(f"ChatGoogleGenerativeAI ({model_name}) 초기화 중 오류: {e}", exc_info=True)
         raise
 
+# 설정된 백엔드의 벡터 저장소 클래스 반환
+# "chroma" : langchain_community의 Chroma | "mmap" : vector_store.py의 MmapVectorStore
+def _get_vectorstore_class(backend: str):
+    if backend == "chroma":
+        # Chroma 벡터 DB import
+        from langchain_community.vectorstores import Chroma
+        return Chroma
+    if backend == "mmap":
+        from vector_store import MmapVectorStore
+        return MmapVectorStore
+    raise ValueError(f"지원하지 않는 벡터 저장소 백엔드입니다: '{backend}' (chroma | mmap)")
+
+# 저장된 벡터 수 반환 (백엔드마다 방식이 다름)
+def get_vectorstore_count(vectorstore) -> int:
+    if hasattr(vectorstore, "count"):
+        return vectorstore.count()
+    return vectorstore._collection.count()
+
+# 기존 벡터 저장소 로드
+def load_vectorstore(embeddings,
+                     persist_directory: str = str(settings.VECTORSTORE_PATH),
+                     backend: str = settings.VECTORSTORE_BACKEND):
+    vectorstore_class = _get_vectorstore_class(backend)
+    return vectorstore_class(persist_directory=persist_directory, embedding_function=embeddings)
+
+# 청크 리스트로 새 벡터 저장소 생성
+# ids : 청크 ID 리스트 (지정하면 이후 같은 ID로 삭제/교체 가능)
+def build_vectorstore(split_docs: list[Document],
+                      embeddings,
+                      persist_directory: str = str(settings.VECTORSTORE_PATH),
+                      ids: list[str] | None = None,
+                      backend: str = settings.VECTORSTORE_BACKEND):
+    vectorstore_class = _get_vectorstore_class(backend)
+    return vectorstore_class.from_documents(
+        documents=split_docs,
+        embedding=embeddings,
+        ids=ids,
+        persist_directory=persist_directory
+    )
+
 # 벡터DB 생성 또는 기존DB 불러오기
 def create_or_load_vectorstore(
         split_docs: list[Document] | None = None,
         embeddings=None,
         persist_directory: str = str(settings.VECTORSTORE_PATH),
-        force_create: bool = False
+        force_create: bool = False,
+        backend: str = settings.VECTORSTORE_BACKEND
 ):
     # DB를 강제로 생성해야 하거나, 디렉토리가 없거나, 기존 디렉토리가 존재하나 비어있을 때
     if force_create or not os.path.exists(persist_directory) or \
             (os.path.exists(persist_directory) and not os.listdir(persist_directory)):
         if not split_docs or not embeddings:
             raise ValueError("새 벡터 저장소 생성 시 split_docs와 embeddings가 필요합니다.")
-        logger.info(f"'{persist_directory}'에 새 벡터 저장소 생성 중...")
-        vectorstore = Chroma.from_documents(
-            documents=split_docs,
-            embedding=embeddings,
-            persist_directory=persist_directory
-        )
-        logger.info(f"벡터 저장소 생성 완료. 총 {vectorstore._collection.count()}개의 벡터 저장됨.")
+        logger.info(f"'{persist_directory}'에 새 벡터 저장소 생성 중... (백엔드: {backend})")
+        vectorstore = build_vectorstore(split_docs, embeddings, persist_directory, backend=backend)
+        logger.info(f"벡터 저장소 생성 완료. 총 {get_vectorstore_count(vectorstore)}개의 벡터 저장됨.")
   
     else:
         if not embeddings:
             raise ValueError("기존 벡터 저장소 로드 시 embeddings가 필요합니다.")
-        logger.info(f"'{persist_directory}'에서 기존 벡터 저장소 로드 중...")
-        vectorstore = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=embeddings
-        )
-        logger.info(f"벡터 저장소 로드 완료. 총 {vectorstore._collection.count()}개의 벡터 확인됨.")
+        logger.info(f"'{persist_directory}'에서 기존 벡터 저장소 로드 중... (백엔드: {backend})")
+        vectorstore = load_vectorstore(embeddings, persist_directory, backend=backend)
+        logger.info(f"벡터 저장소 로드 완료. 총 {get_vectorstore_count(vectorstore)}개의 벡터 확인됨.")
     return vectorstore
 
 # 문서 검색기
-def get_retriever(vectorstore, k: int = settings.SEARCH_K):
+# lexical_index가 있고 HYBRID_SEARCH_ENABLED이면 BM25 + 벡터 하이브리드 검색기 반환
+def get_retriever(vectorstore, k: int = settings.SEARCH_K, lexical_index=None):
+    if lexical_index is not None and settings.HYBRID_SEARCH_ENABLED:
+        from lexical_index import HybridRetriever
+        retriever = HybridRetriever(vectorstore=vectorstore, lexical_index=lexical_index, k=k)
+        logger.info(f"하이브리드 Retriever 생성 완료 (검색 결과 수: {k}, 후보 수: {settings.HYBRID_FETCH_K})")
+        return retriever
     retriever = vectorstore.as_retriever(search_kwargs={"k": k})
     logger.info(f"Retriever 생성 완료 (검색 결과 수: {k})")
     return retriever
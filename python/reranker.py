@@ -0,0 +1,176 @@
+# reranker.py
+"""
+검색 후보 청크를 CPU cross-encoder로 다시 채점(rerank)하는 선택적 단계를 제공합니다.
+
+작은 문맥으로 좋은 답변을 얻기 위해 후보를 넉넉하게(RERANK_CANDIDATE_K) 가져온 뒤
+cross-encoder 점수로 다시 정렬해서 상위 청크만 문맥 구성 단계로 넘깁니다.
+
+- 후보 (질문, 청크) 쌍 전체를 한 번의 배치 forward로 채점
+- (질문, 청크 ID) 기준 점수 캐시 (LRU, RERANK_CACHE_SIZE)
+- 지연 시간 예산 : 동시에 처리 중인 rerank가 많거나(RERANK_MAX_CONCURRENT),
+  예상 소요 시간이 RERANK_LATENCY_BUDGET_MS를 넘으면 rerank를 건너뛰고 검색 순서를 그대로 사용
+- 예상 시간은 로드 직후 warm-up 호출(측정 제외) 이후의 실제 rerank로만 계산하고, 예산 초과로 건너뛰는 동안에도
+  RERANK_PROBE_AFTER_SKIPS번 또는 RERANK_PROBE_INTERVAL_SECONDS마다 한 번 실제로 rerank해서 다시 측정
+  (일시적으로 느렸던 호출 하나 때문에 프로세스가 끝날 때까지 rerank가 꺼지지 않도록)
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
+# 로거
+import logging
+
+from langchain_core.documents import Document
+
+from config import settings
+from lexical_index import get_chunk_id
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    def __init__(self,
+                 model_name: str = settings.RERANKER_MODEL_NAME,
+                 cache_size: int = settings.RERANK_CACHE_SIZE,
+                 latency_budget_ms: float = settings.RERANK_LATENCY_BUDGET_MS,
+                 max_concurrent: int = settings.RERANK_MAX_CONCURRENT,
+                 probe_after_skips: int = settings.RERANK_PROBE_AFTER_SKIPS,
+                 probe_interval_seconds: float = settings.RERANK_PROBE_INTERVAL_SECONDS):
+        # sentence_transformers(torch)는 로드가 느리므로 reranker를 사용할 때만 import
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, device="cpu", max_length=settings.RERANK_MAX_LENGTH)
+        self.cache_size = cache_size
+        self.latency_budget_seconds = latency_budget_ms / 1000
+        self.max_concurrent = max(1, max_concurrent)
+        # (질문, 청크 ID) -> 점수
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._in_flight = 0
+        # 쌍 1개당 평균 채점 시간 (지수 이동 평균, 첫 측정 전에는 예산 검사를 하지 않음)
+        self._seconds_per_pair = 0.0
+        # 예산 초과 시 다시 측정하는 조건
+        self.probe_after_skips = max(1, probe_after_skips)
+        self.probe_interval_seconds = probe_interval_seconds
+        self._budget_skips_in_row = 0
+        self._last_measured_at = time.monotonic()
+        self._probing = False
+
+        # 지표
+        self._stats_lock = threading.Lock()
+        self._reranked = 0
+        self._skipped_load = 0
+        self._skipped_budget = 0
+        self._cache_hits = 0
+        self._pairs_scored = 0
+        self._total_seconds = 0.0
+        self._probes = 0
+        self._warm_up()
+        logger.info(f"Cross-encoder reranker 로드 완료: '{model_name}' (지연 시간 예산: {latency_budget_ms}ms)")
+
+    # 첫 forward(가중치 페이지 인, 스레드 풀 생성 등)는 느리므로 로드 직후 한 번 실행하고 예상 시간 측정에서 제외
+    def _warm_up(self):
+        try:
+            pairs = [("청년 정책", "청년 월세 지원 정책 신청 자격과 방법")] * max(2, settings.RERANK_CANDIDATE_K)
+            self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        except Exception as e:
+            logger.warning(f"Cross-encoder warm-up 실패: {e}")
+
+    def _cached_scores(self, question: str, ids: List[str]) -> Dict[str, float]:
+        scores = {}
+        with self._cache_lock:
+            for doc_id in ids:
+                key = (question, doc_id)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[doc_id] = self._cache[key]
+        return scores
+
+    def _store_scores(self, question: str, scores: Dict[str, float]):
+        with self._cache_lock:
+            for doc_id, score in scores.items():
+                self._cache[(question, doc_id)] = score
+                self._cache.move_to_end((question, doc_id))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # 후보 청크를 cross-encoder 점수 순으로 정렬해서 반환 (건너뛴 경우 원래 순서 그대로)
+    def rerank(self, question: str, docs: List[Document]) -> List[Document]:
+        if len(docs) <= 1:
+            return docs
+        ids = [get_chunk_id(doc) for doc in docs]
+        scores = self._cached_scores(question, ids)
+        missing = [(doc_id, doc) for doc_id, doc in zip(ids, docs) if doc_id not in scores]
+
+        if missing:
+            with self._stats_lock:
+                if self._in_flight >= self.max_concurrent:
+                    self._skipped_load += 1
+                    logger.debug(f"동시 rerank 요청이 많아 rerank를 건너뜁니다. (처리 중: {self._in_flight})")
+                    return docs
+                probing = False
+                if self._seconds_per_pair and self._seconds_per_pair * len(missing) > self.latency_budget_seconds:
+                    # 예상 시간이 오래된 측정값일 수 있으므로 가끔 한 요청만 실제로 rerank해서 다시 측정
+                    due = self._budget_skips_in_row >= self.probe_after_skips or \
+                        time.monotonic() - self._last_measured_at >= self.probe_interval_seconds
+                    if self._probing or not due:
+                        self._skipped_budget += 1
+                        self._budget_skips_in_row += 1
+                        logger.debug(f"예상 rerank 시간이 예산을 넘어 건너뜁니다. (후보 {len(missing)}개)")
+                        return docs
+                    probing = self._probing = True
+                    self._probes += 1
+                self._in_flight += 1
+
+            start = time.perf_counter()
+            try:
+                # 후보 전체를 한 번의 배치 forward로 채점
+                pairs = [(question, doc.page_content) for _, doc in missing]
+                predicted = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            except Exception as e:
+                logger.error(f"Rerank 중 오류 발생, 검색 순서를 그대로 사용합니다: {e}", exc_info=True)
+                return docs
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._stats_lock:
+                    self._in_flight -= 1
+                    if probing:
+                        self._probing = False
+
+            new_scores = {doc_id: float(score) for (doc_id, _), score in zip(missing, predicted)}
+            self._store_scores(question, new_scores)
+            scores.update(new_scores)
+            with self._stats_lock:
+                per_pair = elapsed / len(missing)
+                # 다시 측정한 값은 이전 추정치를 대체 (지연이 회복됐으면 바로 rerank 재개)
+                if probing or not self._seconds_per_pair:
+                    self._seconds_per_pair = per_pair
+                else:
+                    self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * per_pair
+                self._budget_skips_in_row = 0
+                self._last_measured_at = time.monotonic()
+                self._pairs_scored += len(missing)
+                self._total_seconds += elapsed
+
+        with self._stats_lock:
+            self._reranked += 1
+            self._cache_hits += len(docs) - len(missing)
+        order = sorted(range(len(docs)), key=lambda i: scores[ids[i]], reverse=True)
+        return [docs[i] for i in order]
+
+    # 누적 지표 반환
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "reranked": self._reranked,
+                "skipped_load": self._skipped_load,
+                "skipped_budget": self._skipped_budget,
+                "probes": self._probes,
+                "estimated_ms_per_pair": round(self._seconds_per_pair * 1000, 3),
+                "cache_hits": self._cache_hits,
+                "pairs_scored": self._pairs_scored,
+                "avg_ms_per_pair": round(self._total_seconds / self._pairs_scored * 1000, 3) if self._pairs_scored else 0,
+                "in_flight": self._in_flight,
+            }
@@ -0,0 +1,176 @@
+# vector_benchmark.py
+"""
+벡터 저장소 백엔드별 검색 지연 시간과 근사 검색 재현율을 비교합니다.
+
+기본은 임베딩 모델 없이 정규화된 임의 벡터(KURE-v1과 같은 1024차원)로 저장소를 만들고,
+--corpus를 지정하면 policy_directory의 실제 청크와 예시 질문을 임베딩해서 사용합니다.
+같은 질문 벡터로 top-k 검색을 반복해서 p50/p95 지연 시간을 측정합니다.
+
+- mmap-exact : MmapVectorStore float32 전체 벡터 정확 검색 (재현율 기준)
+- mmap-float16 / mmap-int8 : 저장 정밀도별 검색 (+rescore : 상위 후보 float32 재채점)
+- mmap-ivf : MmapVectorStore IVF 근사 검색
+- chroma : chromadb가 설치되어 있으면 같은 벡터로 비교
+
+python vector_benchmark.py --count 300000 --dim 1024 --queries 200
+python vector_benchmark.py --corpus 5000 --k 3   # 정책 코퍼스 기준 recall@k 보고
+"""
+import os
+import time
+import argparse
+import tempfile
+import statistics
+from typing import List, Dict, Any, Callable, Tuple
+
+import numpy as np
+
+from vector_store import MmapVectorStore, VECTORS_FILE, FULL_VECTORS_FILE, INDEX_FILE
+
+
+# 정규화된 임의 벡터 생성 (군집 구조를 흉내 내기 위해 중심점 주변에 분포)
+def make_vectors(count: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# 정책 코퍼스 청크와 예시 질문을 임베딩 모델로 벡터화
+def make_corpus_vectors(max_chunks: int) -> Tuple[np.ndarray, np.ndarray]:
+    from embedding_benchmark import load_corpus_chunks, DEFAULT_QUERIES
+    from rag_utils import get_embedding_model
+
+    chunks = load_corpus_chunks(max_chunks)
+    embeddings = get_embedding_model(use_server=False)
+    vectors = np.array(embeddings.embed_documents(chunks), dtype=np.float32)
+    queries = np.array(embeddings.embed_documents(DEFAULT_QUERIES), dtype=np.float32)
+    return vectors, queries
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+# search(질문 벡터) -> 행 ID 리스트 함수를 반복 실행하면서 지연 시간 측정
+def time_search(search: Callable[[np.ndarray], List[str]], queries: np.ndarray) -> Dict[str, Any]:
+    search(queries[0]) # 워밍업 (페이지 캐시 적재)
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "results": results,
+    }
+
+
+def recall_against(reference: List[List[str]], results: List[List[str]]) -> float:
+    hits = sum(len(set(r) & set(ref)) for r, ref in zip(results, reference))
+    return round(hits / max(1, sum(len(ref) for ref in reference)), 4)
+
+
+def _build_mmap_store(directory: str, vectors: np.ndarray, **store_kwargs) -> MmapVectorStore:
+    store = MmapVectorStore(persist_directory=directory, **store_kwargs)
+    ids = [f"doc#{i}" for i in range(len(vectors))]
+    store.add_vectors(vectors, texts=[""] * len(vectors), metadatas=[{"relative_path": "bench"}] * len(vectors), ids=ids)
+    store.persist()
+    return store
+
+
+# 검색에 쓰이는 벡터 파일 크기 (MB)
+# 디스크의 벡터 파일 크기 (재채점용 float32 원본이 있으면 포함)
+def _vectors_file_mb(store: MmapVectorStore) -> float:
+    import json
+    with open(os.path.join(store._persist_directory, INDEX_FILE), "r", encoding="utf-8") as f:
+        generation = json.load(f)["generation"]
+    total = 0
+    for filename in (VECTORS_FILE, FULL_VECTORS_FILE):
+        path = os.path.join(store._persist_directory, generation, filename)
+        if os.path.isfile(path):
+            total += os.path.getsize(path)
+    return round(total / 1024 / 1024, 1)
+
+
+def _mmap_search_fn(store: MmapVectorStore, k: int) -> Callable[[np.ndarray], List[str]]:
+    return lambda q: [d.id for d in store.similarity_search_by_vector(q, k=k)]
+
+
+def _chroma_search_fn(directory: str, vectors: np.ndarray, k: int) -> Callable[[np.ndarray], List[str]] | None:
+    try:
+        import chromadb
+    except ImportError:
+        print("chromadb가 설치되어 있지 않아 chroma 비교를 건너뜁니다.")
+        return None
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for start in range(0, len(vectors), 5000):
+        batch = vectors[start:start + 5000]
+        collection.add(ids=[f"doc#{i}" for i in range(start, start + len(batch))], embeddings=batch.tolist())
+    return lambda q: collection.query(query_embeddings=[q.tolist()], n_results=k)["ids"][0]
+
+
+def run_benchmark(vectors: np.ndarray, queries: np.ndarray, k: int,
+                  dtypes: List[str], with_ivf: bool, with_chroma: bool) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exact_store = _build_mmap_store(f"{tmp}/exact", vectors, ann_mode="none", storage_dtype="float32")
+        exact = time_search(_mmap_search_fn(exact_store, k), queries)
+        rows.append({"backend": "mmap-exact", **exact, "recall": 1.0, "vectors_mb": _vectors_file_mb(exact_store)})
+
+        for dtype in dtypes:
+            if dtype == "float32":
+                continue
+            for rescore in (False, True):
+                store = _build_mmap_store(f"{tmp}/{dtype}-{rescore}", vectors, ann_mode="none",
+                                          storage_dtype=dtype, rescore_float32=rescore)
+                result = time_search(_mmap_search_fn(store, k), queries)
+                rows.append({"backend": f"mmap-{dtype}" + ("+rescore" if rescore else ""), **result,
+                             "recall": recall_against(exact["results"], result["results"]),
+                             "vectors_mb": _vectors_file_mb(store)})
+
+        if with_ivf:
+            ivf_store = _build_mmap_store(f"{tmp}/ivf", vectors, ann_mode="ivf", storage_dtype="float32")
+            if ivf_store._snapshot.ivf is None:
+                print("청크 수가 VECTOR_ANN_MIN_COUNT 미만이라 IVF 인덱스가 생성되지 않았습니다.")
+            else:
+                ivf = time_search(_mmap_search_fn(ivf_store, k), queries)
+                rows.append({"backend": f"mmap-ivf(nprobe={ivf_store.ivf_nprobe})", **ivf,
+                             "recall": recall_against(exact["results"], ivf["results"]),
+                             "vectors_mb": _vectors_file_mb(ivf_store)})
+
+        if with_chroma:
+            search = _chroma_search_fn(f"{tmp}/chroma", vectors, k)
+            if search is not None:
+                chroma = time_search(search, queries)
+                rows.append({"backend": "chroma", **chroma, "recall": recall_against(exact["results"], chroma["results"]),
+                             "vectors_mb": None})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벡터 저장소 검색 지연 시간 비교")
+    parser.add_argument("--count", type=int, default=100000, help="임의 벡터 수")
+    parser.add_argument("--dim", type=int, default=1024, help="임의 벡터 차원")
+    parser.add_argument("--queries", type=int, default=200, help="임의 질문 벡터 수")
+    parser.add_argument("--corpus", type=int, default=0, help="0보다 크면 정책 코퍼스 청크를 최대 이 개수만큼 임베딩해서 사용")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--dtypes", default="float32,float16,int8", help="비교할 저장 형식 (쉼표 구분)")
+    parser.add_argument("--no-ivf", action="store_true", help="IVF 근사 검색 측정 생략")
+    parser.add_argument("--chroma", action="store_true", help="chromadb로도 같은 측정 수행")
+    args = parser.parse_args()
+
+    if args.corpus > 0:
+        vectors, queries = make_corpus_vectors(args.corpus)
+        print(f"정책 코퍼스 청크 {len(vectors)}개 x {vectors.shape[1]}차원, 질문 {len(queries)}개, top-{args.k}")
+    else:
+        vectors, queries = make_vectors(args.count, args.dim), make_vectors(args.queries, args.dim, seed=1)
+        print(f"임의 벡터 {args.count}개 x {args.dim}차원, 질문 {args.queries}개, top-{args.k}")
+
+    rows = run_benchmark(vectors, queries, args.k, args.dtypes.split(","), not args.no_ivf, args.chroma)
+    for row in rows:
+        size = f"{row['vectors_mb']:>8.1f}MB" if row["vectors_mb"] is not None else "       -  "
+        print(f"{row['backend']:<24} p50 {row['p50_ms']:>8.3f}ms  p95 {row['p95_ms']:>8.3f}ms  "
+              f"recall@{args.k} {row['recall']:.4f}  vectors {size}")
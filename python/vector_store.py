@@ -0,0 +1,654 @@
+# vector_store.py
+"""
+Chroma 대신 사용할 수 있는 프로세스 내부(in-process) 벡터 저장소를 제공합니다.
+
+수십만 개 청크 규모에서는 Chroma의 직렬화, SQLite, 호출당 오버헤드가 검색 시간의 대부분을 차지합니다.
+MmapVectorStore는 정규화된 float 벡터를 .npy 파일에 저장하고 memory-map으로 열어서
+NumPy 행렬 곱 한 번으로 top-k를 계산합니다.
+
+- 벡터 : vectors.npy (memory-map, 여러 워커 프로세스가 OS 페이지 캐시를 공유)
+- 청크 본문 : texts.bin + text_offsets.npy (memory-map, 필요한 청크만 읽음)
+- 메타데이터 : records.jsonl (청크 ID, 메타데이터 사이드카 테이블)
+- 선택 : IVF 근사 검색 (VECTOR_ANN_MODE="ivf", 대규모 코퍼스용)
+- 선택 : float16 / int8 저장 (VECTOR_STORAGE_DTYPE)
+  상위 후보만 float32로 재채점 (VECTOR_RESCORE_FLOAT32, 기본 꺼짐 : float32 원본을 추가로 저장하므로 디스크 사용량이 늘어남)
+
+저장은 세대(generation) 디렉토리 단위로 이루어집니다.
+persist() 시 새 세대 디렉토리에 모든 파일을 쓴 뒤 index.json을 원자적으로 교체하므로,
+다른 프로세스는 항상 완성된 세대만 읽게 됩니다.
+
+RAGPipeline은 Chroma와 MmapVectorStore를 같은 방식으로 사용합니다. (VectorStoreBackend 참고)
+"""
+import os
+import json
+import time
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Sequence, Tuple, Protocol
+# 로거
+import logging
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 저장 파일 이름
+INDEX_FILE = "index.json"
+VECTORS_FILE = "vectors.npy"
+VECTOR_SCALES_FILE = "vector_scales.npy" # int8 저장 시 차원별 역양자화 배율
+FULL_VECTORS_FILE = "vectors_f32.npy" # 재채점용 float32 원본 (VECTOR_RESCORE_FLOAT32 사용 시)
+TEXTS_FILE = "texts.bin"
+TEXT_OFFSETS_FILE = "text_offsets.npy"
+RECORDS_FILE = "records.jsonl"
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_ORDER_FILE = "ivf_order.npy"
+IVF_OFFSETS_FILE = "ivf_offsets.npy"
+
+# where 필터의 범위 조건 연산자
+_RANGE_OPERATORS = {
+    "$gt": lambda value, bound: value > bound,
+    "$gte": lambda value, bound: value >= bound,
+    "$lt": lambda value, bound: value < bound,
+    "$lte": lambda value, bound: value <= bound,
+}
+
+# 지원하는 벡터 저장 형식
+STORAGE_DTYPES = ("float32", "float16", "int8")
+# float16/int8 벡터를 float32로 변환하며 채점할 때 한 번에 변환하는 행 수
+# 변환 버퍼가 CPU 캐시 안에 머무르도록 작게 유지 (1024차원 기준 1MB)
+_SCORE_BLOCK_ROWS = 256
+
+
+class VectorStoreBackend(Protocol):
+    """
+    RAGPipeline이 벡터 저장소에 요구하는 기능.
+    langchain_community의 Chroma와 MmapVectorStore 모두 이 형태를 만족합니다.
+    """
+    def add_documents(self, documents: List[Document], **kwargs: Any) -> List[str]: ...
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]: ...
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, Any]: ...
+    def persist(self) -> None: ...
+    def as_retriever(self, **kwargs: Any): ...
+
+
+# memory-map된 바이트 배열에서 필요한 청크 본문만 디코딩해서 돌려주는 읽기 전용 리스트
+class _TextColumn(Sequence):
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._data[start:end]).decode("utf-8")
+
+
+@dataclass
+class _IvfIndex:
+    """IVF(Inverted File) 근사 검색 인덱스: 벡터를 nlist개 군집으로 나누고, 가까운 군집만 검색"""
+    centroids: np.ndarray # (nlist, dim)
+    order: np.ndarray # 군집 순서로 정렬된 행 번호
+    offsets: np.ndarray # 군집 i의 행 번호 = order[offsets[i]:offsets[i + 1]]
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+
+# 구면 k-means로 IVF 인덱스 학습 (정규화된 벡터 전용)
+def train_ivf_index(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 42) -> _IvfIndex:
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    nlist = max(1, min(nlist, n))
+    # 군집당 최대 256개 샘플로 중심점 학습
+    sample = vectors[rng.choice(n, size=min(n, nlist * 256), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        assign = _assign_to_centroids(sample, centroids)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                center = members.sum(axis=0)
+                centroids[c] = center / max(np.linalg.norm(center), 1e-12)
+
+    assign = _assign_to_centroids(vectors, centroids)
+    order = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+    return _IvfIndex(centroids=centroids, order=order, offsets=offsets)
+
+
+# 각 벡터를 가장 가까운 중심점에 배정 (메모리 사용량을 제한하기 위해 나눠서 계산)
+def _assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        assign[start:start + block] = np.argmax(np.asarray(vectors[start:start + block]) @ centroids.T, axis=1)
+    return assign
+
+
+# 정규화된 float32 벡터를 저장 형식으로 변환
+# int8 : 차원별 최대 절댓값을 127에 대응시키는 대칭 스칼라 양자화 (배율 배열을 함께 반환)
+def quantize_vectors(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    if dtype == "float32":
+        return np.ascontiguousarray(vectors, dtype=np.float32), None
+    if dtype == "float16":
+        return np.ascontiguousarray(vectors, dtype=np.float16), None
+    if dtype == "int8":
+        if len(vectors) == 0:
+            return np.empty(vectors.shape, dtype=np.int8), np.ones(vectors.shape[1:], dtype=np.float32)
+        scales = np.abs(vectors).max(axis=0).astype(np.float32) / 127.0
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        quantized = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+        return quantized, scales
+    raise ValueError(f"지원하지 않는 벡터 저장 형식입니다: '{dtype}' ({' | '.join(STORAGE_DTYPES)})")
+
+
+@dataclass
+class _Snapshot:
+    """
+    특정 시점의 저장소 전체 상태. 검색은 스냅샷 참조를 한 번 잡고 수행하므로,
+    검색 도중 쓰기 작업이 새 스냅샷으로 교체해도 검색 결과는 일관됩니다.
+    """
+    ids: List[str]
+    metadatas: List[Dict[str, Any]]
+    texts: Sequence[str]
+    vectors: np.ndarray # (n, dim), 정규화된 벡터 (float32 | float16 | int8)
+    ivf: Optional[_IvfIndex] = None
+    scales: Optional[np.ndarray] = None # int8 저장 시 차원별 역양자화 배율
+    full_vectors: Optional[np.ndarray] = None # 재채점용 float32 원본 (없으면 재채점하지 않음)
+    id_to_row: Dict[str, int] = field(init=False)
+    # 메타데이터 키 -> {값 -> 행 번호 배열} (필터 검색 시 처음 사용할 때 생성)
+    _value_index: Dict[str, Dict[Any, np.ndarray]] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # 지정한 행(없으면 전체)의 벡터를 float32로 반환 (int8은 역양자화)
+    def float_vectors(self, rows=None) -> np.ndarray:
+        source = self.full_vectors if self.full_vectors is not None else self.vectors
+        selected = np.asarray(source if rows is None else source[rows])
+        if self.scales is not None and source is self.vectors:
+            return selected.astype(np.float32) * self.scales
+        return selected.astype(np.float32, copy=False)
+
+    # 질문 벡터와의 내적 계산. float16/int8은 블록 단위로 float32 변환 후 계산
+    # (NumPy는 float16/int8 행렬 곱에 BLAS를 쓰지 못함)
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if vectors.dtype == np.float32:
+            return vectors @ query
+        # int8 : (Q * scales) @ q == Q @ (scales * q)
+        query = query * self.scales if self.scales is not None else query
+        scores = np.empty(len(vectors), dtype=np.float32)
+        buffer = np.empty((_SCORE_BLOCK_ROWS, vectors.shape[1]), dtype=np.float32)
+        for start in range(0, len(vectors), _SCORE_BLOCK_ROWS):
+            block = vectors[start:start + _SCORE_BLOCK_ROWS]
+            converted = buffer[:len(block)]
+            converted[...] = block
+            scores[start:start + len(block)] = converted @ query
+        return scores
+
+    def _rows_by_value(self, key: str) -> Dict[Any, np.ndarray]:
+        index = self._value_index.get(key)
+        if index is None:
+            grouped: Dict[Any, List[int]] = {}
+            for row, metadata in enumerate(self.metadatas):
+                if key in metadata:
+                    grouped.setdefault(metadata[key], []).append(row)
+            index = {value: np.array(rows, dtype=np.int64) for value, rows in grouped.items()}
+            self._value_index[key] = index
+        return index
+
+    def _rows_for_condition(self, key: str, condition: Any) -> np.ndarray:
+        index = self._rows_by_value(key)
+        if isinstance(condition, dict) and set(condition) & _RANGE_OPERATORS.keys():
+            # 범위 조건: 값 종류별 행 배열 중 조건을 만족하는 값의 행만 모음
+            matched = [rows for value, rows in index.items()
+                       if isinstance(value, (int, float))
+                       and all(_RANGE_OPERATORS[op](value, bound) for op, bound in condition.items())]
+            return np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+        if isinstance(condition, dict):
+            if "$eq" in condition:
+                values, negate = [condition["$eq"]], False
+            elif "$in" in condition:
+                values, negate = list(condition["$in"]), False
+            elif "$ne" in condition:
+                values, negate = [condition["$ne"]], True
+            elif "$nin" in condition:
+                values, negate = list(condition["$nin"]), True
+            else:
+                raise ValueError(f"지원하지 않는 필터 조건입니다: {condition}")
+        else:
+            values, negate = [condition], False
+
+        matched = [index[v] for v in values if v in index]
+        rows = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+        if negate:
+            rows = np.setdiff1d(np.arange(len(self), dtype=np.int64), rows, assume_unique=True)
+        return rows
+
+    # Chroma의 where 필터 형식({"key": 값}, {"key": {"$in": [...]}}, {"key": {"$gte": 값}}, {"$and": [...]}, {"$or": [...]})을 행 번호 배열로 변환
+    def rows_matching(self, where: Dict[str, Any]) -> np.ndarray:
+        row_sets = []
+        for key, condition in where.items():
+            if key == "$and":
+                row_sets.append(_intersect_all([self.rows_matching(sub) for sub in condition], len(self)))
+            elif key == "$or":
+                parts = [self.rows_matching(sub) for sub in condition]
+                row_sets.append(np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64))
+            else:
+                row_sets.append(self._rows_for_condition(key, condition))
+        return _intersect_all(row_sets, len(self))
+
+
+def _intersect_all(row_sets: List[np.ndarray], total: int) -> np.ndarray:
+    if not row_sets:
+        return np.arange(total, dtype=np.int64)
+    rows = row_sets[0]
+    for other in row_sets[1:]:
+        rows = np.intersect1d(rows, other, assume_unique=True)
+    return rows
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def _empty_snapshot() -> _Snapshot:
+    return _Snapshot(ids=[], metadatas=[], texts=[], vectors=np.empty((0, 0), dtype=np.float32))
+
+
+class MmapVectorStore(VectorStore):
+    """
+    memory-map 기반 프로세스 내부 벡터 저장소 (LangChain VectorStore 구현).
+    쓰기(add/delete)는 대기 목록에만 쌓아두고, persist() 또는 쓰기 후 첫 조회에서 한 번에 합쳐 새 스냅샷으로 교체하며,
+    persist() 시 디스크에 새 세대로 저장합니다.
+    (쓰기마다 전체 스냅샷을 다시 만들면 묶음 색인이 청크 수의 제곱에 비례해서 느려지고, 전체 벡터를 float32로 메모리에 들고 있게 됨)
+    """
+    def __init__(self,
+                 persist_directory: str | Path = settings.VECTORSTORE_PATH,
+                 embedding_function: Optional[Embeddings] = None,
+                 ann_mode: str = settings.VECTOR_ANN_MODE,
+                 ivf_nprobe: int = settings.VECTOR_IVF_NPROBE,
+                 storage_dtype: str = settings.VECTOR_STORAGE_DTYPE,
+                 rescore_float32: bool = settings.VECTOR_RESCORE_FLOAT32):
+        if storage_dtype not in STORAGE_DTYPES:
+            raise ValueError(f"지원하지 않는 벡터 저장 형식입니다: '{storage_dtype}' ({' | '.join(STORAGE_DTYPES)})")
+        self._persist_directory = Path(persist_directory)
+        self._embedding_function = embedding_function
+        self.ann_mode = ann_mode
+        self.ivf_nprobe = ivf_nprobe
+        self.storage_dtype = storage_dtype
+        self.rescore_float32 = rescore_float32
+        # 쓰기 작업끼리만 잠금 (검색은 잠금 없이 현재 스냅샷을 사용)
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._snapshot: _Snapshot = self._load() or _empty_snapshot()
+        # 아직 스냅샷에 합치지 않은 쓰기
+        # _pending_batches : 추가 묶음 (ids, metadatas, texts, vectors) - 벡터는 _pending_dtype으로 보관
+        # _pending_rows : 최종 순서대로 청크 ID -> (묶음 번호, 묶음 안의 행) (같은 ID를 다시 추가하면 맨 뒤로 이동)
+        # _pending_removed : 현재 스냅샷에서 삭제(또는 교체)된 청크 ID
+        self._pending_batches: List[Tuple[List[str], List[Dict[str, Any]], List[str], np.ndarray]] = []
+        self._pending_rows: Dict[str, Tuple[int, int]] = {}
+        self._pending_removed: set = set()
+        # float16/int8 저장이면 대기 중인 벡터도 float16으로 보관 (float32 재채점 원본이 필요할 때만 float32)
+        self._pending_dtype = np.float32 if storage_dtype == "float32" or rescore_float32 else np.float16
+        logger.info(f"Mmap 벡터 저장소 로드 완료 ('{self._persist_directory}', 청크 {len(self._snapshot)}개, "
+                    f"저장 형식: {self._snapshot.vectors.dtype}, ANN: {self.ann_mode})")
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+
+    def count(self) -> int:
+        with self._write_lock:
+            return len(self._snapshot) - len(self._pending_removed) + len(self._pending_rows)
+
+    # --- 디스크 입출력 ---
+
+    def _read_index_file(self) -> Optional[Dict[str, Any]]:
+        index_path = self._persist_directory / INDEX_FILE
+        if not index_path.is_file():
+            return None
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load(self) -> Optional[_Snapshot]:
+        index = self._read_index_file()
+        if not index:
+            return None
+        generation_dir = self._persist_directory / index["generation"]
+
+        ids: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        with open(generation_dir / RECORDS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                metadatas.append(record["metadata"])
+
+        # mmap_mode="r" : 파일을 메모리에 복사하지 않고 페이지 캐시를 통해 필요한 부분만 읽음
+        vectors = np.load(generation_dir / VECTORS_FILE, mmap_mode="r")
+        offsets = np.load(generation_dir / TEXT_OFFSETS_FILE, mmap_mode="r")
+        text_data = np.memmap(generation_dir / TEXTS_FILE, dtype=np.uint8, mode="r") \
+            if offsets[-1] > 0 else np.empty(0, dtype=np.uint8)
+
+        scales = np.load(generation_dir / VECTOR_SCALES_FILE) if (generation_dir / VECTOR_SCALES_FILE).is_file() else None
+        full_vectors = None
+        if (generation_dir / FULL_VECTORS_FILE).is_file():
+            full_vectors = np.load(generation_dir / FULL_VECTORS_FILE, mmap_mode="r")
+
+        ivf = None
+        if (generation_dir / IVF_CENTROIDS_FILE).is_file():
+            ivf = _IvfIndex(
+                centroids=np.load(generation_dir / IVF_CENTROIDS_FILE),
+                order=np.load(generation_dir / IVF_ORDER_FILE, mmap_mode="r"),
+                offsets=np.load(generation_dir / IVF_OFFSETS_FILE),
+            )
+        return _Snapshot(ids=ids, metadatas=metadatas, texts=_TextColumn(text_data, offsets), vectors=vectors, ivf=ivf,
+                         scales=scales, full_vectors=full_vectors)
+
+    # 현재 스냅샷을 새 세대 디렉토리에 저장하고 index.json을 원자적으로 교체
+    def persist(self) -> None:
+        with self._write_lock:
+            if not self._dirty and self._read_index_file() is not None:
+                return
+            self._merge_pending()
+            snapshot = self._snapshot
+            self._persist_directory.mkdir(parents=True, exist_ok=True)
+            generation = f"g{time.time_ns()}"
+            generation_dir = self._persist_directory / generation
+            generation_dir.mkdir()
+
+            float_vectors = snapshot.float_vectors() if len(snapshot) else np.empty((0, 0), dtype=np.float32)
+            stored_vectors, scales = quantize_vectors(float_vectors, self.storage_dtype)
+            np.save(generation_dir / VECTORS_FILE, stored_vectors)
+            if scales is not None:
+                np.save(generation_dir / VECTOR_SCALES_FILE, scales)
+            # 재채점용 float32 원본: 상위 후보 행만 읽으므로 페이지 캐시에는 거의 올라오지 않음
+            if self.storage_dtype != "float32" and self.rescore_float32:
+                np.save(generation_dir / FULL_VECTORS_FILE, float_vectors)
+
+            offsets = np.zeros(len(snapshot) + 1, dtype=np.int64)
+            with open(generation_dir / TEXTS_FILE, "wb") as f:
+                for row in range(len(snapshot)):
+                    encoded = snapshot.texts[row].encode("utf-8")
+                    f.write(encoded)
+                    offsets[row + 1] = offsets[row] + len(encoded)
+            np.save(generation_dir / TEXT_OFFSETS_FILE, offsets)
+
+            with open(generation_dir / RECORDS_FILE, "w", encoding="utf-8") as f:
+                for doc_id, metadata in zip(snapshot.ids, snapshot.metadatas):
+                    f.write(json.dumps({"id": doc_id, "metadata": metadata}, ensure_ascii=False) + "\n")
+
+            ann = "none"
+            if self.ann_mode == "ivf" and len(snapshot) >= settings.VECTOR_ANN_MIN_COUNT:
+                # nlist를 지정하지 않았으면 sqrt(n)의 4배 (일반적인 IVF 권장 범위)
+                nlist = settings.VECTOR_IVF_NLIST or int(4 * np.sqrt(len(snapshot)))
+                ivf = train_ivf_index(float_vectors, nlist)
+                np.save(generation_dir / IVF_CENTROIDS_FILE, ivf.centroids)
+                np.save(generation_dir / IVF_ORDER_FILE, ivf.order)
+                np.save(generation_dir / IVF_OFFSETS_FILE, ivf.offsets)
+                ann = f"ivf(nlist={nlist})"
+
+            index = {
+                "generation": generation,
+                "count": len(snapshot),
+                "dim": int(snapshot.vectors.shape[1]) if snapshot.vectors.ndim == 2 else 0,
+                "dtype": self.storage_dtype,
+                "rescore_float32": self.storage_dtype != "float32" and self.rescore_float32,
+                "ann": ann,
+            }
+            tmp_index_path = self._persist_directory / f"{INDEX_FILE}.tmp"
+            with open(tmp_index_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=4, ensure_ascii=False)
+            # os.replace는 같은 파일 시스템 안에서 원자적으로 동작
+            os.replace(tmp_index_path, self._persist_directory / INDEX_FILE)
+
+            # 이전 세대 정리 (다른 프로세스가 열어둔 mmap은 POSIX에서 계속 유효, Windows에서는 삭제 실패 시 무시)
+            for child in self._persist_directory.iterdir():
+                if child.is_dir() and child.name.startswith("g") and child.name != generation:
+                    shutil.rmtree(child, ignore_errors=True)
+
+            # 저장한 파일을 다시 memory-map으로 열어서 프로세스 간 페이지 공유
+            self._snapshot = self._load() or _empty_snapshot()
+            self._dirty = False
+            logger.info(f"Mmap 벡터 저장소 저장 완료 (세대: {generation}, 청크 {index['count']}개, 저장 형식: {self.storage_dtype}, ANN: {ann})")
+
+    # --- 쓰기 ---
+
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        if self._embedding_function is None:
+            raise ValueError("MmapVectorStore에 embedding_function이 설정되지 않았습니다.")
+        return _normalize(np.array(self._embedding_function.embed_documents(texts), dtype=np.float32))
+
+    def add_texts(self,
+                  texts: Iterable[str],
+                  metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None,
+                  **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self._embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    # 미리 계산된 벡터를 그대로 저장 (같은 ID가 있으면 교체)
+    def add_vectors(self,
+                    vectors: np.ndarray,
+                    texts: List[str],
+                    metadatas: Optional[List[dict]] = None,
+                    ids: Optional[List[str]] = None) -> List[str]:
+        import uuid
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = [dict(m or {}) for m in metadatas] if metadatas else [{} for _ in texts]
+        vectors = _normalize(vectors)
+
+        with self._write_lock:
+            batch = len(self._pending_batches)
+            self._pending_batches.append((ids, metadatas, list(texts), vectors.astype(self._pending_dtype, copy=False)))
+            for row, doc_id in enumerate(ids):
+                self._remove_locked(doc_id)
+                self._pending_rows[doc_id] = (batch, row)
+            self._dirty = True
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._write_lock:
+            removed = [self._remove_locked(doc_id) for doc_id in ids]
+            if not any(removed):
+                return False
+            self._dirty = True
+        return True
+
+    # 청크 ID를 대기 중인 추가 목록/현재 스냅샷에서 제거 표시 (_write_lock 안에서 호출) -> 제거한 청크가 있었는지
+    def _remove_locked(self, doc_id: str) -> bool:
+        if self._pending_rows.pop(doc_id, None) is not None:
+            removed = True
+        else:
+            removed = False
+        if doc_id in self._snapshot.id_to_row and doc_id not in self._pending_removed:
+            self._pending_removed.add(doc_id)
+            removed = True
+        return removed
+
+    # 대기 중인 쓰기를 현재 스냅샷과 한 번에 합쳐서 교체 (_write_lock 안에서 호출)
+    def _merge_pending(self):
+        if not self._pending_rows and not self._pending_removed:
+            return
+        snapshot = self._snapshot
+        keep_rows = np.array([row for row, doc_id in enumerate(snapshot.ids) if doc_id not in self._pending_removed],
+                             dtype=np.int64)
+        ids = [snapshot.ids[r] for r in keep_rows]
+        metadatas = [snapshot.metadatas[r] for r in keep_rows]
+        texts = [snapshot.texts[r] for r in keep_rows]
+        dim = (snapshot.vectors.shape[1] if snapshot.vectors.ndim == 2 and len(snapshot)
+               else (self._pending_batches[0][3].shape[1] if self._pending_batches else 0))
+        positions = np.array(list(self._pending_rows.values()), dtype=np.int64).reshape(-1, 2)
+        added = np.empty((len(positions), dim), dtype=np.float32)
+        for doc_id, (batch, row) in self._pending_rows.items():
+            _, batch_metadatas, batch_texts, _ = self._pending_batches[batch]
+            ids.append(doc_id)
+            metadatas.append(batch_metadatas[row])
+            texts.append(batch_texts[row])
+        # 벡터는 묶음 단위로 한 번에 복사
+        for batch, (_, _, _, batch_vectors) in enumerate(self._pending_batches):
+            targets = np.flatnonzero(positions[:, 0] == batch)
+            if len(targets):
+                added[targets] = batch_vectors[positions[targets, 1]]
+
+        scales, full_vectors = None, None
+        if self.storage_dtype == "int8":
+            # 차원별 배율이 전체 벡터에 따라 달라지므로 다시 양자화
+            vectors, scales = quantize_vectors(np.vstack([snapshot.float_vectors(keep_rows) if len(keep_rows)
+                                                          else np.empty((0, dim), dtype=np.float32), added]), "int8")
+        else:
+            dtype = np.float32 if self.storage_dtype == "float32" else np.float16
+            kept = np.asarray(snapshot.vectors[keep_rows]).astype(dtype) if len(keep_rows) else np.empty((0, dim), dtype=dtype)
+            vectors = np.vstack([kept, added.astype(dtype)])
+        if self.storage_dtype != "float32" and self.rescore_float32:
+            kept = snapshot.float_vectors(keep_rows) if len(keep_rows) else np.empty((0, dim), dtype=np.float32)
+            full_vectors = np.vstack([kept, added])
+
+        self._snapshot = _Snapshot(ids=ids, metadatas=metadatas, texts=texts, vectors=vectors,
+                                   scales=scales, full_vectors=full_vectors)
+        self._pending_batches, self._pending_rows, self._pending_removed = [], {}, set()
+
+    # 조회/검색에 사용할 스냅샷 (대기 중인 쓰기가 있으면 먼저 합침)
+    def _current_snapshot(self) -> _Snapshot:
+        if not self._pending_rows and not self._pending_removed:
+            return self._snapshot
+        with self._write_lock:
+            self._merge_pending()
+            return self._snapshot
+
+    # --- 조회 ---
+
+    def _document(self, snapshot: _Snapshot, row: int) -> Document:
+        return Document(page_content=snapshot.texts[row], metadata=dict(snapshot.metadatas[row]), id=snapshot.ids[row])
+
+    # Chroma.get과 같은 형식으로 반환: {"ids": [...], "documents": [...], "metadatas": [...], ("embeddings": [...])}
+    def get(self,
+            ids: Optional[List[str]] = None,
+            where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None,
+            include: Sequence[str] = ("documents", "metadatas"),
+            **kwargs: Any) -> Dict[str, Any]:
+        snapshot = self._current_snapshot()
+        if ids is not None:
+            rows = [snapshot.id_to_row[i] for i in ids if i in snapshot.id_to_row]
+        elif where:
+            rows = snapshot.rows_matching(where).tolist()
+        else:
+            rows = list(range(len(snapshot)))
+        if limit is not None:
+            rows = rows[:limit]
+
+        result: Dict[str, Any] = {"ids": [snapshot.ids[r] for r in rows]}
+        if "documents" in include:
+            result["documents"] = [snapshot.texts[r] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [dict(snapshot.metadatas[r]) for r in rows]
+        if "embeddings" in include:
+            result["embeddings"] = snapshot.float_vectors(rows) if rows else np.empty((0, 0), dtype=np.float32)
+        return result
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        snapshot = self._current_snapshot()
+        return [self._document(snapshot, snapshot.id_to_row[i]) for i in ids if i in snapshot.id_to_row]
+
+    # --- 검색 ---
+
+    # 질문 벡터와 내적(정규화 벡터이므로 코사인 유사도)이 큰 순서로 (행 번호, 점수) top-k 반환
+    def _search_rows(self, snapshot: _Snapshot, query_vector: np.ndarray, k: int,
+                     filter: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        if len(snapshot) == 0 or k <= 0:
+            return []
+        query = _normalize(query_vector)
+
+        candidate_rows: Optional[np.ndarray] = None
+        if filter:
+            # 메타데이터 사전 필터: 조건에 맞는 행만 검색 대상으로 삼음
+            candidate_rows = snapshot.rows_matching(filter)
+            if len(candidate_rows) == 0:
+                return []
+        elif snapshot.ivf is not None and self.ann_mode == "ivf":
+            candidate_rows = snapshot.ivf.candidates(query, self.ivf_nprobe)
+
+        scores = snapshot.score(query, candidate_rows)
+        if len(scores) == 0:
+            return []
+        if candidate_rows is None:
+            candidate_rows = np.arange(len(scores))
+
+        # 저장 정밀도가 낮으면 후보를 넉넉하게 뽑은 뒤 float32 원본으로 다시 채점
+        rescore = snapshot.full_vectors is not None and snapshot.vectors.dtype != np.float32
+        shortlist = min(len(scores), k * settings.VECTOR_RESCORE_FACTOR if rescore else k)
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        rows = candidate_rows[top]
+        if rescore:
+            order = np.argsort(rows) # mmap 파일을 순서대로 읽도록 정렬
+            rows = rows[order]
+            scores = np.asarray(snapshot.full_vectors[rows]) @ query
+        else:
+            scores = scores[top]
+
+        best = np.argsort(-scores)[:k]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        snapshot = self._current_snapshot()
+        rows = self._search_rows(snapshot, np.asarray(embedding, dtype=np.float32), k, filter)
+        return [(self._document(snapshot, row), score) for row, score in rows]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        if self._embedding_function is None:
+            raise ValueError("MmapVectorStore에 embedding_function이 설정되지 않았습니다.")
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4,
+                          filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    # 코사인 유사도(-1 ~ 1)를 LangChain 관련도 점수(0 ~ 1)로 변환
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls,
+                   texts: List[str],
+                   embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None,
+                   persist_directory: str | Path = settings.VECTORSTORE_PATH,
+                   **kwargs: Any) -> "MmapVectorStore":
+        store = cls(persist_directory=persist_directory, embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        store.persist()
+        return store
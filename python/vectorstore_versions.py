@@ -0,0 +1,400 @@
+# vectorstore_versions.py
+"""
+벡터 저장소(+ BM25 역색인)를 버전 디렉토리 단위로 관리합니다. (blue/green 전환)
+
+서버 시작 시 동기화, 서버 실행 중 재색인(RAGPipeline.reindex), 전체 재생성(force_create_db) 모두
+검색에 사용 중인 저장소를 직접 수정하거나 삭제하지 않고, <VECTORSTORE_PATH>_versions/v<시각>/에
+새 버전을 만든 뒤(증분은 현재 버전 복사 후 변경 반영, 전체 재생성은 빈 디렉토리에 생성)
+검증(validate_version)을 통과하면 CURRENT 포인터 파일을 원자적으로 교체해서 새 버전으로 전환합니다.
+
+- 검증 : 청크 수(예상 청크 수, BM25 역색인 청크 수, 이전 버전 대비 급감 여부)와
+  저장된 청크 본문으로 검색했을 때 해당 청크가 상위 SEARCH_K 안에 나오는 비율(smoke recall)
+- 검증에 실패한 버전은 전환하지 않고, 같은 코퍼스로는 데이터가 바뀌거나 강제 재색인할 때까지 다시 만들지 않음 (rejected.json)
+- 버전마다 version.json(manifest 해시, 청크 수, 검증 결과)과 files.json(파일별 해시)을 함께 저장하므로,
+  이전 버전으로 되돌리면(rollback_version) 증분 동기화 기준도 그 버전으로 돌아감
+- Chroma는 같은 경로의 클라이언트끼리 내부 상태를 공유하므로, 버전마다 다른 디렉토리를 사용해야
+  검색 중인 요청이 반쯤 수정된 저장소를 보지 않음
+- 이전 버전 디렉토리는 바로 삭제하지 않고 settings.VECTORSTORE_VERSIONS_KEEP개까지 보관
+  (교체 직전에 시작된 요청이 이전 버전으로 끝까지 검색)
+- 버전 디렉토리의 version.json에 코퍼스 manifest 해시를 기록해서, 여러 워커 중 한 워커가 만든 버전을
+  다른 워커는 다시 만들지 않고 로드 (버전 생성은 파일 잠금으로 한 프로세스만 실행)
+- CURRENT가 없으면 기존과 같이 VECTORSTORE_PATH / LEXICAL_INDEX_PATH를 그대로 사용
+- 버전마다 색인한 코퍼스의 정책 파일(policies.jsonl, policy_metadata.json)을 corpus/에 복사하고,
+  export_version은 그 코퍼스로 미리 생성한 답변(ANSWER_STORE_PATH/<manifest 해시>)도 함께 내보내므로
+  데이터 디렉토리가 없는 읽기 전용 노드도 항목 라우터/필터 분류 목록/미리 생성한 답변을 그대로 사용
+"""
+import os
+import json
+import time
+import random
+import shutil
+import tarfile
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+# 로거
+import logging
+
+from filelock import FileLock
+
+from config import settings
+from rag_utils import get_vectorstore_count
+from lexical_index import get_chunk_id
+from data_manager import scan_data_directory, calculate_manifest_hash, save_metadata
+from policy_metadata import POLICY_RECORDS_FILENAME, LEGACY_POLICY_SECTIONS_FILENAME, POLICY_METADATA_FILENAME
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER_FILENAME = "CURRENT"
+VERSION_INFO_FILENAME = "version.json"
+# 버전을 만들 때 사용한 데이터 파일별 해시 (data_files_metadata.json과 같은 형식)
+FILES_METADATA_FILENAME = "files.json"
+_REJECTED_FILENAME = "rejected.json"
+# 버전 디렉토리 안의 BM25 역색인 파일 (MmapVectorStore는 g로 시작하는 세대 디렉토리만 정리하므로 같은 디렉토리에 둠)
+LEXICAL_INDEX_FILENAME = "lexical_index.pkl"
+_LOCK_FILENAME = ".reindex.lock"
+# 버전 디렉토리 안의 정책 파일 복사본 디렉토리와 복사할 파일 (PolicyStore, IntentRouter, 필터 분류 목록이 읽는 파일)
+CORPUS_FILES_DIRNAME = "corpus"
+CORPUS_FILENAMES = (POLICY_RECORDS_FILENAME, LEGACY_POLICY_SECTIONS_FILENAME, POLICY_METADATA_FILENAME)
+# 내보낸 파일 안의 미리 생성한 답변 디렉토리 (import_version이 ANSWER_STORE_PATH로 옮김)
+_ANSWERS_DIRNAME = "answers"
+
+
+# 버전 디렉토리들의 상위 디렉토리 (<VECTORSTORE_PATH>_versions)
+def versions_root(base_path: Path) -> Path:
+    base_path = Path(base_path)
+    return base_path.parent / f"{base_path.name}_versions"
+
+
+# 현재 서비스할 저장소 디렉토리 (CURRENT가 가리키는 버전, 없으면 base_path)
+def active_vectorstore_path(base_path: Path) -> Path:
+    root = versions_root(base_path)
+    pointer = root / CURRENT_POINTER_FILENAME
+    if pointer.is_file():
+        version_path = root / pointer.read_text(encoding="utf-8").strip()
+        if version_path.is_dir():
+            return version_path
+        logger.warning(f"CURRENT가 가리키는 버전 디렉토리가 없어 기본 경로를 사용합니다: {version_path}")
+    return Path(base_path)
+
+
+# 저장소 디렉토리에 맞는 BM25 역색인 경로
+def lexical_index_path_for(store_path: Path, base_path: Path) -> Path:
+    if Path(store_path) == Path(base_path):
+        return Path(settings.LEXICAL_INDEX_PATH)
+    return Path(store_path) / LEXICAL_INDEX_FILENAME
+
+
+def read_version_info(store_path: Path) -> Dict[str, Any]:
+    info_path = Path(store_path) / VERSION_INFO_FILENAME
+    if not info_path.is_file():
+        return {}
+    try:
+        with open(info_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+# 버전을 만들 때 사용한 파일별 해시 (기본 경로처럼 기록이 없으면 None)
+def read_version_files(store_path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    files_path = Path(store_path) / FILES_METADATA_FILENAME
+    if not files_path.is_file():
+        return None
+    with open(files_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_version_info(version_path: Path, manifest_hash: str, chunk_count: int,
+                       files_metadata: Dict[str, Dict[str, Any]], validation: Dict[str, Any]):
+    info = {
+        "manifest_hash": manifest_hash,
+        "chunk_count": chunk_count,
+        "backend": settings.VECTORSTORE_BACKEND,
+        "embedding_model": settings.EMBEDDING_MODEL_NAME,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "validation": validation,
+    }
+    with open(Path(version_path) / FILES_METADATA_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(files_metadata, f, indent=4, ensure_ascii=False)
+    with open(Path(version_path) / VERSION_INFO_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=4, ensure_ascii=False)
+
+
+# 다른 노드에서 만든 버전을 현재 설정으로 읽을 수 있는지 확인 (벡터 저장소 백엔드, 임베딩 모델이 같아야 함)
+def check_version_compatible(store_path: Path):
+    info = read_version_info(store_path)
+    for key, expected in (("backend", settings.VECTORSTORE_BACKEND), ("embedding_model", settings.EMBEDDING_MODEL_NAME)):
+        if info.get(key) and info[key] != expected:
+            raise ValueError(f"벡터 저장소 버전 '{Path(store_path).name}'의 {key}({info[key]})가 현재 설정({expected})과 다릅니다.")
+
+
+# 색인한 데이터 디렉토리의 정책 파일을 버전 디렉토리의 corpus/에 복사 (기존 복사본은 교체)
+def copy_corpus_files(data_path: Path, version_path: Path):
+    target = Path(version_path) / CORPUS_FILES_DIRNAME
+    shutil.rmtree(target, ignore_errors=True)
+    target.mkdir(parents=True)
+    for filename in CORPUS_FILENAMES:
+        source = Path(data_path) / filename
+        if source.is_file():
+            shutil.copy2(source, target / filename)
+
+
+# 스냅샷이 정책 파일을 읽을 경로 (버전 디렉토리에 복사본이 있으면 그 경로, 없으면 데이터 디렉토리)
+def corpus_files_path(store_path: Path, data_path: Path) -> Path:
+    corpus_path = Path(store_path) / CORPUS_FILES_DIRNAME
+    return corpus_path if corpus_path.is_dir() else Path(data_path)
+
+
+# 새 버전 디렉토리 생성 (아직 CURRENT는 바꾸지 않음)
+# copy_active=True : 현재 버전(저장소 + BM25 역색인)을 복사해서 증분 반영 | False : 빈 디렉토리 (전체 재생성)
+def create_version_dir(base_path: Path, copy_active: bool = True) -> Path:
+    root = versions_root(base_path)
+    root.mkdir(parents=True, exist_ok=True)
+    active_path = active_vectorstore_path(base_path)
+    version_path = root / f"v{time.time_ns()}"
+    if copy_active and active_path.is_dir():
+        shutil.copytree(active_path, version_path,
+                        ignore=shutil.ignore_patterns(VERSION_INFO_FILENAME, FILES_METADATA_FILENAME))
+        lexical_path = lexical_index_path_for(active_path, base_path)
+        if lexical_path.is_file() and lexical_path.parent != active_path:
+            shutil.copy2(lexical_path, version_path / LEXICAL_INDEX_FILENAME)
+        logger.info(f"새 벡터 저장소 버전 디렉토리 생성: '{version_path}' (원본: '{active_path}')")
+    else:
+        version_path.mkdir()
+        logger.info(f"새 벡터 저장소 버전 디렉토리 생성: '{version_path}' (전체 재생성)")
+    return version_path
+
+
+# 전환 전 새 버전 검증 -> {"ok", "chunk_count", "expected_count", "previous_count", "smoke_recall", "errors", ...}
+# expected_count : 이전 청크 수 - 삭제한 청크 수 + 추가한 청크 수 (전체 재생성이면 분할한 청크 수)
+# previous_count : 현재 서비스 중인 버전의 청크 수 (없으면 0)
+def validate_version(vectorstore, lexical_index, expected_count: int, previous_count: int,
+                     sample_size: int = settings.VECTORSTORE_SMOKE_QUERIES,
+                     min_recall: float = settings.VECTORSTORE_SMOKE_MIN_RECALL,
+                     min_count_ratio: float = settings.VECTORSTORE_MIN_COUNT_RATIO,
+                     k: int = settings.SEARCH_K) -> Dict[str, Any]:
+    errors: List[str] = []
+    count = get_vectorstore_count(vectorstore)
+    if count != expected_count:
+        errors.append(f"청크 수 불일치: 저장소 {count}개, 예상 {expected_count}개")
+    if lexical_index is not None and len(lexical_index) != count:
+        errors.append(f"BM25 역색인 청크 수 불일치: 역색인 {len(lexical_index)}개, 저장소 {count}개")
+    if previous_count and count < previous_count * min_count_ratio:
+        errors.append(f"청크 수 급감: 이전 버전 {previous_count}개 -> {count}개 (허용 비율 {min_count_ratio})")
+
+    # 저장된 청크 본문을 그대로 질의로 사용해서 자기 자신이 상위 k개 안에 검색되는지 확인
+    recall = None
+    sampled_ids: List[str] = []
+    if count and sample_size > 0:
+        all_ids = vectorstore.get(include=[])["ids"]
+        sampled_ids = random.Random(count).sample(all_ids, min(sample_size, len(all_ids)))
+        stored = vectorstore.get(ids=sampled_ids, include=["documents"])
+        hits = 0
+        for chunk_id, text in zip(stored["ids"], stored["documents"]):
+            results = vectorstore.similarity_search(text, k=k)
+            if any(get_chunk_id(doc) == chunk_id for doc in results):
+                hits += 1
+        recall = round(hits / len(stored["ids"]), 4) if stored["ids"] else 0.0
+        if recall < min_recall:
+            errors.append(f"smoke 검색 recall 미달: {recall} < {min_recall} (질의 {len(stored['ids'])}개)")
+
+    result = {
+        "ok": not errors,
+        "chunk_count": count,
+        "expected_count": expected_count,
+        "previous_count": previous_count,
+        "smoke_queries": len(sampled_ids),
+        "smoke_recall": recall,
+        "errors": errors,
+    }
+    if errors:
+        logger.error(f"벡터 저장소 버전 검증 실패: {errors}")
+    else:
+        logger.info(f"벡터 저장소 버전 검증 통과 (청크 {count}개, smoke recall {recall})")
+    return result
+
+
+# CURRENT 포인터를 원자적으로 교체해서 version_path를 현재 버전으로 지정
+def promote_version(base_path: Path, version_path: Path):
+    root = versions_root(base_path)
+    tmp_pointer = root / f"{CURRENT_POINTER_FILENAME}.tmp"
+    tmp_pointer.write_text(Path(version_path).name, encoding="utf-8")
+    # os.replace는 같은 파일 시스템 안에서 원자적으로 동작
+    os.replace(tmp_pointer, root / CURRENT_POINTER_FILENAME)
+    logger.info(f"현재 벡터 저장소 버전 전환: '{Path(version_path).name}'")
+
+
+# 버전 디렉토리 목록 (오래된 순)
+def list_versions(base_path: Path) -> List[Path]:
+    root = versions_root(base_path)
+    if not root.is_dir():
+        return []
+    return sorted((p for p in root.iterdir() if p.is_dir() and p.name.startswith("v")), key=lambda p: p.name)
+
+
+# 현재 버전을 포함해 최근 keep개만 남기고 오래된 버전 디렉토리 삭제
+def prune_versions(base_path: Path, keep: int = settings.VECTORSTORE_VERSIONS_KEEP):
+    active_path = active_vectorstore_path(base_path)
+    versions = list_versions(base_path)
+    for version_path in versions[:max(0, len(versions) - max(1, keep))]:
+        if version_path != active_path:
+            shutil.rmtree(version_path, ignore_errors=True)
+            logger.info(f"오래된 벡터 저장소 버전 삭제: '{version_path.name}'")
+
+
+# 현재 버전 직전에 만들어진 완성된 버전 (되돌릴 대상, 없으면 None)
+def previous_version(base_path: Path) -> Optional[Path]:
+    active_path = active_vectorstore_path(base_path)
+    older = [p for p in list_versions(base_path) if p.name < active_path.name and (p / VERSION_INFO_FILENAME).is_file()] \
+        if active_path.parent == versions_root(base_path) else []
+    return older[-1] if older else None
+
+
+# 이전 버전(또는 target 이름의 버전)으로 CURRENT를 되돌림 -> 전환한 버전 디렉토리 (version_lock 안에서 호출)
+# 증분 동기화 기준(data_files_metadata.json)도 그 버전의 파일 해시로 되돌리고,
+# 현재 데이터 코퍼스는 rejected로 기록해서 같은 데이터로 바로 다시 만들지 않음 (데이터가 바뀌거나 강제 재색인하면 다시 만듦)
+def rollback_version(base_path: Path, data_path: Path = settings.DATA_PATH, target: Optional[str] = None) -> Path:
+    if target:
+        version_path = versions_root(base_path) / target
+        if not (version_path / VERSION_INFO_FILENAME).is_file():
+            raise ValueError(f"되돌릴 버전이 없거나 완성되지 않은 버전입니다: '{target}'")
+    else:
+        version_path = previous_version(base_path)
+        if version_path is None:
+            raise ValueError("되돌릴 이전 버전이 없습니다.")
+    promote_version(base_path, version_path)
+    files_metadata = read_version_files(version_path)
+    if files_metadata is not None:
+        save_metadata(files_metadata)
+    manifest_hash = calculate_manifest_hash(scan_data_directory(Path(data_path)))
+    if manifest_hash != read_version_info(version_path).get("manifest_hash"):
+        mark_rejected(base_path, manifest_hash, f"rollback to {version_path.name}")
+    return version_path
+
+
+# 버전 디렉토리(저장소 + BM25 역색인 + version.json + files.json)를 tar.gz 한 파일로 묶음 -> 결과 파일 경로
+# indexer.py로 만든 버전을 다른 API 노드로 옮길 때 사용 (version_name이 없으면 현재 버전)
+# 그 버전의 코퍼스로 미리 생성한 답변(ANSWER_STORE_PATH/<manifest 해시>)이 있으면 함께 포함
+def export_version(base_path: Path, out_path: Path, version_name: Optional[str] = None,
+                   answer_store_path: Path = settings.ANSWER_STORE_PATH) -> Path:
+    version_path = versions_root(base_path) / version_name if version_name else active_vectorstore_path(base_path)
+    if not (version_path / VERSION_INFO_FILENAME).is_file():
+        raise ValueError(f"내보낼 수 있는 버전 디렉토리가 아닙니다: '{version_path}' (indexer.py로 먼저 색인하세요)")
+    if not (version_path / CORPUS_FILES_DIRNAME / POLICY_RECORDS_FILENAME).is_file():
+        logger.warning(f"버전 '{version_path.name}'에 정책 레코드({POLICY_RECORDS_FILENAME}) 복사본이 없습니다. "
+                       f"이 파일로 시작한 읽기 전용 노드는 데이터 디렉토리에 정책 파일이 없으면 항목 라우터를 사용하지 못합니다.")
+    answers_path = Path(answer_store_path) / read_version_info(version_path).get("manifest_hash", "")
+    if not answers_path.is_dir() or answers_path == Path(answer_store_path):
+        logger.warning(f"버전 '{version_path.name}'의 코퍼스로 미리 생성한 답변이 없어 함께 내보내지 않습니다. "
+                       f"(answer_precompute.py를 먼저 실행하면 포함됩니다)")
+        answers_path = None
+    out_path = Path(out_path)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with tarfile.open(tmp_path, "w:gz") as tar:
+        tar.add(version_path, arcname=version_path.name)
+        if answers_path is not None:
+            tar.add(answers_path, arcname=f"{version_path.name}/{_ANSWERS_DIRNAME}")
+    os.replace(tmp_path, out_path)
+    logger.info(f"벡터 저장소 버전 내보내기 완료: '{version_path.name}' -> '{out_path}'")
+    return out_path
+
+
+# export_version으로 만든 파일을 버전 디렉토리로 풀고 CURRENT 전환 -> 전환한 버전 디렉토리 (version_lock 안에서 호출)
+# 함께 내보낸 미리 생성한 답변은 answer_store_path/<manifest 해시>로 옮김 (이미 있으면 그대로 둠)
+def import_version(base_path: Path, archive_path: Path,
+                   answer_store_path: Path = settings.ANSWER_STORE_PATH) -> Path:
+    root = versions_root(base_path)
+    root.mkdir(parents=True, exist_ok=True)
+    tmp_dir = root / f".import_{time.time_ns()}"
+    try:
+        with tarfile.open(archive_path, "r:gz") as tar:
+            names = {member.name.split("/")[0] for member in tar.getmembers()}
+            if len(names) != 1 or not next(iter(names)).startswith("v"):
+                raise ValueError(f"벡터 저장소 버전 파일이 아닙니다: '{archive_path}'")
+            # Python 3.12+ : 경로 조작/링크 등 위험한 항목을 거부하는 data 필터 사용
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(tmp_dir, filter="data")
+            else:
+                tar.extractall(tmp_dir)
+        extracted = tmp_dir / next(iter(names))
+        if not (extracted / VERSION_INFO_FILENAME).is_file():
+            raise ValueError(f"version.json이 없는 버전입니다: '{archive_path}'")
+        check_version_compatible(extracted)
+        manifest_hash = read_version_info(extracted).get("manifest_hash", "")
+        extracted_answers = extracted / _ANSWERS_DIRNAME
+        if extracted_answers.is_dir():
+            answers_path = Path(answer_store_path) / manifest_hash
+            if manifest_hash and not answers_path.exists():
+                answers_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(extracted_answers), str(answers_path))
+                logger.info(f"미리 생성한 답변 가져오기 완료: '{answers_path}'")
+            shutil.rmtree(extracted_answers, ignore_errors=True)
+        if not (extracted / CORPUS_FILES_DIRNAME / POLICY_RECORDS_FILENAME).is_file():
+            logger.warning(f"가져온 버전 '{extracted.name}'에 정책 레코드({POLICY_RECORDS_FILENAME}) 복사본이 없습니다. "
+                           f"항목 라우터/필터 분류 목록은 데이터 디렉토리(DATA_PATH)의 정책 파일을 사용합니다.")
+        version_path = root / extracted.name
+        if not version_path.exists():
+            os.replace(extracted, version_path)
+        promote_version(base_path, version_path)
+        prune_versions(base_path)
+        return version_path
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# 검증에 실패했거나 되돌린 코퍼스 기록 (같은 manifest 해시로는 자동 재색인하지 않음, 모든 워커가 공유)
+def mark_rejected(base_path: Path, manifest_hash: str, reason: str):
+    root = versions_root(base_path)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / _REJECTED_FILENAME, "w", encoding="utf-8") as f:
+        json.dump({"manifest_hash": manifest_hash, "reason": reason,
+                   "rejected_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=4, ensure_ascii=False)
+
+
+def is_rejected(base_path: Path, manifest_hash: str) -> bool:
+    rejected_path = versions_root(base_path) / _REJECTED_FILENAME
+    if not rejected_path.is_file():
+        return False
+    try:
+        with open(rejected_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("manifest_hash") == manifest_hash
+    except (OSError, json.JSONDecodeError):
+        return False
+
+
+def clear_rejected(base_path: Path):
+    (versions_root(base_path) / _REJECTED_FILENAME).unlink(missing_ok=True)
+
+
+# 버전 생성/전환을 한 프로세스만 하도록 잠금 (여러 uvicorn 워커가 동시에 변경을 감지해도 한 번만 재색인)
+def version_lock(base_path: Path) -> FileLock:
+    root = versions_root(base_path)
+    root.mkdir(parents=True, exist_ok=True)
+    return FileLock(str(root / _LOCK_FILENAME))
+
+
+if __name__ == "__main__":
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--base", default=str(settings.VECTORSTORE_PATH), help="벡터 저장소 기본 경로 (VECTORSTORE_PATH)")
+    parser = argparse.ArgumentParser(description="벡터 저장소 버전 목록 확인 / 이전 버전으로 되돌리기")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", parents=[common], help="버전 목록과 검증 결과 출력")
+    rollback_parser = subparsers.add_parser("rollback", parents=[common], help="이전 버전(또는 --to 버전)으로 CURRENT 전환")
+    rollback_parser.add_argument("--to", default=None, help="되돌릴 버전 디렉토리 이름 (예: v1792431380598915545)")
+    args = parser.parse_args()
+
+    base = Path(args.base)
+    if args.command == "list":
+        active = active_vectorstore_path(base)
+        print(f"현재 버전: {active}")
+        for version_dir in list_versions(base):
+            info = read_version_info(version_dir)
+            validation = info.get("validation", {})
+            print(f"{'*' if version_dir == active else ' '} {version_dir.name}  {info.get('created_at', '(미완성)'):<19}  "
+                  f"청크 {info.get('chunk_count', '-'):>7}  recall {validation.get('smoke_recall', '-')}  "
+                  f"manifest {info.get('manifest_hash', '')[:12]}")
+    else:
+        with version_lock(base):
+            rolled_back = rollback_version(base, settings.DATA_PATH, args.to)
+        print(f"CURRENT -> {rolled_back.name} (실행 중인 서버는 다음 코퍼스 변경 확인 때 이 버전을 로드합니다)")